@@ -1,56 +1,61 @@
 import os
-from flask import Flask, request, jsonify, render_template, send_from_directory, url_for
+import time
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory, url_for
 from werkzeug.utils import secure_filename
 from model.factory.search_system_factory import SearchSystemFactory
+from utils import SearchMetrics, WebHelper
 
 # Initialize search system
 search_system_factory = SearchSystemFactory()
 search_system = search_system_factory.create()
+metrics = SearchMetrics()
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_BATCH_QUERIES'] = 1000  # Max queries per /search/batch request
+app.config['PERSIST_UPLOADS'] = False  # Also save query images to UPLOAD_FOLDER
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Allowed file extensions for image upload
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
-
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+allowed_file = WebHelper.allowed_file
 
 def transform_search_results(results):
-    """Transform search results from Redis format to template format"""
-    transformed_results = []
-    
-    for result in results:
-        # Convert vector_distance to similarity (1 - distance for cosine similarity)
-        similarity = 1 - result.get('vector_distance', 0)
-        
-        # Create image URL from image_path
-        image_url = None
-        if result.get('image_path'):
-            # If it's a dataset path, serve it from the dataset route
-            if result['image_path'].startswith('dataset/'):
-                # Extract the relative path from dataset/animal_images/animal/filename
-                # Remove 'dataset/' prefix and 'animal_images/' from the path
-                relative_path = result['image_path'].replace('dataset/', '').replace('animal_images/', '')
-                image_url = f"/dataset/{relative_path}"
-            else:
-                image_url = result['image_path']
-        
-        transformed_result = {
-            'title': result.get('animal', 'Unknown Animal'),
-            'description': result.get('caption', 'No description available'),
-            'image_url': image_url,
-            'similarity': similarity,
-            'content': result.get('caption', 'No content available')  # Fallback for template
-        }
-        transformed_results.append(transformed_result)
-    
-    return transformed_results
+    """Transform search results to match template expectations, timing the transform stage"""
+    with metrics.stage_seconds.time(stage='transform'):
+        return WebHelper.transform_search_results(results)
+
+def read_upload(file):
+    """Read an uploaded image into memory, saving a copy only when uploads are persisted"""
+    filename = secure_filename(file.filename)
+    image = file.read()
+
+    if app.config['PERSIST_UPLOADS']:
+        with open(os.path.join(app.config['UPLOAD_FOLDER'], filename), 'wb') as f:
+            f.write(image)
+
+    return filename, image
+
+def parse_filters(filters):
+    """Validate metadata filters from a request against the configured vector storage"""
+    return WebHelper.parse_filters(filters, search_system.vector_storage)
+
+def parse_ef_runtime(ef_runtime):
+    """Validate a per-query HNSW ef_runtime override against the configured vector storage"""
+    return WebHelper.parse_ef_runtime(ef_runtime, search_system.vector_storage)
+
+@app.before_request
+def start_request_timer():
+    g.request_start_time = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record the total time and status of every request"""
+    endpoint = request.endpoint or 'unmatched'
+    metrics.request_seconds.observe(time.perf_counter() - g.request_start_time, endpoint=endpoint)
+    metrics.requests.inc(endpoint=endpoint, status=response.status_code)
+    return response
 
 @app.route('/')
 def index():
@@ -64,12 +69,22 @@ def text_search():
         data = request.get_json()
         query = data.get('query', '')
         top_k = data.get('top_k', 10)
+        mode = data.get('mode', 'textual')
         
         if not query:
             return jsonify({'error': 'Query is required'}), 400
+
+        try:
+            filters = parse_filters(data.get('filters'))
+            ef_runtime = parse_ef_runtime(data.get('ef_runtime'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Perform text search
-        textual_results = search_system.text_search(query, top_k)
+        # Perform text search, on captions only or fused with the image embeddings
+        if mode == 'hybrid':
+            textual_results = search_system.hybrid_text_search(query, top_k, filters, ef_runtime)
+        else:
+            textual_results = search_system.text_search(query, top_k, filters, ef_runtime)
 
         # Transform results to match template expectations
         transformed_results = transform_search_results(textual_results)
@@ -97,16 +112,24 @@ def image_search():
             return jsonify({'error': 'No image file selected'}), 400
         
         if file and allowed_file(file.filename):
-            # Secure the filename and save the file
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            # Embed the image straight from memory
+            filename, image = read_upload(file)
             
-            # Get top_k parameter
+            # Get top_k and mode parameters
             top_k = request.form.get('top_k', 10, type=int)
+            mode = request.form.get('mode', 'visual')
+
+            try:
+                filters = parse_filters(request.form.get('filters'))
+                ef_runtime = parse_ef_runtime(request.form.get('ef_runtime'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
-            # Perform image search
-            visual_results = search_system.image_search(filepath, top_k)
+            # Perform image search, on images only or fused with the caption embeddings
+            if mode == 'hybrid':
+                visual_results = search_system.hybrid_image_search(image, top_k, filters, ef_runtime)
+            else:
+                visual_results = search_system.image_search(image, top_k, filters, ef_runtime)
 
             # Transform results to match template expectations
             transformed_results = transform_search_results(visual_results)
@@ -122,6 +145,65 @@ def image_search():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/search/batch', methods=['POST'])
+def batch_search():
+    """Handle batched search requests
+
+    Text queries are sent as JSON: {"queries": ["tiger", ...], "top_k": 10}.
+    Image queries are sent as multipart form data with one or more 'images' files.
+    """
+    try:
+        if request.files:
+            files = request.files.getlist('images')
+            top_k = request.form.get('top_k', 10, type=int)
+            filters = parse_filters(request.form.get('filters'))
+            ef_runtime = parse_ef_runtime(request.form.get('ef_runtime'))
+
+            if not files:
+                return jsonify({'error': 'No image files provided'}), 400
+            if len(files) > app.config['MAX_BATCH_QUERIES']:
+                return jsonify({'error': f"At most {app.config['MAX_BATCH_QUERIES']} queries per batch"}), 400
+            if not all(file.filename and allowed_file(file.filename) for file in files):
+                return jsonify({'error': 'Invalid file type. Please upload images.'}), 400
+
+            queries = []
+            images = []
+            for file in files:
+                filename, image = read_upload(file)
+                queries.append(filename)
+                images.append(image)
+
+            batch_results = search_system.image_search_many(images, top_k, filters, ef_runtime)
+        else:
+            data = request.get_json()
+            queries = data.get('queries', [])
+            top_k = data.get('top_k', 10)
+            filters = parse_filters(data.get('filters'))
+            ef_runtime = parse_ef_runtime(data.get('ef_runtime'))
+
+            if not isinstance(queries, list) or not queries or not all(isinstance(query, str) and query for query in queries):
+                return jsonify({'error': 'Queries must be a non-empty list of strings'}), 400
+            if len(queries) > app.config['MAX_BATCH_QUERIES']:
+                return jsonify({'error': f"At most {app.config['MAX_BATCH_QUERIES']} queries per batch"}), 400
+
+            batch_results = search_system.text_search_many(queries, top_k, filters, ef_runtime)
+
+        return jsonify({
+            'success': True,
+            'results': [
+                {
+                    'query': query,
+                    'results': transform_search_results(results)
+                }
+                for query, results in zip(queries, batch_results)
+            ]
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
     """Serve uploaded files"""
@@ -153,5 +235,10 @@ def test_search():
             'error': str(e)
         }), 500
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Expose latency histograms, counters and pool statistics in the Prometheus text format"""
+    return Response(metrics.render(search_system), content_type=metrics.registry.CONTENT_TYPE)
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
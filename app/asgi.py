@@ -0,0 +1,268 @@
+import asyncio
+import os
+import time
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+from starlette.templating import Jinja2Templates
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+from model.factory.search_system_factory import SearchSystemFactory
+from utils import SearchMetrics, WebHelper
+
+# Asyncio serving mode: run with `uvicorn asgi:app` from the app directory.
+# Embedding and KNN calls are awaited instead of blocking a thread, so one
+# worker process keeps many searches in flight.
+
+# Initialize search system
+search_system_factory = SearchSystemFactory()
+search_system = search_system_factory.create_async()
+metrics = SearchMetrics()
+
+UPLOAD_FOLDER = 'uploads'
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+MAX_BATCH_QUERIES = 1000  # Max queries per /search/batch request
+PERSIST_UPLOADS = False  # Also save query images to UPLOAD_FOLDER
+DATASET_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'animal_images')
+
+# Ensure upload directory exists
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+templates = Jinja2Templates(directory='templates')
+
+def parse_filters(filters):
+    """Validate metadata filters from a request against the configured vector storage"""
+    return WebHelper.parse_filters(filters, search_system.vector_storage)
+
+def parse_ef_runtime(ef_runtime):
+    """Validate a per-query HNSW ef_runtime override against the configured vector storage"""
+    return WebHelper.parse_ef_runtime(ef_runtime, search_system.vector_storage)
+
+def transform_search_results(results):
+    """Transform search results to match template expectations, timing the transform stage"""
+    with metrics.stage_seconds.time(stage='transform'):
+        return WebHelper.transform_search_results(results)
+
+def error(message, status_code):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+async def read_upload(file):
+    """Read an uploaded image into memory, saving a copy only when uploads are persisted"""
+    image = await file.read()
+    if len(image) > MAX_CONTENT_LENGTH:
+        raise ValueError('Uploaded file is too large')
+
+    filename = secure_filename(file.filename)
+
+    if PERSIST_UPLOADS:
+        def write():
+            with open(os.path.join(UPLOAD_FOLDER, filename), 'wb') as f:
+                f.write(image)
+
+        await asyncio.to_thread(write)
+
+    return filename, image
+
+async def record_request_metrics(request: Request, call_next):
+    """Record the total time and status of every request"""
+    start_time = time.perf_counter()
+    response = await call_next(request)
+
+    # The router stores the matched endpoint in the request scope
+    endpoint = request.scope.get('endpoint')
+    endpoint = endpoint.__name__ if endpoint else 'unmatched'
+    metrics.request_seconds.observe(time.perf_counter() - start_time, endpoint=endpoint)
+    metrics.requests.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+async def index(request: Request):
+    """Main page with search interface"""
+    return templates.TemplateResponse('index.html', {'request': request})
+
+async def text_search(request: Request):
+    """Handle text search requests"""
+    try:
+        data = await request.json()
+        query = data.get('query', '')
+        top_k = data.get('top_k', 10)
+        mode = data.get('mode', 'textual')
+
+        if not query:
+            return error('Query is required', 400)
+
+        try:
+            filters = parse_filters(data.get('filters'))
+            ef_runtime = parse_ef_runtime(data.get('ef_runtime'))
+        except ValueError as e:
+            return error(str(e), 400)
+
+        # Perform text search, on captions only or fused with the image embeddings
+        if mode == 'hybrid':
+            textual_results = await search_system.hybrid_text_search(query, top_k, filters, ef_runtime)
+        else:
+            textual_results = await search_system.text_search(query, top_k, filters, ef_runtime)
+
+        return JSONResponse({
+            'success': True,
+            'results': transform_search_results(textual_results),
+            'query': query
+        })
+
+    except Exception as e:
+        return error(str(e), 500)
+
+async def image_search(request: Request):
+    """Handle image search requests"""
+    try:
+        form = await request.form()
+        file = form.get('image')
+
+        # Check if image file is present
+        if file is None or isinstance(file, str):
+            return error('No image file provided', 400)
+
+        if not file.filename:
+            return error('No image file selected', 400)
+
+        if not WebHelper.allowed_file(file.filename):
+            return error('Invalid file type. Please upload an image.', 400)
+
+        try:
+            filename, image = await read_upload(file)
+            top_k = int(form.get('top_k', 10))
+            mode = form.get('mode', 'visual')
+            filters = parse_filters(form.get('filters'))
+            ef_runtime = parse_ef_runtime(form.get('ef_runtime'))
+        except ValueError as e:
+            return error(str(e), 400)
+
+        # Perform image search, on images only or fused with the caption embeddings
+        if mode == 'hybrid':
+            visual_results = await search_system.hybrid_image_search(image, top_k, filters, ef_runtime)
+        else:
+            visual_results = await search_system.image_search(image, top_k, filters, ef_runtime)
+
+        return JSONResponse({
+            'success': True,
+            'results': transform_search_results(visual_results),
+            'filename': filename
+        })
+
+    except Exception as e:
+        return error(str(e), 500)
+
+async def batch_search(request: Request):
+    """Handle batched search requests
+
+    Text queries are sent as JSON: {"queries": ["tiger", ...], "top_k": 10}.
+    Image queries are sent as multipart form data with one or more 'images' files.
+    """
+    try:
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            form = await request.form()
+            files = [file for file in form.getlist('images') if not isinstance(file, str)]
+            top_k = int(form.get('top_k', 10))
+            filters = parse_filters(form.get('filters'))
+            ef_runtime = parse_ef_runtime(form.get('ef_runtime'))
+
+            if not files:
+                return error('No image files provided', 400)
+            if len(files) > MAX_BATCH_QUERIES:
+                return error(f"At most {MAX_BATCH_QUERIES} queries per batch", 400)
+            if not all(file.filename and WebHelper.allowed_file(file.filename) for file in files):
+                return error('Invalid file type. Please upload images.', 400)
+
+            queries = []
+            images = []
+            for file in files:
+                filename, image = await read_upload(file)
+                queries.append(filename)
+                images.append(image)
+
+            batch_results = await search_system.image_search_many(images, top_k, filters, ef_runtime)
+        else:
+            data = await request.json()
+            queries = data.get('queries', [])
+            top_k = data.get('top_k', 10)
+            filters = parse_filters(data.get('filters'))
+            ef_runtime = parse_ef_runtime(data.get('ef_runtime'))
+
+            if not isinstance(queries, list) or not queries or not all(isinstance(query, str) and query for query in queries):
+                return error('Queries must be a non-empty list of strings', 400)
+            if len(queries) > MAX_BATCH_QUERIES:
+                return error(f"At most {MAX_BATCH_QUERIES} queries per batch", 400)
+
+            batch_results = await search_system.text_search_many(queries, top_k, filters, ef_runtime)
+
+        return JSONResponse({
+            'success': True,
+            'results': [
+                {
+                    'query': query,
+                    'results': transform_search_results(results)
+                }
+                for query, results in zip(queries, batch_results)
+            ]
+        })
+
+    except ValueError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def uploaded_file(request: Request):
+    """Serve uploaded files"""
+    filepath = safe_join(UPLOAD_FOLDER, request.path_params['filename'])
+    if filepath is None or not os.path.isfile(filepath):
+        return error('Not found', 404)
+    return FileResponse(filepath)
+
+async def dataset_file(request: Request):
+    """Serve dataset files"""
+    filepath = safe_join(DATASET_DIR, request.path_params['filename'])
+    if filepath is None or not os.path.isfile(filepath):
+        return error('Not found', 404)
+    return FileResponse(filepath)
+
+async def test_search(request: Request):
+    """Test endpoint to check if search system is working"""
+    try:
+        # Test text search with a simple query
+        test_results = await search_system.text_search("tiger", 5)
+
+        return JSONResponse({
+            'success': True,
+            'message': 'Search system is working',
+            'test_results': test_results,
+            'results_count': len(test_results) if test_results else 0
+        })
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=500)
+
+async def metrics_endpoint(request: Request):
+    """Expose latency histograms, counters and pool statistics in the Prometheus text format"""
+    body = await asyncio.to_thread(metrics.render, search_system)
+    return Response(body, headers={'Content-Type': metrics.registry.CONTENT_TYPE})
+
+app = Starlette(routes=[
+    Route('/', index),
+    Route('/search/text', text_search, methods=['POST']),
+    Route('/search/image', image_search, methods=['POST']),
+    Route('/search/batch', batch_search, methods=['POST']),
+    Route('/uploads/{filename}', uploaded_file),
+    Route('/dataset/{filename:path}', dataset_file),
+    Route('/test', test_search),
+    Route('/metrics', metrics_endpoint),
+], middleware=[
+    Middleware(BaseHTTPMiddleware, dispatch=record_request_metrics),
+])
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000)
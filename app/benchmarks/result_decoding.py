@@ -0,0 +1,92 @@
+"""
+Per-result cost of turning a raw FT.SEARCH reply into the /search response.
+
+Compares the previous path (redis-py Result/Document objects, copied into
+dicts, then copied again into the template shape) with the direct decoding
+of RedisVectorStorage.parse_search_reply. No Redis server is needed: the
+reply is synthesized in the RESP2 shape returned by FT.SEARCH.
+
+Usage (from the app directory):
+    python -m benchmarks.result_decoding --top-k 10 100 500
+"""
+import argparse
+import timeit
+from redis.commands.search.result import Result
+from model.redis_vector_storage import RedisVectorStorage
+from utils import WebHelper
+
+def make_reply(top_k: int, prefix: str) -> list:
+    reply = [top_k]
+    for index in range(top_k):
+        reply.append(f"{prefix}:{index:032x}".encode('utf-8'))
+        reply.append([
+            b'animal', b'tiger',
+            b'caption', f"a tiger standing on a red bench in a zoo {index}".encode('utf-8'),
+            b'image_path', f"dataset/animal_images/tiger/{index:010x}.jpg".encode('utf-8'),
+            b'vector_distance', f"{index / top_k:.6f}".encode('utf-8'),
+        ])
+    return reply
+
+def legacy_parse(reply: list, prefix: str) -> list:
+    """The previous decoding: Result/Document objects copied into dicts"""
+    key_prefix_length = len(prefix) + 1
+    return [
+        {
+            'id': doc.id[key_prefix_length:],
+            'animal': doc.animal,
+            'caption': doc.caption,
+            'image_path': doc.image_path,
+            'vector_distance': float(doc.vector_distance)
+        }
+        for doc in Result(reply, True).docs
+    ]
+
+def legacy_transform(results: list) -> list:
+    """The previous response transform, one field lookup and copy at a time"""
+    transformed_results = []
+    for result in results:
+        similarity = 1 - result.get('vector_distance', 0)
+        image_url = None
+        if result.get('image_path'):
+            if result['image_path'].startswith('dataset/'):
+                relative_path = result['image_path'].replace('dataset/', '').replace('animal_images/', '')
+                image_url = f"/dataset/{relative_path}"
+            else:
+                image_url = result['image_path']
+        transformed_results.append({
+            'title': result.get('animal', 'Unknown Animal'),
+            'description': result.get('caption', 'No description available'),
+            'image_url': image_url,
+            'similarity': similarity,
+            'content': result.get('caption', 'No content available')
+        })
+    return transformed_results
+
+def measure(function, top_k: int, repeat: int) -> float:
+    """Best per-result time in microseconds"""
+    number = max(1, 20000 // top_k)
+    best = min(timeit.repeat(function, number=number, repeat=repeat))
+    return best / number / top_k * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FT.SEARCH reply decoding')
+    parser.add_argument('--top-k', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Only the prefix is needed to decode replies, so skip connecting to Redis
+    storage = RedisVectorStorage.__new__(RedisVectorStorage)
+    storage.prefix = 'animal'
+
+    print(f"{'top_k':>6} {'before (us/result)':>20} {'after (us/result)':>19} {'speedup':>8}")
+    for top_k in args.top_k:
+        reply = make_reply(top_k, storage.prefix)
+        assert legacy_transform(legacy_parse(reply, storage.prefix)) == \
+            WebHelper.transform_search_results(storage.parse_search_reply(reply))
+
+        before = measure(lambda: legacy_transform(legacy_parse(reply, storage.prefix)), top_k, args.repeat)
+        after = measure(lambda: WebHelper.transform_search_results(storage.parse_search_reply(reply)), top_k, args.repeat)
+        print(f"{top_k:>6} {before:>20.2f} {after:>19.2f} {before / after:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
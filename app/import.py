@@ -1,7 +1,7 @@
 from model.factory import SearchSystemFactory
-from utils import PathHelper
+from pipeline import ImportPipeline
+from utils import MetricsRegistry, PathHelper
 import os
-import csv
 import logging
 import json
 import time
@@ -31,25 +31,39 @@ def setup_logger():
 
 # Performance monitoring class
 class PerformanceMonitor:
+    # Log a throughput update every this many images
+    LOG_INTERVAL = 10
+
     def __init__(self):
         self.start_time = time.time()
-        self.animal_start_time = None
+        self.animal_start_times = {}
         self.image_start_time = None
         self.total_images_processed = 0
         self.total_animals_processed = 0
-        self.animal_processing_times = []
-        self.image_processing_times = []
+
+        # Fixed-memory histograms instead of a list of every timing
+        registry = MetricsRegistry.get_instance()
+        self.animal_processing_times = registry.histogram(
+            'import_animal_duration_seconds', 'Time to import all images of an animal',
+            buckets=(1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+        )
+        self.image_processing_times = registry.histogram(
+            'import_image_duration_seconds', 'Time to embed and store one image, averaged over its batch'
+        )
+        self.window_images = 0
+        self.window_time = 0.0
         
     def start_animal_processing(self, animal_name):
         """Start timing for animal processing"""
-        self.animal_start_time = time.time()
+        self.animal_start_times[animal_name] = time.time()
         logger.info(f"Starting processing for animal: {animal_name}")
         
     def end_animal_processing(self, animal_name, images_processed):
-        """End timing for animal processing and log performance"""
-        if self.animal_start_time:
-            processing_time = time.time() - self.animal_start_time
-            self.animal_processing_times.append(processing_time)
+        """End timing for animal processing, log performance and return the elapsed time"""
+        animal_start_time = self.animal_start_times.pop(animal_name, None)
+        if animal_start_time:
+            processing_time = time.time() - animal_start_time
+            self.animal_processing_times.observe(processing_time)
             self.total_animals_processed += 1
             
             # Calculate throughput for this animal
@@ -57,6 +71,9 @@ class PerformanceMonitor:
             
             logger.info(f"Completed {animal_name}: {images_processed} images in {processing_time:.2f}s "
                        f"({images_per_second:.2f} images/sec)")
+            return processing_time
+
+        return 0
             
     def start_image_processing(self):
         """Start timing for image processing"""
@@ -66,44 +83,45 @@ class PerformanceMonitor:
         """End timing for image processing"""
         if self.image_start_time:
             processing_time = time.time() - self.image_start_time
-            self.image_processing_times.append(processing_time)
-            self.total_images_processed += 1
-            
-            # Log every 10 images for performance monitoring
-            if self.total_images_processed % 10 == 0:
-                avg_image_time = sum(self.image_processing_times[-10:]) / min(10, len(self.image_processing_times[-10:]))
-                images_per_second = 1 / avg_image_time if avg_image_time > 0 else 0
-                logger.info(f"Performance update: {self.total_images_processed} images processed, "
-                           f"avg {avg_image_time:.3f}s per image ({images_per_second:.2f} images/sec)")
+            self.record_batch_processing(1, processing_time)
+
+    def record_batch_processing(self, batch_size, processing_time):
+        """Record a batch of images that went through embedding and storage together"""
+        if batch_size <= 0:
+            return
+
+        previous_total = self.total_images_processed
+        self.image_processing_times.observe(processing_time / batch_size, count=batch_size)
+        self.total_images_processed += batch_size
+        self.window_images += batch_size
+        self.window_time += processing_time
+
+        # Log every 10 images for performance monitoring, averaged over the images since the last update
+        if self.total_images_processed // self.LOG_INTERVAL > previous_total // self.LOG_INTERVAL:
+            avg_image_time = self.window_time / self.window_images
+            images_per_second = 1 / avg_image_time if avg_image_time > 0 else 0
+            logger.info(f"Performance update: {self.total_images_processed} images processed, "
+                       f"avg {avg_image_time:.3f}s per image ({images_per_second:.2f} images/sec)")
+            self.window_images = 0
+            self.window_time = 0.0
                 
     def get_performance_summary(self):
         """Get comprehensive performance summary"""
         total_time = time.time() - self.start_time
-        
-        if self.animal_processing_times:
-            avg_animal_time = sum(self.animal_processing_times) / len(self.animal_processing_times)
-            animals_per_second = self.total_animals_processed / total_time if total_time > 0 else 0
-        else:
-            avg_animal_time = 0
-            animals_per_second = 0
-            
-        if self.image_processing_times:
-            avg_image_time = sum(self.image_processing_times) / len(self.image_processing_times)
-            images_per_second = self.total_images_processed / total_time if total_time > 0 else 0
-        else:
-            avg_image_time = 0
-            images_per_second = 0
-            
+        animal_times = self.animal_processing_times.summary()
+        image_times = self.image_processing_times.summary()
+
         return {
             'total_time': total_time,
             'total_animals_processed': self.total_animals_processed,
             'total_images_processed': self.total_images_processed,
-            'avg_animal_processing_time': avg_animal_time,
-            'avg_image_processing_time': avg_image_time,
-            'animals_per_second': animals_per_second,
-            'images_per_second': images_per_second,
-            'animal_processing_times': self.animal_processing_times,
-            'image_processing_times': self.image_processing_times
+            'avg_animal_processing_time': animal_times['mean'],
+            'avg_image_processing_time': image_times['mean'],
+            'animals_per_second': self.total_animals_processed / total_time if total_time > 0 else 0,
+            'images_per_second': self.total_images_processed / total_time if total_time > 0 else 0,
+            # Count, mean, max and estimated p50/p90/p99 in seconds
+            'animal_processing_times': animal_times,
+            'image_processing_times': image_times
         }
 
 # Initialize logger and performance monitor
@@ -119,6 +137,7 @@ import_results = {
     'total_images': 0,
     'successful_images': 0,
     'failed_images': 0,
+    'skipped_images': 0,
     'animal_details': {},
     'errors': [],
     'performance': {}
@@ -154,121 +173,17 @@ except Exception as e:
 
 import_results['total_animals'] = len(animal_names)
 
-# Loop through each animal name
-for animal_name in animal_names:
-    performance_monitor.start_animal_processing(animal_name)
-    
-    animal_images_path = animal_images_dir / animal_name
-    animal_captions_path = animal_captions_dir / f"caption_{animal_name}.csv"
-    
-    animal_stats = {
-        'animal_name': animal_name,
-        'images_found': 0,
-        'captions_found': 0,
-        'successful_inserts': 0,
-        'failed_inserts': 0,
-        'processing_time': 0,
-        'errors': []
-    }
-
-    # Check if the animal images directory exists
-    if not animal_images_path.exists():
-        error_msg = f"Animal images directory for {animal_name} does not exist: {animal_images_path}"
-        logger.warning(error_msg)
-        animal_stats['errors'].append(error_msg)
-        import_results['failed_animals'] += 1
-        import_results['animal_details'][animal_name] = animal_stats
-        performance_monitor.end_animal_processing(animal_name, 0)
-        continue
-
-    # List image files in the directory
-    try:
-        image_files = [f for f in os.listdir(animal_images_path) if f.endswith(('.jpg', '.jpeg', '.png', '.gif'))]
-        image_files.sort()
-        animal_stats['images_found'] = len(image_files)
-        logger.info(f"Found {len(image_files)} images for {animal_name}")
-    except Exception as e:
-        error_msg = f"Error listing images for {animal_name}: {e}"
-        logger.error(error_msg)
-        animal_stats['errors'].append(error_msg)
-        import_results['failed_animals'] += 1
-        import_results['animal_details'][animal_name] = animal_stats
-        performance_monitor.end_animal_processing(animal_name, 0)
-        continue
+# Run the pipelined import
+import_pipeline = ImportPipeline(search_system, dataset_dir, logger, performance_monitor)
+pipeline_results = import_pipeline.run(animal_names)
 
-    # Read animal captions from CSV file
-    captions = {}
-    if animal_captions_path.exists():
-        try:
-            with open(animal_captions_path, 'r', encoding='utf-8') as f:
-                csv_reader = csv.reader(f)
-                for row in csv_reader:
-                    if len(row) >= 2:
-                        caption = row[1].strip().strip('"')
-                        key = row[0].split('/')[-1].split('.')[0]
-                        captions[key] = caption
-            animal_stats['captions_found'] = len(captions)
-            logger.info(f"Found {len(captions)} captions for {animal_name}")
-        except Exception as e:
-            error_msg = f"Error reading captions for {animal_name}: {e}"
-            logger.error(error_msg)
-            animal_stats['errors'].append(error_msg)
-    else:
-        error_msg = f"Caption file for {animal_name} does not exist: {animal_captions_path}"
-        logger.warning(error_msg)
-        animal_stats['errors'].append(error_msg)
-        import_results['failed_animals'] += 1
-        import_results['animal_details'][animal_name] = animal_stats
-        performance_monitor.end_animal_processing(animal_name, 0)
-        continue
-
-    logger.info(f"Processing {animal_name}: {len(image_files)} images, {len(captions)} captions")
-
-    # Loop through each image
-    for index, image_filename in enumerate(image_files):
-        performance_monitor.start_image_processing()
-        
-        if index < len(captions):
-            try:
-                caption = captions[image_filename.split('.')[0]]
-                image_path = animal_images_path / image_filename
-
-                animal_data = {
-                    'animal': animal_name,
-                    'caption': caption,
-                    'image_path': 'dataset/' + str(image_path.relative_to(dataset_dir)).replace('\\', '/')
-                }
-
-                search_system.insert_record(animal_data)
-                animal_stats['successful_inserts'] += 1
-                import_results['successful_images'] += 1
-                performance_monitor.end_image_processing(success=True)
-                logger.debug(f"Successfully inserted {image_filename} for {animal_name}")
-            except Exception as e:
-                error_msg = f"Error inserting {image_filename} for {animal_name}: {e}"
-                logger.error(error_msg)
-                animal_stats['failed_inserts'] += 1
-                animal_stats['errors'].append(error_msg)
-                import_results['failed_images'] += 1
-                performance_monitor.end_image_processing(success=False)
-        else:
-            error_msg = f"No caption found for image {image_filename}"
-            logger.warning(error_msg)
-            animal_stats['failed_inserts'] += 1
-            animal_stats['errors'].append(error_msg)
-            import_results['failed_images'] += 1
-            performance_monitor.end_image_processing(success=False)
-
-    import_results['total_images'] += len(image_files)
-    animal_stats['processing_time'] = performance_monitor.animal_processing_times[-1] if performance_monitor.animal_processing_times else 0
-    import_results['animal_details'][animal_name] = animal_stats
-    
-    if animal_stats['successful_inserts'] > 0:
-        import_results['successful_animals'] += 1
-    else:
-        import_results['failed_animals'] += 1
-
-    performance_monitor.end_animal_processing(animal_name, len(image_files))
+import_results['successful_animals'] = pipeline_results['successful_animals']
+import_results['failed_animals'] = pipeline_results['failed_animals']
+import_results['total_images'] = pipeline_results['total_images']
+import_results['successful_images'] = pipeline_results['successful_images']
+import_results['failed_images'] = pipeline_results['failed_images']
+import_results['skipped_images'] = pipeline_results['skipped_images']
+import_results['animal_details'] = pipeline_results['animal_details']
 
 # Get performance summary
 performance_summary = performance_monitor.get_performance_summary()
@@ -280,7 +195,7 @@ import_results['duration'] = (datetime.fromisoformat(import_results['end_time'])
                              datetime.fromisoformat(import_results['start_time'])).total_seconds()
 
 # Save results to file
-results_dir = "./results"
+results_dir = Path("./results")
 os.makedirs(results_dir, exist_ok=True)
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 results_file = results_dir / f"import_results_{timestamp}.json"
@@ -292,6 +207,17 @@ try:
 except Exception as e:
     logger.error(f"Error saving results file: {e}")
 
+# Save the import's histograms (including embed timings) in the Prometheus text format,
+# e.g. for the node_exporter textfile collector
+metrics_file = results_dir / f"import_metrics_{timestamp}.prom"
+
+try:
+    with open(metrics_file, 'w') as f:
+        f.write(MetricsRegistry.get_instance().render())
+    logger.info(f"Import metrics saved to: {metrics_file}")
+except Exception as e:
+    logger.error(f"Error saving metrics file: {e}")
+
 # Log final summary with performance metrics
 logger.info("=" * 60)
 logger.info("IMPORT SUMMARY")
@@ -302,12 +228,15 @@ logger.info(f"Failed animals: {import_results['failed_animals']}")
 logger.info(f"Total images: {import_results['total_images']}")
 logger.info(f"Successful images: {import_results['successful_images']}")
 logger.info(f"Failed images: {import_results['failed_images']}")
+logger.info(f"Skipped (unchanged) images: {import_results['skipped_images']}")
 logger.info("=" * 60)
 logger.info("PERFORMANCE METRICS")
 logger.info("=" * 60)
 logger.info(f"Total duration: {performance_summary['total_time']:.2f} seconds")
 logger.info(f"Average animal processing time: {performance_summary['avg_animal_processing_time']:.2f} seconds")
 logger.info(f"Average image processing time: {performance_summary['avg_image_processing_time']:.3f} seconds")
+logger.info(f"Image processing time p50/p99: {performance_summary['image_processing_times']['p50']:.3f}s / "
+            f"{performance_summary['image_processing_times']['p99']:.3f}s")
 logger.info(f"Throughput - Animals per second: {performance_summary['animals_per_second']:.2f}")
 logger.info(f"Throughput - Images per second: {performance_summary['images_per_second']:.2f}")
 logger.info("=" * 60)
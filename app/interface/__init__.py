@@ -1,2 +1,4 @@
 from .embedding_model import EmbeddingModel
 from .vector_storage import VectorStorage
+from .async_embedding_model import AsyncEmbeddingModel
+from .async_vector_storage import AsyncVectorStorage
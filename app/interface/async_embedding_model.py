@@ -0,0 +1,66 @@
+from abc import ABC, abstractmethod
+from typing import List
+import numpy as np
+from utils import ImageInput
+
+class AsyncEmbeddingModel(ABC):
+    """
+    Asyncio interface of an embedding model, for the ASGI serving path.
+    """
+
+    def get_identity(self) -> str:
+        """
+        Identify the model producing the embeddings.
+
+        Returns:
+            str: A stable identifier of the model.
+        """
+        return type(self).__name__
+
+    @abstractmethod
+    async def embed_text(self, text: str) -> np.ndarray:
+        """
+        Extract an embedding from the text.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: The text embedding (feature vector).
+        """
+
+    @abstractmethod
+    async def embed_image(self, image: ImageInput) -> np.ndarray:
+        """
+        Extract an embedding from the image.
+
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
+
+        Returns:
+            np.ndarray: The image embedding (feature vector).
+        """
+
+    @abstractmethod
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of texts.
+
+        Args:
+            texts (List[str]): Input texts.
+
+        Returns:
+            np.ndarray: The text embeddings, one row per input text.
+        """
+
+    @abstractmethod
+    async def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of images.
+
+        Args:
+            images (List[ImageInput]): Input images, as file paths, encoded bytes or PIL images.
+
+        Returns:
+            np.ndarray: The image embeddings, one row per input image.
+        """
@@ -0,0 +1,85 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any
+import numpy as np
+
+class AsyncVectorStorage(ABC):
+    """
+    Asyncio interface of a vector storage, for the ASGI serving path.
+    """
+
+    @abstractmethod
+    def normalize_filters(self, filters: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Validate search filters and turn every value into a list of strings.
+
+        Raises:
+            ValueError: If a field cannot be filtered on.
+        """
+
+    async def get_index_generation(self) -> Any:
+        """
+        Get a value that changes whenever records are written or the index is rebuilt,
+        or None if the storage does not track one.
+        """
+        return None
+
+    def supports_ef_runtime(self) -> bool:
+        """
+        Whether search and search_many accept ef_runtime, the HNSW candidate list size of one query.
+        """
+        return False
+
+    @abstractmethod
+    async def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add many records to the storage in bulk.
+
+        Args:
+            records (List[Dict[str, Any]]): Records holding 'textual_embedding' and
+                'visual_embedding' arrays alongside their metadata fields.
+
+        Returns:
+            List[str]: The unique identifiers of the stored records, in input order.
+        """
+
+    @abstractmethod
+    async def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 10,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for the most similar vectors to the given query vector.
+
+        Args:
+            query_vector (np.ndarray): The query vector to match against stored vectors.
+            top_k (int, optional): The number of top matching results to return.
+            embedding_type (str, optional): 'textual' or 'visual', the embedding field to search.
+            filters (Dict[str, Any], optional): Metadata filters, as in VectorStorage.search.
+
+        Returns:
+            List[Dict[str, Any]]: A list of matching records, each containing metadata and similarity score.
+        """
+
+    @abstractmethod
+    async def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 10,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for the most similar vectors to each of many query vectors at once.
+
+        Args:
+            query_vectors (np.ndarray): The query vectors, one row per query.
+            top_k (int, optional): The number of top matching results per query.
+            embedding_type (str, optional): 'textual' or 'visual', the embedding field to search.
+            filters (Dict[str, Any], optional): Metadata filters applied to every query.
+
+        Returns:
+            List[List[Dict[str, Any]]]: One result list per query vector, in input order.
+        """
@@ -1,11 +1,25 @@
 from abc import ABC, abstractmethod
+from typing import List
 import numpy as np
+from utils import ImageInput
 
 class EmbeddingModel(ABC):
     """
     Interface for a face recognizer that extracts facial embeddings.
     """
 
+    def get_identity(self) -> str:
+        """
+        Identify the model producing the embeddings.
+
+        Embeddings from models with different identities are not interchangeable,
+        so caches key on this value.
+
+        Returns:
+            str: A stable identifier of the model.
+        """
+        return type(self).__name__
+
     @abstractmethod
     def embed_text(self, text: str) -> np.ndarray:
         """
@@ -19,13 +33,37 @@ class EmbeddingModel(ABC):
         """
 
     @abstractmethod
-    def embed_image(self, image_path: str) -> np.ndarray:
+    def embed_image(self, image: ImageInput) -> np.ndarray:
         """
         Extract an embedding from the image.
 
-        args:
-            image (np.ndarray): Input image.
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
 
         Returns:
             np.ndarray: The image embedding (feature vector).
         """
+
+    @abstractmethod
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of texts.
+
+        Args:
+            texts (List[str]): Input texts.
+
+        Returns:
+            np.ndarray: The text embeddings, one row per input text.
+        """
+
+    @abstractmethod
+    def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of images.
+
+        Args:
+            images (List[ImageInput]): Input images, as file paths, encoded bytes or PIL images.
+
+        Returns:
+            np.ndarray: The image embeddings, one row per input image.
+        """
@@ -1,34 +1,179 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any
+import uuid
 import numpy as np
+from utils import IndexSnapshot, TagIndex
 
 class VectorStorage(ABC):
     """
     Interface for a vector storage/database system.
     """
 
+    # Metadata fields that search results can be filtered on
+    FILTER_FIELDS = ('animal',)
+
     @abstractmethod
-    def insert(self, vector: np.ndarray, metadata: Dict[str, Any] = {}) -> str:
+    def insert(
+        self,
+        textual_embedding: np.ndarray,
+        visual_embedding: np.ndarray,
+        metadata: Dict[str, Any] = {}
+    ) -> str:
         """
-        Add a feature vector along with associated metadata to the storage.
+        Add the textual and visual embeddings of a record along with its metadata to the storage.
 
         Args:
-            vector (np.ndarray): The facial embedding or feature vector.
-            metadata (Dict[str, Any]): Additional information such as person ID, timestamp, etc.
+            textual_embedding (np.ndarray): The caption embedding.
+            visual_embedding (np.ndarray): The image embedding.
+            metadata (Dict[str, Any]): Additional information such as animal, caption and image path.
         
         Returns:
             str: A unique identifier for the stored vector.
         """
 
     @abstractmethod
-    def search(self, query_vector: np.ndarray, top_k: int = 10, embedding_type: str = 'textual') -> List[Dict[str, Any]]:
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add many records to the storage in bulk.
+
+        Args:
+            records (List[Dict[str, Any]]): Records holding 'textual_embedding' and
+                'visual_embedding' arrays alongside their metadata fields.
+
+        Returns:
+            List[str]: The unique identifiers of the stored records, in input order.
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 10,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
         """
         Search for the most similar vectors to the given query vector.
 
         Args:
             query_vector (np.ndarray): The query vector to match against stored vectors.
             top_k (int, optional): The number of top matching results to return. Defaults to 5.
+            embedding_type (str, optional): 'textual' or 'visual', the embedding field to search.
+            filters (Dict[str, Any], optional): Restrict the search to records whose field
+                equals the value, or one of the values when a list is given, e.g. {'animal': ['tiger', 'lion']}.
         
         Returns:
             List[Dict[str, Any]]: A list of matching records, each containing metadata and similarity score.
-        """
\ No newline at end of file
+        """
+
+    @abstractmethod
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 10,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for the most similar vectors to each of many query vectors at once.
+
+        Args:
+            query_vectors (np.ndarray): The query vectors, one row per query.
+            top_k (int, optional): The number of top matching results per query.
+            embedding_type (str, optional): 'textual' or 'visual', the embedding field to search.
+            filters (Dict[str, Any], optional): Metadata filters applied to every query, as in search.
+
+        Returns:
+            List[List[Dict[str, Any]]]: One result list per query vector, in input order.
+        """
+
+    @abstractmethod
+    def export_snapshot(self, path: str) -> int:
+        """
+        Write every stored record to an IndexSnapshot directory.
+
+        Args:
+            path (str): Target snapshot directory, replaced atomically if it exists.
+
+        Returns:
+            int: The number of records written.
+        """
+
+    def load_snapshot(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Insert every record of an IndexSnapshot, keeping their keys.
+
+        Backends able to serve straight from the memory-mapped files override this.
+
+        Args:
+            path (str): Snapshot directory.
+            batch_size (int): Records passed to insert_many at a time.
+
+        Returns:
+            int: The number of records loaded.
+        """
+        snapshot = IndexSnapshot(path)
+        for records in snapshot.iter_records(batch_size):
+            self.insert_many(records)
+
+        return snapshot.count
+
+    def get_index_generation(self) -> Any:
+        """
+        Get a value that changes whenever records are written or the index is rebuilt,
+        including by other processes, so that cached search results can be dropped.
+
+        Returns:
+            Any: The current generation, or None if the storage does not track one.
+        """
+        return None
+
+    def supports_ef_runtime(self) -> bool:
+        """
+        Whether search and search_many accept ef_runtime, the HNSW candidate list size of one query.
+
+        Backends supporting it override this.
+        """
+        return False
+
+    def normalize_filters(self, filters: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        Validate search filters and turn every value into a list of strings.
+
+        Values are lower-cased and stripped, as Redis TAG fields match them
+        case-insensitively, so every backend and the result cache agree.
+
+        Raises:
+            ValueError: If a field cannot be filtered on, or is given no value or
+                an empty one, which no Redis TAG query can express.
+        """
+        normalized = {}
+        for field, values in (filters or {}).items():
+            if field not in self.FILTER_FIELDS:
+                raise ValueError(f"Cannot filter on '{field}', filterable fields: {', '.join(self.FILTER_FIELDS)}")
+
+            if values is None:
+                continue
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+
+            normalized[field] = [TagIndex.normalize_value(value) for value in values]
+            if not normalized[field] or not all(normalized[field]):
+                raise ValueError(f"Filter on '{field}' needs one or more non-empty values")
+
+        return normalized
+
+    def make_key_id(self, metadata: Dict[str, Any]) -> str:
+        """
+        Derive a deterministic key from the record so re-imports overwrite instead of duplicating.
+
+        Uses an explicit 'id' when given, otherwise a UUID5 of the image path.
+        Records without either fall back to a random UUID.
+        """
+        if metadata.get('id'):
+            return str(metadata['id'])
+
+        if metadata.get('image_path'):
+            return str(uuid.uuid5(uuid.NAMESPACE_URL, str(metadata['image_path'])))
+
+        return str(uuid.uuid4())
@@ -1,3 +1,16 @@
 from .redis_vector_storage import RedisVectorStorage
 from .clip_embedding_model import CLIPEmbeddingModel
 from .search_system import SearchSystem
+from .sqlite_embedding_cache import SQLiteEmbeddingCache
+from .cached_embedding_model import CachedEmbeddingModel
+from .numpy_vector_storage import NumpyVectorStorage
+from .ivf_vector_storage import IVFVectorStorage
+from .pq_vector_storage import PQVectorStorage
+from .micro_batching_embedding_model import MicroBatchingEmbeddingModel
+from .async_clip_embedding_model import AsyncCLIPEmbeddingModel
+from .async_cached_embedding_model import AsyncCachedEmbeddingModel
+from .async_redis_vector_storage import AsyncRedisVectorStorage
+from .threaded_async_vector_storage import ThreadedAsyncVectorStorage
+from .async_search_system import AsyncSearchSystem
+from .async_micro_batching_embedding_model import AsyncMicroBatchingEmbeddingModel
+from .sharded_vector_storage import ShardedVectorStorage
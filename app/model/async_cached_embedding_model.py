@@ -0,0 +1,101 @@
+from interface import AsyncEmbeddingModel as AsyncEmbeddingModelInterface
+from typing import Awaitable, Callable, List
+import asyncio
+import numpy as np
+from utils import ImageInput
+from .cached_embedding_model import CachedEmbeddingModel
+from .sqlite_embedding_cache import SQLiteEmbeddingCache
+
+class AsyncCachedEmbeddingModel(AsyncEmbeddingModelInterface):
+    """
+    Asyncio counterpart of CachedEmbeddingModel, sharing its cache keys.
+
+    SQLite lookups and image reads run in the default thread pool so they
+    never block the event loop.
+    """
+
+    def __init__(self, embedding_model: AsyncEmbeddingModelInterface, cache: SQLiteEmbeddingCache):
+        self.embedding_model = embedding_model
+        self.cache = cache
+
+    def get_identity(self) -> str:
+        return self.embedding_model.get_identity()
+
+    async def embed_text(self, text: str) -> np.ndarray:
+        """
+        Extract an embedding from the text, using the cache when possible.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: The text embedding (feature vector).
+        """
+        return await self.embed_texts([text])
+
+    async def embed_image(self, image: ImageInput) -> np.ndarray:
+        """
+        Extract an embedding from the image, using the cache when possible.
+
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
+
+        Returns:
+            np.ndarray: The image embedding (feature vector).
+        """
+        return await self.embed_images([image])
+
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of texts, only sending cache misses to the model.
+
+        Args:
+            texts (List[str]): Input texts.
+
+        Returns:
+            np.ndarray: The text embeddings, one row per input text.
+        """
+        identity = self.get_identity()
+        keys = [CachedEmbeddingModel.text_key(identity, text) for text in texts]
+        return await self._embed_cached(keys, texts, self.embedding_model.embed_texts)
+
+    async def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of images, only sending cache misses to the model.
+
+        Args:
+            images (List[ImageInput]): Input images, as file paths, encoded bytes or PIL images.
+
+        Returns:
+            np.ndarray: The image embeddings, one row per input image.
+        """
+        identity = self.get_identity()
+        keys = await asyncio.to_thread(
+            lambda: [CachedEmbeddingModel.image_key(identity, image) for image in images]
+        )
+        return await self._embed_cached(keys, images, self.embedding_model.embed_images)
+
+    async def _embed_cached(
+        self,
+        keys: List[str],
+        inputs: list,
+        embed_batch: Callable[[list], Awaitable[np.ndarray]]
+    ) -> np.ndarray:
+        """Resolve a batch from the cache and embed the misses in one model call."""
+        if not inputs:
+            return await embed_batch([])
+
+        cached = await asyncio.to_thread(self.cache.get_many, keys)
+
+        missing = {}
+        for key, value in zip(keys, inputs):
+            if key not in cached and key not in missing:
+                missing[key] = value
+
+        if missing:
+            embeddings = np.asarray(await embed_batch(list(missing.values())), dtype=np.float32)
+            computed = dict(zip(missing.keys(), embeddings))
+            await asyncio.to_thread(self.cache.put_many, computed)
+            cached.update(computed)
+
+        return np.stack([cached[key] for key in keys])
@@ -0,0 +1,87 @@
+from interface import AsyncEmbeddingModel as AsyncEmbeddingModelInterface
+from typing import List
+import asyncio
+import numpy as np
+from utils import ImageInput
+from .clip_embedding_model import CLIPEmbeddingModel
+
+class AsyncCLIPEmbeddingModel(AsyncEmbeddingModelInterface):
+    """
+    CLIP embedding model on the asyncio API of clip_client.
+
+    Awaiting an embedding yields to the event loop while the CLIP server
+    works, so one process can keep many requests in flight.
+    """
+
+    def __init__(self, embedding_model: CLIPEmbeddingModel = None):
+        self.embedding_model = embedding_model or CLIPEmbeddingModel()
+        self.client = self.embedding_model.client
+
+    def get_identity(self) -> str:
+        return self.embedding_model.get_identity()
+
+    async def embed_text(self, text: str) -> np.ndarray:
+        """
+        Extract an embedding from the text.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: The text embedding (feature vector).
+        """
+        return await self.client.aencode([text])
+
+    async def embed_image(self, image: ImageInput) -> np.ndarray:
+        """
+        Extract an embedding from the image.
+
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
+
+        Returns:
+            np.ndarray: The image embedding (feature vector).
+        """
+        return CLIPEmbeddingModel.to_embeddings(
+            await self.client.aencode(CLIPEmbeddingModel.to_image_inputs(await self._preprocess_images([image])))
+        )
+
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of texts.
+
+        Args:
+            texts (List[str]): Input texts.
+
+        Returns:
+            np.ndarray: The text embeddings, one row per input text.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        return await self.client.aencode(list(texts), batch_size=self.embedding_model.text_batch_size)
+
+    async def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of images.
+
+        Args:
+            images (List[ImageInput]): Input images, as file paths, encoded bytes or PIL images.
+
+        Returns:
+            np.ndarray: The image embeddings, one row per input image.
+        """
+        if not images:
+            return np.empty((0, 0), dtype=np.float32)
+
+        return CLIPEmbeddingModel.to_embeddings(await self.client.aencode(
+            CLIPEmbeddingModel.to_image_inputs(await self._preprocess_images(images)),
+            batch_size=self.embedding_model.image_batch_size
+        ))
+
+    async def _preprocess_images(self, images: List[ImageInput]) -> List[ImageInput]:
+        """Shrink images off the event loop when preprocessing is enabled"""
+        if self.embedding_model.preprocessor is None:
+            return images
+
+        return await asyncio.to_thread(self.embedding_model.preprocess_images, images)
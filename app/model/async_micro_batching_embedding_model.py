@@ -0,0 +1,135 @@
+from interface import AsyncEmbeddingModel as AsyncEmbeddingModelInterface
+from typing import Awaitable, Callable, List
+import asyncio
+import numpy as np
+from utils import ImageInput
+
+class AsyncMicroBatchingEmbeddingModel(AsyncEmbeddingModelInterface):
+    """
+    Asyncio counterpart of MicroBatchingEmbeddingModel.
+
+    Concurrent embed_text/embed_image awaits are collected by a dispatcher
+    task per input kind and sent to the wrapped model as one batch of up to
+    max_batch_size items, or whatever arrived within max_wait_ms.
+    """
+
+    def __init__(
+        self,
+        embedding_model: AsyncEmbeddingModelInterface,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5,
+        max_in_flight_batches: int = 2
+    ):
+        self.embedding_model = embedding_model
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_in_flight_batches = max_in_flight_batches
+        # Queues and tasks are bound to the event loop that first uses them
+        self._queues = {}
+        self._dispatchers = {}
+        self._in_flight = None
+        self._batches = set()
+
+    def get_identity(self) -> str:
+        return self.embedding_model.get_identity()
+
+    async def embed_text(self, text: str) -> np.ndarray:
+        """
+        Extract an embedding from the text, batched with concurrent requests.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: The text embedding (feature vector).
+        """
+        return await self._submit('text', text)
+
+    async def embed_image(self, image: ImageInput) -> np.ndarray:
+        """
+        Extract an embedding from the image, batched with concurrent requests.
+
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
+
+        Returns:
+            np.ndarray: The image embedding (feature vector).
+        """
+        return await self._submit('image', image)
+
+    async def embed_texts(self, texts: List[str]) -> np.ndarray:
+        return await self.embedding_model.embed_texts(texts)
+
+    async def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        return await self.embedding_model.embed_images(images)
+
+    async def _submit(self, kind: str, value) -> np.ndarray:
+        """Queue one input and wait until its batch has been embedded."""
+        if kind not in self._dispatchers:
+            embed_batch = self.embedding_model.embed_texts if kind == 'text' else self.embedding_model.embed_images
+            self._in_flight = self._in_flight or asyncio.Semaphore(self.max_in_flight_batches)
+            self._queues[kind] = asyncio.Queue()
+            self._dispatchers[kind] = asyncio.create_task(self._dispatch(self._queues[kind], embed_batch))
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queues[kind].put((value, future))
+        return await future
+
+    async def _dispatch(self, input_queue: asyncio.Queue, embed_batch: Callable[[list], Awaitable[np.ndarray]]) -> None:
+        """
+        Collect batches from the queue forever and send each to the model.
+
+        Waiting for the next input uses one get() task that outlives the wait:
+        cancelling it on timeout, as wait_for does, can drop an input it has
+        already dequeued on Python < 3.12, leaving its request hanging.
+        """
+        loop = asyncio.get_running_loop()
+        getter = None
+
+        while True:
+            getter = getter or asyncio.ensure_future(input_queue.get())
+            batch = [await getter]
+            getter = None
+            deadline = loop.time() + self.max_wait_seconds
+            # While every slot is busy, requests keep piling up for this batch
+            await self._in_flight.acquire()
+
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(input_queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+
+                getter = asyncio.ensure_future(input_queue.get())
+                done, _ = await asyncio.wait({getter}, timeout=remaining)
+                if not done:
+                    # Left pending: whatever it dequeues starts the next batch
+                    break
+                batch.append(getter.result())
+                getter = None
+
+            task = asyncio.create_task(self._run_batch(batch, embed_batch))
+            # Keep a reference so the task is not garbage collected while running
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: list, embed_batch: Callable[[list], Awaitable[np.ndarray]]) -> None:
+        """Embed a batch and resolve the future of every request in it."""
+        try:
+            embeddings = np.asarray(await embed_batch([value for value, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._in_flight.release()
+
+        for row, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(embeddings[row:row + 1])
@@ -0,0 +1,140 @@
+from interface import AsyncVectorStorage as AsyncVectorStorageInterface
+from typing import Callable, List, Dict, Any
+import time
+import numpy as np
+from utils import RedisConnectionFactory
+from .redis_vector_storage import RedisVectorStorage
+
+class AsyncRedisVectorStorage(AsyncVectorStorageInterface):
+    """
+    Redis vector storage on the redis.asyncio client.
+
+    Queries, key ids and hash mappings are built by a wrapped
+    RedisVectorStorage, which also creates the index at startup, so both
+    clients always read and write the same schema. Searches go to the same
+    read replicas, sharing its replica choice and health tracking.
+    """
+
+    def __init__(self, vector_storage: RedisVectorStorage = None):
+        self.vector_storage = vector_storage or RedisVectorStorage()
+        self.redis_client = RedisConnectionFactory.get_async_client(self.vector_storage.endpoint)
+        self.read_clients = [
+            RedisConnectionFactory.get_async_client(endpoint, self.vector_storage.replica_retry_attempts)
+            for endpoint in self.vector_storage.replica_endpoints
+        ]
+        self.prefix = self.vector_storage.prefix
+        self.pipeline_chunk_size = self.vector_storage.pipeline_chunk_size
+
+    def normalize_filters(self, filters: Dict[str, Any]) -> Dict[str, List[str]]:
+        return self.vector_storage.normalize_filters(filters)
+
+    async def get_index_generation(self) -> int:
+        return int(await self.redis_client.get(self.vector_storage.generation_key) or 0)
+
+    def supports_ef_runtime(self) -> bool:
+        return self.vector_storage.supports_ef_runtime()
+
+    async def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store many records through a Redis pipeline, one round trip per chunk.
+
+        Each record holds 'textual_embedding' and 'visual_embedding' alongside its metadata.
+        """
+        key_ids = []
+
+        for start in range(0, len(records), self.pipeline_chunk_size):
+            chunk = records[start:start + self.pipeline_chunk_size]
+            pipeline = self.redis_client.pipeline(transaction=False)
+
+            for record in chunk:
+                key_id = self.vector_storage.make_key_id(record)
+                mapping = self.vector_storage._build_mapping(
+                    record['textual_embedding'],
+                    record['visual_embedding'],
+                    record
+                )
+                pipeline.hset(f"{self.prefix}:{key_id}", mapping=mapping)
+                key_ids.append(key_id)
+
+            pipeline.incr(self.vector_storage.generation_key)
+            await pipeline.execute()
+
+        return key_ids
+
+    async def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Perform KNN search on specified vector field and return top results with metadata.
+
+        ef_runtime overrides the HNSW candidate list size of this query only.
+        """
+        if query_vector is None:
+            return []
+
+        query = self.vector_storage.build_query(top_k, embedding_type, filters, ef_runtime)
+        search_args = self.vector_storage.build_search_args(query, query_vector)
+        reply = await self._read(lambda client: client.execute_command('FT.SEARCH', *search_args))
+
+        return self.vector_storage.parse_search_reply(reply)
+
+    async def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run one KNN search per query vector, pipelined in chunks of pipeline_chunk_size.
+        """
+        query = self.vector_storage.build_query(top_k, embedding_type, filters, ef_runtime)
+        results = []
+
+        for start in range(0, len(query_vectors), self.pipeline_chunk_size):
+            chunk = query_vectors[start:start + self.pipeline_chunk_size]
+
+            for reply in await self._read(lambda client: self._execute_searches(client, query, chunk)):
+                results.append(self.vector_storage.parse_search_reply(reply))
+
+        return results
+
+    async def _execute_searches(self, client, query, query_vectors: np.ndarray) -> list:
+        """
+        Send one FT.SEARCH per query vector in a single pipelined round trip.
+        """
+        pipeline = client.pipeline(transaction=False)
+        for query_vector in query_vectors:
+            pipeline.execute_command('FT.SEARCH', *self.vector_storage.build_search_args(query, query_vector))
+
+        return await pipeline.execute()
+
+    async def _read(self, command: Callable):
+        """
+        Run a read command on a replica, falling back to the primary if the replica fails.
+        """
+        index = self.vector_storage.choose_read_replica()
+        if index is None:
+            return await command(self.redis_client)
+
+        health = self.vector_storage.replica_health[index]
+        start_time = time.perf_counter()
+        try:
+            result = await command(self.read_clients[index])
+        except RedisVectorStorage.REPLICA_ERRORS as err:
+            health.record_failure(err)
+            return await command(self.redis_client)
+
+        health.record_success(time.perf_counter() - start_time)
+        return result
+
+    async def close(self) -> None:
+        await self.redis_client.aclose(close_connection_pool=False)
+        for client in self.read_clients:
+            await client.aclose(close_connection_pool=False)
@@ -0,0 +1,309 @@
+import asyncio
+import numpy as np
+from interface import AsyncEmbeddingModel as AsyncEmbeddingModelInterface
+from interface import AsyncVectorStorage as AsyncVectorStorageInterface
+from utils import ImageInput, LRUCache, RankFusion, SearchMetrics
+
+class AsyncSearchSystem():
+    """Asyncio counterpart of SearchSystem, used by the ASGI app"""
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(AsyncSearchSystem, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(
+        self,
+        vector_storage: AsyncVectorStorageInterface = None,
+        textual_embedding_model: AsyncEmbeddingModelInterface = None,
+        visual_embedding_model: AsyncEmbeddingModelInterface = None,
+        query_embedding_cache: LRUCache = None,
+        result_cache: LRUCache = None,
+        hybrid_config: dict = None
+    ):
+        if not hasattr(self, '_initialized'):
+            self.textual_embedding_model = textual_embedding_model
+            self.visual_embedding_model = visual_embedding_model
+            self.vector_storage = vector_storage
+            self.query_embedding_cache = query_embedding_cache
+            self.result_cache = result_cache
+            self.hybrid_config = hybrid_config or {}
+            self.metrics = SearchMetrics()
+            # Index generation the cached results were computed at
+            self._result_generation = None
+            self._initialized = True
+
+    @classmethod
+    def get_instance(cls):
+        """Get the singleton instance of AsyncSearchSystem"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def insert_records(self, records: list[dict]) -> list[str]:
+        """Embed and insert many records into the vector storage in bulk"""
+        if not records:
+            return []
+
+        textual_embeddings, visual_embeddings = await asyncio.gather(
+            self.embed_texts([record['caption'] for record in records]),
+            self.embed_images([record['image_path'] for record in records])
+        )
+
+        embedded_records = [
+            dict(record, textual_embedding=textual_embedding, visual_embedding=visual_embedding)
+            for record, textual_embedding, visual_embedding
+            in zip(records, textual_embeddings, visual_embeddings)
+        ]
+
+        try:
+            return await self.vector_storage.insert_many(embedded_records)
+        except Exception as e:
+            print(f"Error inserting records: {e}")
+        finally:
+            self.invalidate_results()
+
+        return []
+
+    async def embed_image(self, image: ImageInput) -> np.ndarray:
+        with self.metrics.stage_seconds.time(stage='embed'):
+            return await self.visual_embedding_model.embed_image(image)
+
+    async def embed_text(self, text: str) -> np.ndarray:
+        with self.metrics.stage_seconds.time(stage='embed'):
+            return await self.textual_embedding_model.embed_text(text)
+
+    async def embed_images(self, images: list[ImageInput]) -> np.ndarray:
+        with self.metrics.stage_seconds.time(stage='embed'):
+            return await self.visual_embedding_model.embed_images(images)
+
+    async def embed_texts(self, texts: list[str]) -> np.ndarray:
+        with self.metrics.stage_seconds.time(stage='embed'):
+            return await self.textual_embedding_model.embed_texts(texts)
+
+    async def embed_query_text(self, query: str) -> np.ndarray:
+        """Embed a text query, reusing the embedding of recently seen queries"""
+        if self.query_embedding_cache is None:
+            return await self.embed_text(query)
+
+        embedding = self.query_embedding_cache.get(query)
+        if embedding is None:
+            embedding = await self.embed_text(query)
+            self.query_embedding_cache.put(query, embedding)
+
+        return embedding
+
+    async def embed_query_texts(self, queries: list[str]) -> np.ndarray:
+        """Embed many text queries in one model call, skipping recently seen queries"""
+        if self.query_embedding_cache is None:
+            return await self.embed_texts(queries)
+
+        embeddings = [self.query_embedding_cache.get(query) for query in queries]
+        missing = list(dict.fromkeys(
+            query for query, embedding in zip(queries, embeddings) if embedding is None
+        ))
+
+        if missing:
+            computed = dict(zip(missing, await self.embed_texts(missing)))
+            for query, embedding in computed.items():
+                self.query_embedding_cache.put(query, embedding.reshape(1, -1))
+
+            embeddings = [
+                computed[query].reshape(1, -1) if embedding is None else embedding
+                for query, embedding in zip(queries, embeddings)
+            ]
+
+        return np.vstack(embeddings)
+
+    def invalidate_results(self):
+        """Drop cached search results after the index changed"""
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    async def _check_result_generation(self):
+        """Read the index generation, dropping cached results computed before the index changed
+
+        The generation moves on with every write and rebuild, including those
+        of other processes such as the import pipeline.
+        """
+        if self.result_cache is None:
+            return None
+
+        generation = await self.vector_storage.get_index_generation()
+        if generation != self._result_generation:
+            self.result_cache.clear()
+            self._result_generation = generation
+
+        return generation
+
+    def _result_key(
+        self,
+        query: str,
+        top_k: int,
+        embedding_type: str,
+        filters: dict = None,
+        ef_runtime: int = None,
+        generation=None
+    ) -> tuple:
+        """Build a hashable result cache key, independent of the order of filter values"""
+        filters_key = tuple(sorted(
+            (field, tuple(sorted(values)))
+            for field, values in self.vector_storage.normalize_filters(filters).items()
+        ))
+        return (query, top_k, embedding_type, filters_key, ef_runtime, generation)
+
+    @staticmethod
+    def _search_options(ef_runtime: int = None) -> dict:
+        """Per-query storage options, passed only when set since only HNSW storages accept them"""
+        return {'ef_runtime': ef_runtime} if ef_runtime else {}
+
+    def get_cache_stats(self) -> dict:
+        """Get hit/miss counters of the in-process query caches"""
+        return {
+            'query_embedding_cache': self.query_embedding_cache.stats() if self.query_embedding_cache else None,
+            'result_cache': self.result_cache.stats() if self.result_cache else None,
+        }
+
+    async def image_search(self, image: ImageInput, top_k: int = 10, filters: dict = None, ef_runtime: int = None) -> list[dict]:
+        try:
+            query_visual_embedding = await self.embed_image(image)
+            with self.metrics.stage_seconds.time(stage='knn'):
+                return await self.vector_storage.search(
+                    query_visual_embedding, top_k, 'visual', filters, **self._search_options(ef_runtime)
+                )
+        except Exception as e:
+            print(f"Error recommending products: {e}")
+            self.metrics.errors.inc(operation='image_search')
+
+        return []
+
+    async def text_search(self, query: str, top_k: int = 10, filters: dict = None, ef_runtime: int = None) -> list[dict]:
+        try:
+            generation = await self._check_result_generation()
+            result_key = self._result_key(query, top_k, 'textual', filters, ef_runtime, generation)
+            if self.result_cache is not None:
+                cached_recommendations = self.result_cache.get(result_key)
+                if cached_recommendations is not None:
+                    return list(cached_recommendations)
+
+            query_textual_embedding = await self.embed_query_text(query)
+            with self.metrics.stage_seconds.time(stage='knn'):
+                recommendations = await self.vector_storage.search(
+                    query_textual_embedding, top_k, 'textual', filters, **self._search_options(ef_runtime)
+                )
+
+            if self.result_cache is not None:
+                self.result_cache.put(result_key, list(recommendations))
+
+            return recommendations
+
+        except Exception as e:
+            print(f"Error recommending products: {e}")
+            self.metrics.errors.inc(operation='text_search')
+
+        return []
+
+    async def image_search_many(self, images: list[ImageInput], top_k: int = 10, filters: dict = None, ef_runtime: int = None) -> list[list[dict]]:
+        """Search for many images with one batched embedding call and one batched KNN call"""
+        self.metrics.batch_size.observe(len(images), query_type='image')
+        try:
+            query_visual_embeddings = await self.embed_images(images)
+            with self.metrics.stage_seconds.time(stage='knn'):
+                return await self.vector_storage.search_many(
+                    query_visual_embeddings, top_k, 'visual', filters, **self._search_options(ef_runtime)
+                )
+        except Exception as e:
+            print(f"Error recommending products: {e}")
+            self.metrics.errors.inc(operation='image_search_many')
+
+        return [[] for _ in images]
+
+    async def text_search_many(self, queries: list[str], top_k: int = 10, filters: dict = None, ef_runtime: int = None) -> list[list[dict]]:
+        """Search for many text queries with one batched embedding call and one batched KNN call"""
+        self.metrics.batch_size.observe(len(queries), query_type='text')
+        try:
+            recommendations = [None] * len(queries)
+            generation = await self._check_result_generation()
+            if self.result_cache is not None:
+                for index, query in enumerate(queries):
+                    cached_recommendations = self.result_cache.get(self._result_key(query, top_k, 'textual', filters, ef_runtime, generation))
+                    if cached_recommendations is not None:
+                        recommendations[index] = list(cached_recommendations)
+
+            pending = [index for index, result in enumerate(recommendations) if result is None]
+            if not pending:
+                return recommendations
+
+            query_textual_embeddings = await self.embed_query_texts([queries[index] for index in pending])
+            with self.metrics.stage_seconds.time(stage='knn'):
+                pending_recommendations = await self.vector_storage.search_many(
+                    query_textual_embeddings, top_k, 'textual', filters, **self._search_options(ef_runtime)
+                )
+
+            for index, result in zip(pending, pending_recommendations):
+                recommendations[index] = result
+                if self.result_cache is not None:
+                    self.result_cache.put(self._result_key(queries[index], top_k, 'textual', filters, ef_runtime, generation), list(result))
+
+            return recommendations
+
+        except Exception as e:
+            print(f"Error recommending products: {e}")
+            self.metrics.errors.inc(operation='text_search_many')
+
+        return [[] for _ in queries]
+
+    async def hybrid_text_search(self, query: str, top_k: int = 10, filters: dict = None, ef_runtime: int = None) -> list[dict]:
+        """Search both embedding fields with a text query and fuse the rankings"""
+        try:
+            generation = await self._check_result_generation()
+            result_key = self._result_key(query, top_k, 'hybrid', filters, ef_runtime, generation)
+            if self.result_cache is not None:
+                cached_recommendations = self.result_cache.get(result_key)
+                if cached_recommendations is not None:
+                    return list(cached_recommendations)
+
+            recommendations = await self.hybrid_search(await self.embed_query_text(query), top_k, filters, ef_runtime)
+
+            if self.result_cache is not None:
+                self.result_cache.put(result_key, list(recommendations))
+
+            return recommendations
+
+        except Exception as e:
+            print(f"Error recommending products: {e}")
+            self.metrics.errors.inc(operation='hybrid_text_search')
+
+        return []
+
+    async def hybrid_image_search(self, image: ImageInput, top_k: int = 10, filters: dict = None, ef_runtime: int = None) -> list[dict]:
+        """Search both embedding fields with an image query and fuse the rankings"""
+        try:
+            return await self.hybrid_search(await self.embed_image(image), top_k, filters, ef_runtime)
+        except Exception as e:
+            print(f"Error recommending products: {e}")
+            self.metrics.errors.inc(operation='hybrid_image_search')
+
+        return []
+
+    async def hybrid_search(self, query_embedding: np.ndarray, top_k: int = 10, filters: dict = None, ef_runtime: int = None) -> list[dict]:
+        """Run the textual and visual KNN queries concurrently, over-fetching, and fuse them"""
+        candidates = top_k * self.hybrid_config.get('overfetch', 3)
+        weights = [
+            self.hybrid_config.get('textual_weight', 0.5),
+            self.hybrid_config.get('visual_weight', 0.5),
+        ]
+
+        with self.metrics.stage_seconds.time(stage='knn'):
+            result_lists = list(await asyncio.gather(
+                self.vector_storage.search(query_embedding, candidates, 'textual', filters, **self._search_options(ef_runtime)),
+                self.vector_storage.search(query_embedding, candidates, 'visual', filters, **self._search_options(ef_runtime))
+            ))
+
+        if self.hybrid_config.get('fusion', 'rrf') == 'weighted':
+            return RankFusion.weighted_score(result_lists, weights, top_k)
+
+        return RankFusion.reciprocal_rank(
+            result_lists, weights, top_k, self.hybrid_config.get('rrf_k', 60)
+        )
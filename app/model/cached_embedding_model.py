@@ -0,0 +1,123 @@
+from interface import EmbeddingModel as EmbeddingModelInterface
+from typing import Callable, List
+import hashlib
+import unicodedata
+import numpy as np
+from PIL import Image
+from utils import ImageHelper, ImageInput
+from .sqlite_embedding_cache import SQLiteEmbeddingCache
+
+class CachedEmbeddingModel(EmbeddingModelInterface):
+    """
+    Embedding model decorator that serves repeated inputs from a persistent cache.
+
+    Keys are a hash of the model identity plus the normalized text or the raw
+    image bytes, so the cache survives renames and re-imports and is never
+    shared between different models.
+    """
+
+    def __init__(self, embedding_model: EmbeddingModelInterface, cache: SQLiteEmbeddingCache):
+        self.embedding_model = embedding_model
+        self.cache = cache
+
+    def get_identity(self) -> str:
+        return self.embedding_model.get_identity()
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """
+        Extract an embedding from the text, using the cache when possible.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: The text embedding (feature vector).
+        """
+        return self.embed_texts([text])
+
+    def embed_image(self, image: ImageInput) -> np.ndarray:
+        """
+        Extract an embedding from the image, using the cache when possible.
+
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
+
+        Returns:
+            np.ndarray: The image embedding (feature vector).
+        """
+        return self.embed_images([image])
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of texts, only sending cache misses to the model.
+
+        Args:
+            texts (List[str]): Input texts.
+
+        Returns:
+            np.ndarray: The text embeddings, one row per input text.
+        """
+        keys = [self._text_key(text) for text in texts]
+        return self._embed_cached(keys, texts, self.embedding_model.embed_texts)
+
+    def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of images, only sending cache misses to the model.
+
+        Args:
+            images (List[ImageInput]): Input images, as file paths, encoded bytes or PIL images.
+
+        Returns:
+            np.ndarray: The image embeddings, one row per input image.
+        """
+        keys = [self._image_key(image) for image in images]
+        return self._embed_cached(keys, images, self.embedding_model.embed_images)
+
+    def _embed_cached(self, keys: List[str], inputs: list, embed_batch: Callable[[list], np.ndarray]) -> np.ndarray:
+        """Resolve a batch from the cache and embed the misses in one model call."""
+        if not inputs:
+            return embed_batch([])
+
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, value in zip(keys, inputs):
+            if key not in cached and key not in missing:
+                missing[key] = value
+
+        if missing:
+            embeddings = np.asarray(embed_batch(list(missing.values())), dtype=np.float32)
+            computed = dict(zip(missing.keys(), embeddings))
+            self.cache.put_many(computed)
+            cached.update(computed)
+
+        return np.stack([cached[key] for key in keys])
+
+    def _text_key(self, text: str) -> str:
+        return self.text_key(self.get_identity(), text)
+
+    def _image_key(self, image: ImageInput) -> str:
+        return self.image_key(self.get_identity(), image)
+
+    @staticmethod
+    def text_key(identity: str, text: str) -> str:
+        """Cache key of a text, after NFC and whitespace normalization"""
+        normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+        return CachedEmbeddingModel.hash_key(identity, 'text', normalized.encode('utf-8'))
+
+    @staticmethod
+    def image_key(identity: str, image: ImageInput) -> str:
+        """Cache key of an image, from its file bytes, or its pixels for a PIL image"""
+        if isinstance(image, Image.Image):
+            header = f"{image.mode}:{image.width}x{image.height}:".encode('utf-8')
+            return CachedEmbeddingModel.hash_key(identity, 'pixels', header + image.tobytes())
+
+        return CachedEmbeddingModel.hash_key(identity, 'image', ImageHelper.to_bytes(image))
+
+    @staticmethod
+    def hash_key(identity: str, kind: str, payload: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(identity.encode('utf-8'))
+        digest.update(b'\0' + kind.encode('utf-8') + b'\0')
+        digest.update(payload)
+        return digest.hexdigest()
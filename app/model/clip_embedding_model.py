@@ -1,8 +1,10 @@
 from interface import EmbeddingModel as EmbeddingModelInterface
 from clip_client import Client
+from docarray import Document
+from typing import List
 import numpy as np
 import yaml
-from utils import PathHelper
+from utils import PathHelper, ImageHelper, ImageInput, ImagePreprocessor
 
 class CLIPEmbeddingModel(EmbeddingModelInterface):
     def __init__(self):
@@ -13,6 +15,28 @@ class CLIPEmbeddingModel(EmbeddingModelInterface):
         
         server_url = f"{config['server']['host']}:{config['server']['port']}"
         self.client = Client(server_url)
+        self.model_name = config['server'].get('model_name', 'ViT-B-32::openai')
+
+        batch_config = config.get('batch') or {}
+        self.text_batch_size = batch_config.get('text_batch_size', 256)
+        self.image_batch_size = batch_config.get('image_batch_size', 32)
+
+        self.preprocessor = None
+        preprocessing_config = config.get('preprocessing') or {}
+        if preprocessing_config.get('enabled', False):
+            self.preprocessor = ImagePreprocessor(
+                preprocessing_config.get('size', 224),
+                preprocessing_config.get('jpeg_quality', 90),
+                preprocessing_config.get('workers', 4),
+                preprocessing_config.get('executor', 'thread')
+            )
+
+    def get_identity(self) -> str:
+        # Re-encoded inputs give slightly different embeddings, so they are cached apart
+        if self.preprocessor is not None:
+            return f"clip:{self.model_name}:preprocessed{self.preprocessor.size}"
+
+        return f"clip:{self.model_name}"
 
     def embed_text(self, text: str) -> np.ndarray:
         """
@@ -26,14 +50,76 @@ class CLIPEmbeddingModel(EmbeddingModelInterface):
         """
         return self.client.encode([text])
 
-    def embed_image(self, image_path: str) -> np.ndarray:
+    def embed_image(self, image: ImageInput) -> np.ndarray:
         """
         Extract an embedding from the image.
 
         Args:
-            image_path (str): Input image path.
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
 
         Returns:
             np.ndarray: The image embedding (feature vector).
         """
-        return self.client.encode([image_path])
+        return self.to_embeddings(self.client.encode(self.to_image_inputs(self.preprocess_images([image]))))
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of texts.
+
+        Args:
+            texts (List[str]): Input texts.
+
+        Returns:
+            np.ndarray: The text embeddings, one row per input text.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        return self.client.encode(list(texts), batch_size=self.text_batch_size)
+
+    def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        """
+        Extract embeddings from a batch of images.
+
+        Args:
+            images (List[ImageInput]): Input images, as file paths, encoded bytes or PIL images.
+
+        Returns:
+            np.ndarray: The image embeddings, one row per input image.
+        """
+        if not images:
+            return np.empty((0, 0), dtype=np.float32)
+
+        return self.to_embeddings(self.client.encode(
+            self.to_image_inputs(self.preprocess_images(images)),
+            batch_size=self.image_batch_size
+        ))
+
+    def preprocess_images(self, images: List[ImageInput]) -> List[ImageInput]:
+        """Shrink images to the model input resolution when preprocessing is enabled"""
+        if self.preprocessor is None:
+            return images
+
+        return self.preprocessor.process_many(images)
+
+    @staticmethod
+    def to_image_inputs(images: List[ImageInput]) -> list:
+        """
+        Convert images to clip_client inputs.
+
+        Paths are sent as strings. In-memory images are sent as blob Documents,
+        which makes clip_client return Documents, so paths in a mixed batch are
+        sent as uri Documents too.
+        """
+        if all(ImageHelper.is_path(image) for image in images):
+            return [str(image) for image in images]
+
+        return [
+            Document(uri=str(image)) if ImageHelper.is_path(image) else Document(blob=ImageHelper.to_bytes(image))
+            for image in images
+        ]
+
+    @staticmethod
+    def to_embeddings(result) -> np.ndarray:
+        """Get the embedding matrix of an encode result, a matrix or a DocumentArray"""
+        return result if isinstance(result, np.ndarray) else result.embeddings
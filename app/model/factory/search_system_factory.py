@@ -1,5 +1,5 @@
 from model import *
-from utils import PathHelper
+from utils import PathHelper, LRUCache
 import yaml
 
 class SearchSystemFactory:
@@ -13,11 +13,107 @@ class SearchSystemFactory:
         type = self.config['type']
         match type:
             case 'default':
-                redis_vector_storage = RedisVectorStorage()
-                clip_embedding_model = CLIPEmbeddingModel()
-
-                return SearchSystem(
-                    redis_vector_storage,
-                    clip_embedding_model, 
-                    clip_embedding_model
-                )
+                return self._create_search_system(RedisVectorStorage())
+            case 'local':
+                return self._create_search_system(NumpyVectorStorage())
+            case 'ivf':
+                return self._create_search_system(IVFVectorStorage())
+            case 'pq':
+                return self._create_search_system(PQVectorStorage())
+            case 'sharded':
+                return self._create_search_system(ShardedVectorStorage())
+
+    def create_async(self):
+        """Create the asyncio search system served by the ASGI app"""
+        type = self.config['type']
+        match type:
+            case 'default':
+                return self._create_async_search_system(AsyncRedisVectorStorage())
+            case 'local':
+                return self._create_async_search_system(ThreadedAsyncVectorStorage(NumpyVectorStorage()))
+            case 'ivf':
+                return self._create_async_search_system(ThreadedAsyncVectorStorage(IVFVectorStorage()))
+            case 'pq':
+                return self._create_async_search_system(ThreadedAsyncVectorStorage(PQVectorStorage()))
+            case 'sharded':
+                return self._create_async_search_system(ThreadedAsyncVectorStorage(ShardedVectorStorage()))
+
+    def _create_search_system(self, vector_storage):
+        """Assemble the search system around a vector storage backend"""
+        clip_embedding_model = self._with_micro_batching(
+            self._with_embedding_cache(CLIPEmbeddingModel()),
+            MicroBatchingEmbeddingModel
+        )
+
+        return SearchSystem(
+            vector_storage,
+            clip_embedding_model, 
+            clip_embedding_model,
+            self._create_lru_cache('query_cache'),
+            self._create_lru_cache('result_cache'),
+            self.config.get('hybrid')
+        )
+
+    def _create_async_search_system(self, vector_storage):
+        """Assemble the asyncio search system around an async vector storage backend"""
+        clip_embedding_model = AsyncCLIPEmbeddingModel()
+        cache = self._create_embedding_cache()
+        if cache is not None:
+            clip_embedding_model = AsyncCachedEmbeddingModel(clip_embedding_model, cache)
+        clip_embedding_model = self._with_micro_batching(clip_embedding_model, AsyncMicroBatchingEmbeddingModel)
+
+        return AsyncSearchSystem(
+            vector_storage,
+            clip_embedding_model,
+            clip_embedding_model,
+            self._create_lru_cache('query_cache'),
+            self._create_lru_cache('result_cache'),
+            self.config.get('hybrid')
+        )
+
+    def _with_embedding_cache(self, embedding_model):
+        """Wrap the embedding model with the persistent cache when it is enabled"""
+        cache = self._create_embedding_cache()
+        if cache is None:
+            return embedding_model
+
+        return CachedEmbeddingModel(embedding_model, cache)
+
+    def _with_micro_batching(self, embedding_model, micro_batching_class):
+        """Wrap the embedding model with a micro-batcher when it is enabled
+
+        The batcher sits in front of the embedding cache, so a merged batch
+        only sends its cache misses to the model.
+        """
+        batching_config = self.config.get('micro_batching') or {}
+        if not batching_config.get('enabled', False):
+            return embedding_model
+
+        return micro_batching_class(
+            embedding_model,
+            batching_config.get('max_batch_size', 32),
+            batching_config.get('max_wait_ms', 5),
+            batching_config.get('max_in_flight_batches', 2)
+        )
+
+    def _create_embedding_cache(self):
+        """Open the persistent embedding cache, if enabled"""
+        cache_config = self.config.get('embedding_cache') or {}
+        if not cache_config.get('enabled', False):
+            return None
+
+        return SQLiteEmbeddingCache(
+            PathHelper.get_project_root() / 'app' / cache_config['path'],
+            int(cache_config.get('max_size_mb', 1024) * 1024 * 1024)
+        )
+
+    def _create_lru_cache(self, name):
+        """Create an in-process LRU cache from its config section, if enabled"""
+        cache_config = self.config.get(name) or {}
+        if not cache_config.get('enabled', False):
+            return None
+
+        return LRUCache(
+            cache_config.get('max_size', 1000),
+            cache_config.get('ttl_seconds')
+        )
@@ -0,0 +1,385 @@
+from typing import List, Dict, Any
+import threading
+import numpy as np
+from utils import PathHelper, IndexSnapshot, IndexSnapshotWriter, TagIndex, KMeans, InvertedLists
+from .local_vector_storage import LocalVectorStorage
+
+class IVFVectorStorage(LocalVectorStorage):
+    """
+    In-process approximate vector storage using an inverted-file (IVF) index per embedding field.
+
+    Each field's vectors are bucketed by their nearest of nlist k-means
+    centroids, every bucket a contiguous block (InvertedLists). A query
+    only scans the nprobe lists whose centroids are closest to it, so its
+    cost grows with nprobe * N / nlist instead of N.
+
+    Until min_train_size records are stored, everything lives in a single
+    list and search is exact. The centroids are then trained once, by the
+    insert crossing that size, without blocking searches; later inserts are
+    assigned to the nearest existing centroid, and train() can be called
+    again to refit them after the data has drifted.
+    """
+
+    CENTROIDS_FILE = 'ivf.{field}.centroids.npy'
+    LABELS_FILE = 'ivf.{field}.lists.npy'
+
+    def __init__(self, config_overrides: Dict[str, Any] = None):
+        config = self.load_config('ivf_config.yaml', 'ivf', config_overrides)
+
+        self.vector_dim = config['vector_dim']
+        self.distance_metric = config['distance_metric'].lower()
+        self.nlist = config.get('nlist', 1024)
+        self.nprobe = config.get('nprobe', 16)
+        self.min_train_size = config.get('min_train_size', 20000)
+        self.train_sample_size = config.get('train_sample_size', 100000)
+        self.kmeans_iterations = config.get('kmeans_iterations', 20)
+        self.brute_force_threshold = config.get('brute_force_threshold', 4096)
+
+        self._lock = threading.Lock()
+        # Rows inserted or updated while train() runs, None when not training
+        self._changed_rows = None
+        # Bumped whenever the contents are replaced, so a training run started before is discarded
+        self._generation = 0
+        self._reset()
+
+        snapshot_path = config.get('snapshot_path')
+        if snapshot_path:
+            self.load_snapshot(PathHelper.get_project_root() / 'app' / snapshot_path)
+
+    def _reset(self) -> None:
+        """
+        Drop every record and go back to a single untrained list per field.
+        """
+        self._generation += 1
+        self._index_generation += 1
+        self.count = 0
+        self.keys = []
+        self.metadata = []
+        self.key_index = {}
+        self.tag_index = TagIndex(self.FILTER_FIELDS)
+        self.trained = False
+        self.centroids = {field: np.zeros((1, self.vector_dim), dtype=np.float32) for field in self.FIELDS}
+        self.lists = {field: InvertedLists(1, self.vector_dim) for field in self.FIELDS}
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store many records, assigning each vector to the list of its nearest centroid.
+
+        Each record holds 'textual_embedding' and 'visual_embedding' alongside its metadata.
+        """
+        if not records:
+            return []
+
+        vectors = {
+            field: np.stack([
+                np.asarray(record[f"{field}_embedding"], dtype=np.float32).reshape(self.vector_dim)
+                for record in records
+            ])
+            for field in self.FIELDS
+        }
+        key_ids = []
+
+        with self._lock:
+            labels = {field: self._assign(vectors[field], self.centroids[field]) for field in self.FIELDS}
+
+            for index, record in enumerate(records):
+                key_id, row = self._store_record(record)
+
+                for field in self.FIELDS:
+                    vector = vectors[field][index]
+                    self.lists[field].add(row, labels[field][index], vector, np.dot(vector, vector))
+
+                key_ids.append(key_id)
+
+            needs_training = not self.trained and self._changed_rows is None and self.count >= self.min_train_size
+
+        if needs_training:
+            self.train()
+
+        return key_ids
+
+    def train(self) -> None:
+        """
+        Fit the coarse centroids on the stored vectors and re-bucket every row.
+
+        K-means runs on a copy of the vectors without holding the lock, so
+        searches and inserts go on meanwhile against the current lists, at the
+        cost of a second copy of the vectors in memory. Rows inserted or
+        updated during training are assigned when the new lists are swapped in.
+        A call while another training runs returns at once.
+        """
+        with self._lock:
+            if self._changed_rows is not None:
+                return
+            self._changed_rows = set()
+            generation = self._generation
+            count = self.count
+            vectors = {field: self.lists[field].gather(np.arange(count))[0] for field in self.FIELDS}
+
+        try:
+            centroids = {}
+            labels = {}
+            for field in self.FIELDS:
+                centroids[field] = KMeans.fit(
+                    self._coarse_vectors(vectors[field]),
+                    self.nlist,
+                    self.kmeans_iterations,
+                    self.train_sample_size
+                )
+                labels[field] = self._assign(vectors[field], centroids[field])
+            del vectors
+
+            with self._lock:
+                if generation != self._generation:
+                    return
+
+                rows = np.arange(self.count)
+                stale = np.array(sorted(self._changed_rows | set(range(count, self.count))), dtype=np.int64)
+
+                for field in self.FIELDS:
+                    field_vectors, squared_norms = self.lists[field].gather(rows)
+                    field_labels = np.empty(self.count, dtype=np.int64)
+                    field_labels[:count] = labels[field]
+                    if len(stale):
+                        field_labels[stale] = self._assign(field_vectors[stale], centroids[field])
+
+                    self.centroids[field] = centroids[field]
+                    self.lists[field] = InvertedLists.build(
+                        len(centroids[field]), field_vectors, squared_norms, field_labels
+                    )
+
+                self.trained = True
+                self._index_generation += 1
+        finally:
+            with self._lock:
+                self._changed_rows = None
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        nprobe: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Perform approximate KNN search on specified vector field and return top results with metadata.
+
+        nprobe overrides the number of lists scanned for this query only.
+        """
+        if query_vector is None:
+            return []
+
+        return self.search_many(np.asarray(query_vector).reshape(1, -1), top_k, embedding_type, filters, nprobe)[0]
+
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        nprobe: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Perform approximate KNN search for many queries, scoring each probed list once for all queries probing it.
+
+        Filters small enough to scan (brute_force_threshold) are searched exactly.
+        """
+        field = 'textual' if embedding_type == 'textual' else 'visual'
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        filters = self.normalize_filters(filters)
+
+        if top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        with self._lock:
+            count = self.count
+            metadata = self.metadata
+            keys = self.keys
+
+            mask = None
+            exact = None
+            if filters:
+                row_ids = self.tag_index.rows(filters, count)
+                if len(row_ids) <= self.brute_force_threshold:
+                    exact = (*self.lists[field].gather(row_ids), row_ids)
+                else:
+                    mask = np.zeros(count, dtype=bool)
+                    mask[row_ids] = True
+
+            # Only the probed lists are handed out; they are copy-on-write, so they can be scored unlocked
+            if exact is None and count:
+                probes = self._select_probes(queries, self.centroids[field], nprobe or self.nprobe)
+                blocks = {int(list_id): self.lists[field].block(list_id) for list_id in np.unique(probes)}
+
+        if count == 0:
+            return [[] for _ in range(len(queries))]
+
+        if exact is not None:
+            vectors, squared_norms, row_ids = exact
+            distances = self._distances(queries @ vectors.T, squared_norms, queries)
+            candidates = [[(query_distances, row_ids)] for query_distances in distances]
+        else:
+            candidates = self._probe(queries, probes, blocks, mask)
+
+        results = []
+        for query_candidates in candidates:
+            distances = np.concatenate([distances for distances, _ in query_candidates])
+            rows = np.concatenate([rows for _, rows in query_candidates])
+            k = min(top_k, len(rows))
+            if k == 0:
+                results.append([])
+                continue
+
+            best = np.argpartition(distances, k - 1)[:k]
+            best = best[np.argsort(distances[best])]
+            results.append(self._format_results(rows[best], distances[best], metadata, keys))
+
+        return results
+
+    def _select_probes(self, queries: np.ndarray, centroids: np.ndarray, nprobe: int) -> np.ndarray:
+        """
+        Find the nprobe lists whose centroids are nearest to each query.
+
+        Returns:
+            np.ndarray: The (queries x nprobe) list ids.
+        """
+        nprobe = min(nprobe, len(centroids))
+        coarse = self._coarse_vectors(queries)
+        centroid_distances = np.einsum('ij,ij->i', centroids, centroids)[None, :] - 2 * coarse @ centroids.T
+        return np.argpartition(centroid_distances, nprobe - 1, axis=1)[:, :nprobe]
+
+    def _probe(
+        self,
+        queries: np.ndarray,
+        probes: np.ndarray,
+        blocks: Dict[int, tuple],
+        mask: np.ndarray
+    ) -> List[list]:
+        """
+        Score the probed lists of every query, each list once for all queries probing it.
+
+        Returns:
+            List[list]: Per query, the (distances, rows) pairs of its probed lists.
+        """
+        nprobe = probes.shape[1]
+        candidates = [[] for _ in range(len(queries))]
+        flat_probes = probes.ravel()
+        order = np.argsort(flat_probes, kind='stable')
+        list_ids = sorted(blocks)
+        bounds = np.searchsorted(flat_probes[order], list_ids + [list_ids[-1] + 1])
+
+        for index, list_id in enumerate(list_ids):
+            query_ids = order[bounds[index]:bounds[index + 1]] // nprobe
+            if len(query_ids) == 0:
+                continue
+
+            vectors, squared_norms, rows = blocks[list_id]
+            if mask is not None:
+                selected = mask[rows]
+                vectors, squared_norms, rows = vectors[selected], squared_norms[selected], rows[selected]
+            if len(rows) == 0:
+                continue
+
+            list_queries = queries[query_ids]
+            distances = self._distances(list_queries @ vectors.T, squared_norms, list_queries)
+            for query_id, query_distances in zip(query_ids, distances):
+                candidates[query_id].append((query_distances, rows))
+
+        return [
+            query_candidates or [(np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64))]
+            for query_candidates in candidates
+        ]
+
+    def export_snapshot(self, path: str) -> int:
+        """
+        Write the stored records to an IndexSnapshot directory, along with the trained centroids
+        and list assignments so that loading it needs no retraining.
+        """
+        with self._lock:
+            count = self.count
+            writer = IndexSnapshotWriter(path, self.vector_dim)
+            chunk_size = 10000
+
+            for start in range(0, count, chunk_size):
+                rows = np.arange(start, min(start + chunk_size, count))
+                writer.append(
+                    [self.keys[row] for row in rows],
+                    self.lists['textual'].gather(rows)[0],
+                    self.lists['visual'].gather(rows)[0],
+                    [self.metadata[row] for row in rows]
+                )
+
+            if self.trained:
+                for field in self.FIELDS:
+                    np.save(writer.tmp_path / self.CENTROIDS_FILE.format(field=field), self.centroids[field])
+                    np.save(writer.tmp_path / self.LABELS_FILE.format(field=field), self.lists[field].assignments[:count])
+
+        writer.close()
+        return count
+
+    def load_snapshot(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Replace the current contents with an IndexSnapshot.
+
+        Snapshots exported by this storage carry their centroids and list
+        assignments, so the lists are rebuilt in one pass over the vectors.
+        Any other snapshot is inserted record by record and trained as usual.
+        """
+        snapshot = IndexSnapshot(path)
+        if snapshot.vector_dim != self.vector_dim:
+            raise ValueError(f"Snapshot dimension {snapshot.vector_dim} does not match {self.vector_dim}")
+
+        trained = all(
+            (snapshot.path / self.CENTROIDS_FILE.format(field=field)).exists()
+            for field in self.FIELDS
+        )
+        if not trained:
+            with self._lock:
+                self._reset()
+            return super().load_snapshot(path, batch_size)
+
+        centroids = {}
+        lists = {}
+        for field in self.FIELDS:
+            centroids[field] = np.load(snapshot.path / self.CENTROIDS_FILE.format(field=field))
+            labels = np.load(snapshot.path / self.LABELS_FILE.format(field=field))
+            lists[field] = InvertedLists.build(
+                len(centroids[field]),
+                snapshot.vectors[field],
+                snapshot.squared_norms[field],
+                labels
+            )
+
+        keys = list(snapshot.keys)
+        metadata = list(snapshot.metadata)
+
+        with self._lock:
+            self._generation += 1
+            self._index_generation += 1
+            self.centroids = centroids
+            self.lists = lists
+            self.keys = keys
+            self.metadata = metadata
+            self.key_index = {key_id: row for row, key_id in enumerate(keys)}
+            self.tag_index = TagIndex.from_metadata(self.FILTER_FIELDS, metadata, snapshot.count)
+            self.count = snapshot.count
+            self.trained = True
+
+        return snapshot.count
+
+    def _coarse_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Vectors as clustered: unit-normalized for cosine, so lists group directions rather than lengths.
+        """
+        if self.distance_metric != 'cosine':
+            return vectors
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        if len(centroids) == 1:
+            return np.zeros(len(vectors), dtype=np.int64)
+
+        return KMeans.assign(self._coarse_vectors(vectors), centroids)
@@ -0,0 +1,140 @@
+from interface import VectorStorage as VectorStorageInterface
+from typing import List, Dict, Any
+import numpy as np
+import yaml
+from utils import PathHelper, TagIndex
+
+class LocalVectorStorage(VectorStorageInterface):
+    """
+    Base of the in-process vector storages (NumpyVectorStorage, IVFVectorStorage, PQVectorStorage).
+
+    Records are numbered by row: entry i of keys and metadata, and row i of
+    every vector structure, describe the same record. Subclasses hold the
+    vectors; this class keeps the key, metadata and tag bookkeeping and the
+    distance maths, which must match the Redis metrics on every backend.
+    """
+
+    FIELDS = ('textual', 'visual')
+
+    # Rows inserted or updated while a subclass retrains, None when not training
+    _changed_rows = None
+    # Bumped whenever the contents or the trained index change, see get_index_generation
+    _index_generation = 0
+
+    @staticmethod
+    def load_config(file_name: str, section: str, config_overrides: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Read a backend's section of its config file, with the per-instance settings applied,
+        e.g. those of one shard of a ShardedVectorStorage.
+        """
+        with open(PathHelper.get_config_file(file_name), 'r') as f:
+            config = yaml.safe_load(f)
+
+        config[section].update(config_overrides or {})
+        return config[section]
+
+    def insert(
+        self,
+        textual_embedding: np.ndarray,
+        visual_embedding: np.ndarray,
+        metadata: Dict[str, Any] = {}
+    ) -> str:
+        """
+        Store embeddings and metadata, overwriting any record with the same key.
+        """
+        record = dict(metadata, textual_embedding=textual_embedding, visual_embedding=visual_embedding)
+        return self.insert_many([record])[0]
+
+    def _store_record(self, record: Dict[str, Any]) -> tuple:
+        """
+        Find the row of a record's key, appending one for a new key, and store its metadata.
+
+        Must be called under the storage lock; the vectors are left to the caller.
+
+        Returns:
+            tuple: The record's key id and row.
+        """
+        key_id = self.make_key_id(record)
+        row = self.key_index.get(key_id)
+
+        if row is None:
+            row = self.count
+            self._ensure_capacity(row + 1)
+            self.keys.append(key_id)
+            self.metadata.append(None)
+            self.key_index[key_id] = row
+            self.count += 1
+
+        self.metadata[row] = {
+            'animal': record.get('animal', ''),
+            'caption': record.get('caption', ''),
+            'image_path': record.get('image_path', ''),
+        }
+        self.tag_index.set(row, self.metadata[row])
+        self._index_generation += 1
+        if self._changed_rows is not None:
+            self._changed_rows.add(row)
+
+        return key_id, row
+
+    def get_index_generation(self) -> int:
+        return self._index_generation
+
+    def _ensure_capacity(self, size: int) -> None:
+        """
+        Make room for size rows; storages that grow on their own need not override this.
+        """
+
+    def _materialize(self) -> None:
+        """
+        Copy a snapshot-backed index into writable storage before the first insert.
+        """
+        self._resize(max(self.count * 2, 1))
+
+        self.keys = list(self.keys)
+        self.metadata = list(self.metadata)
+        self.key_index = {key_id: row for row, key_id in enumerate(self.keys)}
+        if self.tag_index is None:
+            self.tag_index = TagIndex.from_metadata(self.FILTER_FIELDS, self.metadata, self.count)
+        self._snapshot_backed = False
+
+    def _rerank(
+        self,
+        queries: np.ndarray,
+        candidates: np.ndarray,
+        full_vectors: np.ndarray,
+        squared_norms: np.ndarray
+    ) -> np.ndarray:
+        """
+        Recompute the distances of each query's candidate rows from full-precision vectors.
+        """
+        distances = np.empty(candidates.shape, dtype=np.float32)
+
+        for index, (query, rows) in enumerate(zip(queries, candidates)):
+            query = query.reshape(1, -1)
+            dots = (np.asarray(full_vectors[rows]) @ query.T).reshape(1, -1)
+            distances[index] = self._distances(dots, squared_norms[rows], query)[0]
+
+        return distances
+
+    def _distances(self, dots: np.ndarray, squared_norms: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        Turn a (queries x rows) matrix of dot products into distances matching the Redis metrics.
+        """
+        if self.distance_metric == 'l2':
+            return squared_norms - 2 * dots + np.einsum('ij,ij->i', queries, queries)[:, None]
+
+        if self.distance_metric == 'ip':
+            return 1 - dots
+
+        norms = np.sqrt(squared_norms) * np.linalg.norm(queries, axis=1)[:, None]
+        return 1 - dots / np.where(norms == 0, 1, norms)
+
+    def _format_results(self, rows: np.ndarray, distances: np.ndarray, metadata: List[dict], keys: List[str]) -> List[Dict[str, Any]]:
+        """
+        Build the result dicts of one query's best rows, sorted by distance.
+        """
+        return [
+            dict(metadata[row], id=keys[row], vector_distance=float(distance))
+            for row, distance in zip(rows, distances)
+        ]
@@ -0,0 +1,130 @@
+from interface import EmbeddingModel as EmbeddingModelInterface
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List
+import queue
+import threading
+import time
+import numpy as np
+from utils import ImageInput
+
+class MicroBatchingEmbeddingModel(EmbeddingModelInterface):
+    """
+    Embedding model decorator that merges concurrent single-item requests into batches.
+
+    Each embed_text/embed_image call is queued; a dispatcher thread per input
+    kind collects up to max_batch_size items, or whatever arrived within
+    max_wait_ms of the first one, sends them in one batched model call and
+    hands every caller its own row. Batch calls (embed_texts/embed_images)
+    are already batched and go straight to the wrapped model.
+    """
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModelInterface,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5,
+        max_in_flight_batches: int = 2
+    ):
+        self.embedding_model = embedding_model
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        # Batches sent to the model concurrently; requests arriving meanwhile form the next batch
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight_batches,
+            thread_name_prefix='micro-batch'
+        )
+        self._in_flight = threading.Semaphore(max_in_flight_batches)
+        self._queues = {'text': queue.Queue(), 'image': queue.Queue()}
+        self._dispatchers = {}
+        self._lock = threading.Lock()
+
+    def get_identity(self) -> str:
+        return self.embedding_model.get_identity()
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """
+        Extract an embedding from the text, batched with concurrent requests.
+
+        Args:
+            text (str): Input text.
+
+        Returns:
+            np.ndarray: The text embedding (feature vector).
+        """
+        return self._submit('text', text)
+
+    def embed_image(self, image: ImageInput) -> np.ndarray:
+        """
+        Extract an embedding from the image, batched with concurrent requests.
+
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
+
+        Returns:
+            np.ndarray: The image embedding (feature vector).
+        """
+        return self._submit('image', image)
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        return self.embedding_model.embed_texts(texts)
+
+    def embed_images(self, images: List[ImageInput]) -> np.ndarray:
+        return self.embedding_model.embed_images(images)
+
+    def _submit(self, kind: str, value) -> np.ndarray:
+        """Queue one input and block until its batch has been embedded."""
+        self._ensure_dispatcher(kind)
+
+        future = Future()
+        self._queues[kind].put((value, future))
+        return future.result()
+
+    def _ensure_dispatcher(self, kind: str) -> None:
+        if kind in self._dispatchers:
+            return
+
+        with self._lock:
+            if kind not in self._dispatchers:
+                embed_batch = self.embedding_model.embed_texts if kind == 'text' else self.embedding_model.embed_images
+                dispatcher = threading.Thread(
+                    target=self._dispatch,
+                    args=(self._queues[kind], embed_batch),
+                    name=f"micro-batch-{kind}",
+                    daemon=True
+                )
+                dispatcher.start()
+                self._dispatchers[kind] = dispatcher
+
+    def _dispatch(self, input_queue: queue.Queue, embed_batch: Callable[[list], np.ndarray]) -> None:
+        """Collect batches from the queue forever and send each to the model."""
+        while True:
+            batch = [input_queue.get()]
+            deadline = time.monotonic() + self.max_wait_seconds
+            # While every slot is busy, requests keep piling up for this batch
+            self._in_flight.acquire()
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(input_queue.get(timeout=remaining))
+                    else:
+                        batch.append(input_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._executor.submit(self._run_batch, batch, embed_batch)
+
+    def _run_batch(self, batch: list, embed_batch: Callable[[list], np.ndarray]) -> None:
+        """Embed a batch and resolve the future of every request in it."""
+        try:
+            embeddings = np.asarray(embed_batch([value for value, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self._in_flight.release()
+
+        for row, (_, future) in enumerate(batch):
+            future.set_result(embeddings[row:row + 1])
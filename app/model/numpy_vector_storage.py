@@ -0,0 +1,313 @@
+from typing import List, Dict, Any
+import tempfile
+import threading
+import numpy as np
+from utils import PathHelper, IndexSnapshot, IndexSnapshotWriter, TagIndex, ScalarQuantizer
+from .local_vector_storage import LocalVectorStorage
+
+class NumpyVectorStorage(LocalVectorStorage):
+    """
+    In-process vector storage keeping each embedding field in a contiguous float32 matrix.
+
+    Row i of the textual and visual matrices and entry i of the metadata list
+    describe the same record. Search is exact: one matrix-vector product over
+    the stored rows followed by an argpartition for the top-k. Filtered
+    searches only score the rows selected by the TagIndex.
+
+    Vectors can be stored at float16 or int8 precision (ScalarQuantizer).
+    With int8, the shortlist of rerank_factor * top_k candidates is re-ranked
+    against full-precision vectors, which can live in a memory-mapped file
+    under full_precision_path so that only the int8 codes occupy RAM.
+
+    The storage can also serve straight from a memory-mapped IndexSnapshot;
+    it is then copied into memory only on the first insert.
+    """
+
+    MAX_DISTANCE_MATRIX_SIZE = 1 << 24
+
+    def __init__(self, config_overrides: Dict[str, Any] = None):
+        config = self.load_config('numpy_config.yaml', 'numpy', config_overrides)
+
+        self.vector_dim = config['vector_dim']
+        self.distance_metric = config['distance_metric'].lower()
+        capacity = config.get('initial_capacity', 1024)
+
+        self.storage_precision = config.get('storage_precision', 'float32').lower()
+        if self.storage_precision not in ScalarQuantizer.DTYPES:
+            raise ValueError(f"Unsupported storage precision: {self.storage_precision}")
+        self.storage_dtype = ScalarQuantizer.DTYPES[self.storage_precision]
+        self.rerank_factor = config.get('rerank_factor', 4)
+        full_precision_path = config.get('full_precision_path')
+        self.full_precision_path = PathHelper.get_project_root() / 'app' / full_precision_path if full_precision_path else None
+
+        self._lock = threading.Lock()
+        self.count = 0
+        self.vectors = {
+            field: np.empty((capacity, self.vector_dim), dtype=self.storage_dtype)
+            for field in self.FIELDS
+        }
+        # Per-row scales of int8 codes
+        self.scales = None
+        # Float32 vectors used to re-rank int8 candidates
+        self.full_vectors = None
+        if self.storage_precision == 'int8':
+            self.scales = {field: np.empty(capacity, dtype=np.float32) for field in self.FIELDS}
+            self.full_vectors = {field: self._allocate_full_precision(field, capacity) for field in self.FIELDS}
+        # Squared L2 norms of each row, used by the cosine and l2 metrics
+        self.squared_norms = {
+            field: np.empty(capacity, dtype=np.float32)
+            for field in self.FIELDS
+        }
+        self.keys = []
+        self.metadata = []
+        self.key_index = {}
+        self.tag_index = TagIndex(self.FILTER_FIELDS, capacity)
+        self._snapshot_backed = False
+
+        snapshot_path = config.get('snapshot_path')
+        if snapshot_path:
+            self.load_snapshot(PathHelper.get_project_root() / 'app' / snapshot_path)
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store many records, overwriting any record with the same key.
+
+        Each record holds 'textual_embedding' and 'visual_embedding' alongside its metadata.
+        """
+        key_ids = []
+
+        with self._lock:
+            if self._snapshot_backed:
+                self._materialize()
+
+            for record in records:
+                vectors = {
+                    field: np.asarray(record[f"{field}_embedding"], dtype=np.float32).reshape(self.vector_dim)
+                    for field in self.FIELDS
+                }
+                key_id, row = self._store_record(record)
+
+                for field, vector in vectors.items():
+                    codes, scales = ScalarQuantizer.quantize(vector, self.storage_precision)
+                    self.vectors[field][row] = codes[0]
+                    if self.scales is not None:
+                        self.scales[field][row] = scales[0]
+                    if self.full_vectors is not None:
+                        self.full_vectors[field][row] = vector
+                    self.squared_norms[field][row] = np.dot(vector, vector)
+
+                key_ids.append(key_id)
+
+        return key_ids
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Perform exact KNN search on specified vector field and return top results with metadata.
+        """
+        if query_vector is None:
+            return []
+
+        return self.search_many(np.asarray(query_vector).reshape(1, -1), top_k, embedding_type, filters)[0]
+
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Perform exact KNN search for many queries with one matrix product per chunk of queries.
+
+        With int8 storage the scan is approximate and its shortlist is re-ranked at full precision.
+        """
+        field = 'textual' if embedding_type == 'textual' else 'visual'
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        filters = self.normalize_filters(filters)
+
+        with self._lock:
+            count = self.count
+            vectors = self.vectors[field][:count]
+            scales = self.scales[field][:count] if self.scales is not None else None
+            full_vectors = self.full_vectors[field] if self.full_vectors is not None else None
+            all_squared_norms = squared_norms = self.squared_norms[field][:count]
+            metadata = self.metadata
+            keys = self.keys
+
+            row_ids = None
+            if filters:
+                if self.tag_index is None:
+                    self.tag_index = TagIndex.from_metadata(self.FILTER_FIELDS, self.metadata, self.count)
+                row_ids = self.tag_index.rows(filters, count)
+
+        if row_ids is not None:
+            vectors = vectors[row_ids]
+            scales = scales[row_ids] if scales is not None else None
+            squared_norms = squared_norms[row_ids]
+            count = len(row_ids)
+
+        if count == 0 or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        top_k = min(top_k, count)
+        candidate_count = top_k if full_vectors is None else min(count, top_k * self.rerank_factor)
+        # Bound the (queries x rows) distance matrix held in memory at once
+        chunk_size = max(1, self.MAX_DISTANCE_MATRIX_SIZE // count)
+        results = []
+
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            distances = self._distances(ScalarQuantizer.dots(chunk, vectors, scales), squared_norms, chunk)
+
+            candidates = np.argpartition(distances, candidate_count - 1, axis=1)[:, :candidate_count]
+            candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+            if row_ids is not None:
+                candidates = row_ids[candidates]
+            if full_vectors is not None:
+                candidate_distances = self._rerank(chunk, candidates, full_vectors, all_squared_norms)
+
+            order = np.argsort(candidate_distances, axis=1)[:, :top_k]
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_distances = np.take_along_axis(candidate_distances, order, axis=1)
+
+            for rows, row_distances in zip(candidates, candidate_distances):
+                results.append(self._format_results(rows, row_distances, metadata, keys))
+
+        return results
+
+    def export_snapshot(self, path: str) -> int:
+        """
+        Write the stored records to an IndexSnapshot directory.
+        """
+        with self._lock:
+            count = self.count
+            # Export full precision when it is kept; float16 codes are widened by the writer
+            source = self.full_vectors if self.full_vectors is not None else self.vectors
+            vectors = {field: source[field][:count] for field in self.FIELDS}
+            keys = self.keys
+            metadata = self.metadata
+
+        writer = IndexSnapshotWriter(path, self.vector_dim)
+        chunk_size = 10000
+
+        for start in range(0, count, chunk_size):
+            stop = min(start + chunk_size, count)
+            writer.append(
+                [keys[row] for row in range(start, stop)],
+                vectors['textual'][start:stop],
+                vectors['visual'][start:stop],
+                [metadata[row] for row in range(start, stop)]
+            )
+
+        writer.close()
+        return count
+
+    def load_snapshot(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Serve directly from a memory-mapped snapshot, replacing the current contents.
+
+        Nothing is copied or parsed: vectors, norms and metadata stay on the
+        page cache and are read on demand. With float16 or int8 storage, the
+        vectors are encoded into memory once and int8 candidates are re-ranked
+        against the snapshot's float32 vectors.
+        """
+        snapshot = IndexSnapshot(path)
+        if snapshot.vector_dim != self.vector_dim:
+            raise ValueError(f"Snapshot dimension {snapshot.vector_dim} does not match {self.vector_dim}")
+
+        vectors = dict(snapshot.vectors)
+        scales = None
+        if self.storage_precision != 'float32':
+            vectors, scales = self._quantize_all(snapshot.vectors, snapshot.count)
+
+        with self._lock:
+            self._index_generation += 1
+            self.vectors = vectors
+            self.scales = scales
+            if self.storage_precision == 'int8':
+                self.full_vectors = dict(snapshot.vectors)
+            self.squared_norms = dict(snapshot.squared_norms)
+            self.keys = snapshot.keys
+            self.metadata = snapshot.metadata
+            self.key_index = None
+            # Built on the first filtered search so that loading stays parse-free
+            self.tag_index = None
+            self.count = snapshot.count
+            self._snapshot_backed = True
+
+        return snapshot.count
+
+    def _quantize_all(self, vectors: Dict[str, np.ndarray], count: int) -> tuple:
+        """
+        Encode whole float32 matrices at the storage precision, a block of rows at a time.
+        """
+        codes = {}
+        scales = {} if self.storage_precision == 'int8' else None
+
+        for field in self.FIELDS:
+            codes[field] = np.empty((max(count, 1), self.vector_dim), dtype=self.storage_dtype)
+            if scales is not None:
+                scales[field] = np.empty(max(count, 1), dtype=np.float32)
+
+            for start in range(0, count, ScalarQuantizer.BLOCK_ROWS):
+                stop = min(start + ScalarQuantizer.BLOCK_ROWS, count)
+                block_codes, block_scales = ScalarQuantizer.quantize(vectors[field][start:stop], self.storage_precision)
+                codes[field][start:stop] = block_codes
+                if scales is not None:
+                    scales[field][start:stop] = block_scales
+
+        return codes, scales
+
+    def _allocate_full_precision(self, field: str, capacity: int) -> np.ndarray:
+        """
+        Allocate the float32 re-rank matrix of a field, in a file when full_precision_path is set.
+        """
+        if self.full_precision_path is None:
+            return np.empty((capacity, self.vector_dim), dtype=np.float32)
+
+        self.full_precision_path.mkdir(parents=True, exist_ok=True)
+
+        # An unnamed file private to this instance, so shards and other processes sharing the
+        # directory never map the same file, and a previous mapping stays readable while it is copied
+        with tempfile.TemporaryFile(prefix=f"{field}.", suffix='.f32', dir=self.full_precision_path) as f:
+            f.truncate(capacity * self.vector_dim * np.dtype(np.float32).itemsize)
+            return np.memmap(f, dtype=np.float32, mode='r+', shape=(capacity, self.vector_dim))
+
+    def _ensure_capacity(self, size: int) -> None:
+        """
+        Grow the matrices geometrically so inserts stay amortized O(1).
+        """
+        capacity = self.vectors[self.FIELDS[0]].shape[0]
+        if size <= capacity:
+            return
+
+        self._resize(max(size, capacity * 2))
+
+    def _resize(self, capacity: int) -> None:
+        """
+        Move the stored rows into newly allocated writable arrays of the given capacity.
+        """
+        for field in self.FIELDS:
+            vectors = np.empty((capacity, self.vector_dim), dtype=self.storage_dtype)
+            vectors[:self.count] = self.vectors[field][:self.count]
+            self.vectors[field] = vectors
+
+            squared_norms = np.empty(capacity, dtype=np.float32)
+            squared_norms[:self.count] = self.squared_norms[field][:self.count]
+            self.squared_norms[field] = squared_norms
+
+            if self.scales is not None:
+                scales = np.empty(capacity, dtype=np.float32)
+                scales[:self.count] = self.scales[field][:self.count]
+                self.scales[field] = scales
+
+            if self.full_vectors is not None:
+                full_vectors = self._allocate_full_precision(field, capacity)
+                full_vectors[:self.count] = self.full_vectors[field][:self.count]
+                self.full_vectors[field] = full_vectors
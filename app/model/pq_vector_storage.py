@@ -0,0 +1,397 @@
+from typing import List, Dict, Any
+import tempfile
+import threading
+import numpy as np
+from utils import PathHelper, IndexSnapshot, IndexSnapshotWriter, TagIndex, ProductQuantizer
+from .local_vector_storage import LocalVectorStorage
+
+class PQVectorStorage(LocalVectorStorage):
+    """
+    In-process vector storage keeping only product-quantization codes in memory.
+
+    Each vector is held in RAM as m one-byte codes plus its float32 squared
+    norm, e.g. 36 bytes instead of 2 KB for a 512-d vector with m=32. A
+    search estimates the distance to every code with per-query lookup tables
+    (ProductQuantizer), then re-ranks the rerank_factor * top_k best
+    candidates exactly against the float32 vectors, which live in a
+    memory-mapped file under full_precision_path and are only paged in for
+    those candidates. Every instance maps its own unnamed temporary file,
+    so shards and other processes sharing the directory never overwrite
+    each other's vectors, and nothing is left behind on exit.
+
+    Until min_train_size records are stored there are no codebooks and
+    search is exact over the full vectors. The codebooks are then trained
+    once, by the insert crossing that size, without blocking searches.
+
+    The storage can also serve straight from a memory-mapped IndexSnapshot,
+    holding only the codes in memory; it then copies the full vectors into
+    full_precision_path on the first insert.
+    """
+
+    MAX_DISTANCE_MATRIX_SIZE = 1 << 24
+    CODEBOOKS_FILE = 'pq.{field}.codebooks.npy'
+    CODES_FILE = 'pq.{field}.codes.npy'
+    # Rows copied at a time between full-precision files
+    COPY_BLOCK_ROWS = 1 << 16
+
+    def __init__(self, config_overrides: Dict[str, Any] = None):
+        config = self.load_config('pq_config.yaml', 'pq', config_overrides)
+
+        self.vector_dim = config['vector_dim']
+        self.distance_metric = config['distance_metric'].lower()
+        self.m = config.get('m', 32)
+        if self.vector_dim % self.m:
+            raise ValueError(f"Vector dimension {self.vector_dim} is not divisible by m={self.m}")
+        self.min_train_size = max(config.get('min_train_size', 20000), ProductQuantizer.CODEBOOK_SIZE)
+        self.train_sample_size = config.get('train_sample_size', 100000)
+        self.kmeans_iterations = config.get('kmeans_iterations', 20)
+        self.rerank_factor = config.get('rerank_factor', 10)
+        full_precision_path = config.get('full_precision_path')
+        self.full_precision_path = PathHelper.get_project_root() / 'app' / full_precision_path if full_precision_path else None
+        capacity = config.get('initial_capacity', 1024)
+
+        self._lock = threading.Lock()
+        # Rows inserted or updated while train() runs, None when not training
+        self._changed_rows = None
+        # Bumped whenever the contents are replaced, so a training run started before is discarded
+        self._generation = 0
+        # The temporary file backing each field's full vectors, and its current mapping
+        self._full_precision_files = {}
+        self._full_precision_maps = {}
+        self.count = 0
+        self.quantizers = {field: None for field in self.FIELDS}
+        self.codes = {field: np.empty((capacity, self.m), dtype=np.uint8) for field in self.FIELDS}
+        self.squared_norms = {field: np.empty(capacity, dtype=np.float32) for field in self.FIELDS}
+        self.full_vectors = {field: self._allocate_full_precision(field, capacity) for field in self.FIELDS}
+        self.keys = []
+        self.metadata = []
+        self.key_index = {}
+        self.tag_index = TagIndex(self.FILTER_FIELDS, capacity)
+        self._snapshot_backed = False
+
+        snapshot_path = config.get('snapshot_path')
+        if snapshot_path:
+            self.load_snapshot(PathHelper.get_project_root() / 'app' / snapshot_path)
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store many records, encoding the batch's vectors in one pass per field.
+
+        Each record holds 'textual_embedding' and 'visual_embedding' alongside its metadata.
+        """
+        if not records:
+            return []
+
+        vectors = {
+            field: np.stack([
+                np.asarray(record[f"{field}_embedding"], dtype=np.float32).reshape(self.vector_dim)
+                for record in records
+            ])
+            for field in self.FIELDS
+        }
+        key_ids = []
+        rows = np.empty(len(records), dtype=np.int64)
+
+        with self._lock:
+            if self._snapshot_backed:
+                self._materialize()
+
+            for index, record in enumerate(records):
+                key_id, rows[index] = self._store_record(record)
+                key_ids.append(key_id)
+
+            for field in self.FIELDS:
+                self.full_vectors[field][rows] = vectors[field]
+                self.squared_norms[field][rows] = np.einsum('ij,ij->i', vectors[field], vectors[field])
+                if self.quantizers[field] is not None:
+                    self.codes[field][rows] = self.quantizers[field].encode(vectors[field])
+
+            needs_training = self._needs_training()
+
+        if needs_training:
+            self.train()
+
+        return key_ids
+
+    def train(self) -> None:
+        """
+        Train the codebooks on the stored vectors and re-encode every row.
+
+        K-means and encoding run without holding the lock, reading the rows
+        stored when training started, so searches and inserts go on meanwhile
+        with the previous codebooks, or exactly before the first training.
+        Rows inserted or updated during training are encoded when the new
+        codebooks are swapped in. A call while another training runs returns at once.
+        """
+        with self._lock:
+            if self._changed_rows is not None:
+                return
+            self._changed_rows = set()
+            generation = self._generation
+            count = self.count
+            # Rows below count are only rewritten by updates, which are re-encoded below
+            full_vectors = dict(self.full_vectors)
+
+        try:
+            sample = np.arange(count)
+            if count > self.train_sample_size:
+                sample = np.sort(np.random.default_rng(0).choice(count, self.train_sample_size, replace=False))
+
+            quantizers = {}
+            codes = {}
+            for field in self.FIELDS:
+                quantizers[field] = ProductQuantizer.train(
+                    np.asarray(full_vectors[field][sample]), self.m, self.kmeans_iterations
+                )
+                codes[field] = np.empty((count, self.m), dtype=np.uint8)
+                for start in range(0, count, ProductQuantizer.BLOCK_ROWS):
+                    stop = min(start + ProductQuantizer.BLOCK_ROWS, count)
+                    codes[field][start:stop] = quantizers[field].encode(np.asarray(full_vectors[field][start:stop]))
+            del full_vectors
+
+            with self._lock:
+                if generation != self._generation:
+                    return
+
+                stale = np.array(sorted(self._changed_rows | set(range(count, self.count))), dtype=np.int64)
+                capacity = len(self.squared_norms[self.FIELDS[0]])
+
+                for field in self.FIELDS:
+                    field_codes = np.empty((capacity, self.m), dtype=np.uint8)
+                    field_codes[:count] = codes[field]
+                    if len(stale):
+                        field_codes[stale] = quantizers[field].encode(np.asarray(self.full_vectors[field][stale]))
+
+                    # Swapped in whole, so searches holding the previous codes keep a consistent pair
+                    self.codes[field] = field_codes
+                    self.quantizers[field] = quantizers[field]
+                self._index_generation += 1
+        finally:
+            with self._lock:
+                self._changed_rows = None
+
+    def _needs_training(self) -> bool:
+        """
+        Check, under the lock, whether the untrained storage has reached min_train_size.
+        """
+        return self.quantizers[self.FIELDS[0]] is None and self._changed_rows is None and self.count >= self.min_train_size
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Perform KNN search on specified vector field and return top results with metadata.
+        """
+        if query_vector is None:
+            return []
+
+        return self.search_many(np.asarray(query_vector).reshape(1, -1), top_k, embedding_type, filters)[0]
+
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Rank every code with lookup tables, then re-rank each query's shortlist at full precision.
+        """
+        field = 'textual' if embedding_type == 'textual' else 'visual'
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        filters = self.normalize_filters(filters)
+
+        with self._lock:
+            count = self.count
+            quantizer = self.quantizers[field]
+            codes = self.codes[field][:count]
+            full_vectors = self.full_vectors[field]
+            all_squared_norms = squared_norms = self.squared_norms[field][:count]
+            metadata = self.metadata
+            keys = self.keys
+
+            row_ids = None
+            if filters:
+                if self.tag_index is None:
+                    self.tag_index = TagIndex.from_metadata(self.FILTER_FIELDS, self.metadata, self.count)
+                row_ids = self.tag_index.rows(filters, count)
+
+        if quantizer is None:
+            # Untrained: score the full vectors directly
+            vectors = full_vectors[:count] if row_ids is None else full_vectors[row_ids]
+        if row_ids is not None:
+            codes = codes[row_ids] if quantizer is not None else codes
+            squared_norms = squared_norms[row_ids]
+            count = len(row_ids)
+
+        if count == 0 or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        top_k = min(top_k, count)
+        candidate_count = top_k if quantizer is None else min(count, top_k * self.rerank_factor)
+        # Bound the (queries x rows) distance matrix held in memory at once
+        chunk_size = max(1, self.MAX_DISTANCE_MATRIX_SIZE // count)
+        results = []
+
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            if quantizer is None:
+                dots = chunk @ np.asarray(vectors).T
+            else:
+                dots = quantizer.dots(quantizer.dot_tables(chunk), codes)
+            distances = self._distances(dots, squared_norms, chunk)
+
+            candidates = np.argpartition(distances, candidate_count - 1, axis=1)[:, :candidate_count]
+            candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+            if row_ids is not None:
+                candidates = row_ids[candidates]
+            if quantizer is not None:
+                candidate_distances = self._rerank(chunk, candidates, full_vectors, all_squared_norms)
+
+            order = np.argsort(candidate_distances, axis=1)[:, :top_k]
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_distances = np.take_along_axis(candidate_distances, order, axis=1)
+
+            for rows, row_distances in zip(candidates, candidate_distances):
+                results.append(self._format_results(rows, row_distances, metadata, keys))
+
+        return results
+
+    def export_snapshot(self, path: str) -> int:
+        """
+        Write the stored records to an IndexSnapshot directory, along with the
+        codebooks and codes so that loading it needs no retraining.
+        """
+        with self._lock:
+            count = self.count
+            writer = IndexSnapshotWriter(path, self.vector_dim)
+            chunk_size = 10000
+
+            for start in range(0, count, chunk_size):
+                stop = min(start + chunk_size, count)
+                writer.append(
+                    [self.keys[row] for row in range(start, stop)],
+                    self.full_vectors['textual'][start:stop],
+                    self.full_vectors['visual'][start:stop],
+                    [self.metadata[row] for row in range(start, stop)]
+                )
+
+            for field in self.FIELDS:
+                if self.quantizers[field] is not None:
+                    self.quantizers[field].save(writer.tmp_path / self.CODEBOOKS_FILE.format(field=field))
+                    np.save(writer.tmp_path / self.CODES_FILE.format(field=field), self.codes[field][:count])
+
+        writer.close()
+        return count
+
+    def load_snapshot(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Serve from a memory-mapped snapshot, replacing the current contents.
+
+        Only the codes are read into memory: from the snapshot when it was
+        exported by this storage, otherwise by training on its vectors once
+        it holds min_train_size records, which searches do not wait for. Full vectors, norms and metadata
+        stay on the page cache.
+        """
+        snapshot = IndexSnapshot(path)
+        if snapshot.vector_dim != self.vector_dim:
+            raise ValueError(f"Snapshot dimension {snapshot.vector_dim} does not match {self.vector_dim}")
+
+        quantizers = {field: None for field in self.FIELDS}
+        codes = {field: np.empty((0, self.m), dtype=np.uint8) for field in self.FIELDS}
+        for field in self.FIELDS:
+            codebooks_path = snapshot.path / self.CODEBOOKS_FILE.format(field=field)
+            if codebooks_path.exists():
+                quantizers[field] = ProductQuantizer.load(codebooks_path)
+                codes[field] = np.load(snapshot.path / self.CODES_FILE.format(field=field))
+
+        with self._lock:
+            self._generation += 1
+            self._index_generation += 1
+            self.quantizers = quantizers
+            self.codes = codes
+            self.full_vectors = dict(snapshot.vectors)
+            self.squared_norms = dict(snapshot.squared_norms)
+            self.keys = snapshot.keys
+            self.metadata = snapshot.metadata
+            self.key_index = None
+            # Built on the first filtered search so that loading stays parse-free
+            self.tag_index = None
+            self.count = snapshot.count
+            self._snapshot_backed = True
+            needs_training = self._needs_training()
+
+        if needs_training:
+            self.train()
+
+        return snapshot.count
+
+    def _ensure_capacity(self, size: int) -> None:
+        """
+        Grow the arrays geometrically so inserts stay amortized O(1).
+        """
+        capacity = len(self.squared_norms[self.FIELDS[0]])
+        if size <= capacity:
+            return
+
+        self._resize(max(size, capacity * 2))
+
+    def _resize(self, capacity: int) -> None:
+        """
+        Move the stored rows into writable arrays of the given capacity.
+        """
+        for field in self.FIELDS:
+            codes = np.empty((capacity, self.m), dtype=np.uint8)
+            if self.quantizers[field] is not None:
+                codes[:self.count] = self.codes[field][:self.count]
+            self.codes[field] = codes
+
+            squared_norms = np.empty(capacity, dtype=np.float32)
+            squared_norms[:self.count] = self.squared_norms[field][:self.count]
+            self.squared_norms[field] = squared_norms
+
+            self.full_vectors[field] = self._allocate_full_precision(field, capacity, self.full_vectors[field])
+
+    def _allocate_full_precision(self, field: str, capacity: int, previous: np.ndarray = None) -> np.ndarray:
+        """
+        Allocate the float32 vectors of a field, keeping the stored rows of previous.
+
+        With full_precision_path set they live in an unnamed temporary file
+        there, private to this instance: the file this storage already maps is
+        extended in place, anything else (a snapshot) is copied into a new file.
+        """
+        count = self.count if previous is not None else 0
+
+        if self.full_precision_path is None:
+            vectors = np.empty((capacity, self.vector_dim), dtype=np.float32)
+            if count:
+                vectors[:count] = previous[:count]
+            return vectors
+
+        size = capacity * self.vector_dim * np.dtype(np.float32).itemsize
+
+        if previous is not None and previous is self._full_precision_maps.get(field):
+            # Only ever grown, so mappings still held by searches stay valid
+            previous.flush()
+            self._full_precision_files[field].truncate(size)
+            vectors = np.memmap(self._full_precision_files[field], dtype=np.float32, mode='r+', shape=(capacity, self.vector_dim))
+        else:
+            self.full_precision_path.mkdir(parents=True, exist_ok=True)
+            previous_file = self._full_precision_files.get(field)
+            self._full_precision_files[field] = tempfile.TemporaryFile(prefix=f"{field}.", suffix='.f32', dir=self.full_precision_path)
+            self._full_precision_files[field].truncate(size)
+            vectors = np.memmap(self._full_precision_files[field], dtype=np.float32, mode='r+', shape=(capacity, self.vector_dim))
+            for start in range(0, count, self.COPY_BLOCK_ROWS):
+                stop = min(start + self.COPY_BLOCK_ROWS, count)
+                vectors[start:stop] = previous[start:stop]
+
+            # Existing mappings keep the file's pages alive after it is closed
+            if previous_file is not None:
+                previous_file.close()
+
+        self._full_precision_maps[field] = vectors
+        return vectors
@@ -1,53 +1,313 @@
 from interface import VectorStorage as VectorStorageInterface
-from typing import List, Dict, Any
-import uuid
+from typing import Callable, List, Dict, Any
+import itertools
+import random
+import re
+import time
 import numpy as np
-from redis import Redis
-from redis.commands.search.field import VectorField, TextField, NumericField
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError, ResponseError
+from redis.commands.search.field import VectorField, TextField, TagField, NumericField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
 import yaml
-from utils import PathHelper
+from utils import PathHelper, IndexSnapshotWriter, RedisConnectionFactory, EndpointHealth
 
 class RedisVectorStorage(VectorStorageInterface):
-    def __init__(self):
+    # Characters that must be backslash-escaped inside a TAG filter value
+    TAG_SPECIAL_CHARACTERS = re.compile(r"([,.<>{}\[\]\"':;!@#$%^&*()\-+=~|/\\ ])")
+    # NumPy dtype of each supported vector field TYPE
+    STORAGE_DTYPES = {'FLOAT32': np.float32, 'FLOAT16': np.float16}
+    # Vector field settings the stored hashes must match, so a rebuild alone cannot change them
+    STORAGE_FORMAT_SETTINGS = ('DATA_TYPE', 'DIM')
+    READ_BALANCING = ('round_robin', 'least_latency')
+    # Errors of a replica read that the primary may not have, e.g. a replica still loading its
+    # dataset or missing the index after an alias swap (ResponseError)
+    REPLICA_ERRORS = (RedisConnectionError, RedisTimeoutError, ResponseError)
+    # Vector field creation parameters accepted by each algorithm
+    ALGORITHM_PARAMS = {
+        'HNSW': ('M', 'EF_CONSTRUCTION', 'EF_RUNTIME', 'EPSILON', 'INITIAL_CAP'),
+        'FLAT': ('INITIAL_CAP', 'BLOCK_SIZE'),
+    }
+
+    def __init__(self, config_overrides: Dict[str, Any] = None, verify_storage_format: bool = True):
         config_path = PathHelper.get_config_file('redis_config.yaml')
 
         with open(config_path, 'r') as f:
             config = yaml.safe_load(f)
+        # Per-instance settings, e.g. of one shard of a ShardedVectorStorage
+        config['redis'].update(config_overrides or {})
 
-        self.redis_client = Redis(
-            host=config['redis']['host'],
-            port=config['redis']['port'],
-            decode_responses=False
-        )
+        self.endpoint = {
+            name: config['redis'][name]
+            for name in RedisConnectionFactory.ENDPOINT_KEYS
+            if name in (config_overrides or {})
+        }
+        self.redis_client = RedisConnectionFactory.get_client(self.endpoint)
 
         self.index_name = config['redis']['index_name']
         self.prefix = config['redis']['prefix']
+        # Counter bumped with every write and rebuild, outside the prefix so it is never indexed
+        self.generation_key = f"{self.index_name}:generation"
         self.vector_dim = config['redis']['vector_dim']
         self.distance_metric = config['redis']['distance_metric']
-        self.algorithm = config['redis']['algorithm']
+        self.algorithm = config['redis']['algorithm'].upper()
+        if self.algorithm not in self.ALGORITHM_PARAMS:
+            raise ValueError(f"Unsupported index algorithm: {self.algorithm}")
+        index_params = config['redis'].get('index_params') or {}
+        self.index_params = {
+            name: index_params[name]
+            for name in self.ALGORITHM_PARAMS[self.algorithm]
+            if index_params.get(name) is not None
+        }
+        self.index_build_timeout = config['redis'].get('index_build_timeout', 3600)
+        self.rebuild_min_doc_ratio = config['redis'].get('rebuild_min_doc_ratio', 0.9)
+        self.storage_precision = config['redis'].get('storage_precision', 'FLOAT32').upper()
+        if self.storage_precision not in self.STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage precision: {self.storage_precision}")
+        self.storage_dtype = self.STORAGE_DTYPES[self.storage_precision]
+        self.pipeline_chunk_size = config['redis'].get('pipeline_chunk_size', 500)
+
+        # Searches are balanced over the read replicas; writes and index management stay on the primary.
+        # A storage on another endpoint (a shard) only uses the replicas declared with that endpoint
+        replica_config = config_overrides if self.endpoint else config['redis']
+        self.replica_endpoints = [
+            RedisConnectionFactory.resolve_endpoint(endpoint, self.endpoint)
+            for endpoint in replica_config.get('read_replicas') or []
+        ]
+        # A failing replica read falls back to the primary, so retrying it would only add delay
+        self.replica_retry_attempts = config['redis'].get('replica_retry_attempts', 0)
+        self.read_clients = [
+            RedisConnectionFactory.get_client(endpoint, self.replica_retry_attempts)
+            for endpoint in self.replica_endpoints
+        ]
+        self.replica_health = [
+            EndpointHealth(
+                f"Redis replica {RedisConnectionFactory.describe_endpoint(endpoint)}",
+                config['redis'].get('replica_failure_threshold', 3),
+                config['redis'].get('replica_retry_interval', 30)
+            )
+            for endpoint in self.replica_endpoints
+        ]
+        self.read_balancing = config['redis'].get('read_balancing', 'round_robin')
+        if self.read_balancing not in self.READ_BALANCING:
+            raise ValueError(f"Unsupported read balancing: {self.read_balancing}")
+        self._next_replica = itertools.count()
 
-        self._create_index()
+        self._create_index(verify_storage_format)
 
-    def _create_index(self) -> None:
+    def _create_index(self, verify_storage_format: bool = True) -> None:
         """
-        Create or recreate a Redisearch index for vector storage with metadata fields.
+        Create the Redisearch index behind the index_name alias, or check the existing one.
+
+        Every index is created as a numbered version ('<index_name>_v<n>') that
+        index_name aliases, so rebuild_index can swap versions without downtime.
+
+        Raises:
+            ValueError: If verify_storage_format is set and the existing index stores
+                vectors of another DATA_TYPE or DIM than configured; queries and
+                records encoded with the configured settings would all fail.
         """
 
+        info = self._index_info(self.index_name)
+        if info is not None:
+            print(f"Index '{self.index_name}' already exists")
+            for field in self.FILTER_FIELDS:
+                if self._attribute_type(info, field) != 'TAG':
+                    print(f"Index '{self.index_name}' indexes '{field}' as a non-TAG field, "
+                          f"filtered searches need the index to be rebuilt")
+            for setting, expected, actual in self.index_settings_mismatches(info):
+                if setting.split('.')[-1] not in self.STORAGE_FORMAT_SETTINGS:
+                    print(f"Index '{self.index_name}' was built with {setting}={actual} instead of {expected}, "
+                          f"run 'python redis_index.py rebuild' to apply the configured settings")
+                elif verify_storage_format and setting.endswith('.DATA_TYPE'):
+                    raise ValueError(
+                        f"Index '{self.index_name}' stores {actual} vectors but storage_precision is {expected}, "
+                        f"run 'python redis_index.py migrate' to re-encode the stored vectors"
+                    )
+                elif verify_storage_format:
+                    raise ValueError(
+                        f"Index '{self.index_name}' stores vectors of {setting}={actual} instead of {expected}, "
+                        f"the records must be re-imported with the configured embedding model"
+                    )
+            return
+
+        index_name = f"{self.index_name}_v1"
         try:
-            info = self.redis_client.ft(self.index_name).info()
-            if info['index_name'] == self.index_name:
-                print(f"Index '{self.index_name}' already exists")
-                return
+            self._build_index(index_name)
+            self.redis_client.ft(index_name).aliasupdate(self.index_name)
+            print(f"Created index '{index_name}' aliased as '{self.index_name}'.")
+        except Exception as err:
+            print(f"Failed to create index: {err}")
 
-        except Exception:
-            pass
+    def rebuild_index(self, timeout: float = None, poll_interval: float = 1.0) -> str:
+        """
+        Build a new index version with the configured settings and atomically alias it as index_name.
+
+        All versions index the same hashes, so searches keep using the current
+        version while the new one scans them in the background, and writes made
+        meanwhile land in both. Once the scan is done FT.ALIASUPDATE switches
+        every client over in one step and the old version is dropped, keeping
+        the documents. A legacy index registered under index_name itself must
+        be dropped before the alias can take its name, leaving a gap of one
+        round trip.
+
+        The swap is aborted, dropping the new version and keeping the current
+        one, if the new version failed to index any hash (e.g. vectors stored at
+        another precision) or holds fewer than rebuild_min_doc_ratio of the
+        current version's documents.
+
+        Args:
+            timeout (float): Seconds to wait for the new index to finish indexing, index_build_timeout by default.
+            poll_interval (float): Seconds between indexing progress checks.
+
+        Returns:
+            str: The name of the new index version.
+
+        Raises:
+            RuntimeError: If the new version is incomplete and was dropped.
+        """
+        timeout = self.index_build_timeout if timeout is None else timeout
+        info = self._index_info(self.index_name)
+        current_name = self.decode_value(info['index_name']) if info is not None else None
+
+        index_name = f"{self.index_name}_v{self._index_version(current_name) + 1}"
+        if self._index_info(index_name) is not None:
+            # Left over by an interrupted rebuild
+            self.redis_client.ft(index_name).dropindex(delete_documents=False)
+
+        self._build_index(index_name)
+        self._wait_for_indexing(index_name, timeout, poll_interval)
+        self._check_rebuilt_index(index_name, current_name)
+
+        if current_name == self.index_name:
+            self.redis_client.ft(current_name).dropindex(delete_documents=False)
+            current_name = None
+
+        self.redis_client.ft(index_name).aliasupdate(self.index_name)
+        self.redis_client.incr(self.generation_key)
+        print(f"Index '{self.index_name}' now points to '{index_name}'")
+
+        if current_name is not None:
+            self.redis_client.ft(current_name).dropindex(delete_documents=False)
+
+        return index_name
+
+    def migrate_storage_precision(self) -> int:
+        """
+        Re-encode the stored vectors at the configured storage_precision.
+
+        Every hash under the prefix is scanned, and vectors whose blob has the
+        byte length of another supported precision are decoded and written back,
+        a pipelined round trip per chunk. Vectors already at the configured
+        precision are left alone, so an interrupted migration can be run again.
+        Each rewritten hash drops out of the current index, which cannot parse
+        the new width, until rebuild_index builds a version that can; writers
+        still using the old precision must be stopped first.
+
+        Returns:
+            int: Number of hashes rewritten.
+        """
+        dtypes_by_length = {
+            np.dtype(dtype).itemsize * self.vector_dim: dtype
+            for dtype in self.STORAGE_DTYPES.values()
+        }
+
+        migrated = 0
+        keys = []
+        for redis_key in self.redis_client.scan_iter(match=f"{self.prefix}:*", count=self.pipeline_chunk_size):
+            keys.append(redis_key)
+            if len(keys) >= self.pipeline_chunk_size:
+                migrated += self._migrate_chunk(keys, dtypes_by_length)
+                keys = []
+
+        if keys:
+            migrated += self._migrate_chunk(keys, dtypes_by_length)
+
+        return migrated
+
+    def _migrate_chunk(self, redis_keys: list, dtypes_by_length: Dict[int, Any]) -> int:
+        """
+        Re-encode the vectors of a chunk of hashes that are stored at another precision.
+        """
+        fields = ['textual_embedding', 'visual_embedding']
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for redis_key in redis_keys:
+            pipeline.hmget(redis_key, fields)
+        replies = pipeline.execute()
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        migrated = 0
+        for redis_key, values in zip(redis_keys, replies):
+            mapping = {}
+            for field, value in zip(fields, values):
+                dtype = dtypes_by_length.get(len(value)) if value is not None else None
+                if dtype is not None and dtype != self.storage_dtype:
+                    mapping[field] = self.embedding_to_bytes(np.frombuffer(value, dtype=dtype))
+
+            if mapping:
+                pipeline.hset(redis_key, mapping=mapping)
+                migrated += 1
+
+        if migrated:
+            pipeline.incr(self.generation_key)
+        pipeline.execute()
+        return migrated
+
+    def _check_rebuilt_index(self, index_name: str, current_name: str) -> None:
+        """
+        Drop a freshly built index version and raise if it indexed less than the current version.
+        """
+        info = self.redis_client.ft(index_name).info()
+        failures = self._info_number(info, 'hash_indexing_failures')
+        num_docs = self._info_number(info, 'num_docs')
+
+        current_info = self._index_info(current_name) if current_name is not None else None
+        current_docs = self._info_number(current_info, 'num_docs') if current_info is not None else 0
 
+        if failures or num_docs < current_docs * self.rebuild_min_doc_ratio:
+            self.redis_client.ft(index_name).dropindex(delete_documents=False)
+            raise RuntimeError(
+                f"Rebuilt index '{index_name}' has {num_docs} documents and {failures} indexing failures "
+                f"against {current_docs} documents in '{current_name}', kept '{current_name}'. "
+                f"Check that the stored vectors match the configured DATA_TYPE and DIM"
+            )
+
+    def index_settings_mismatches(self, info: Dict[str, Any]) -> List[tuple]:
+        """
+        Compare the vector fields reported by FT.INFO with the configured settings.
+
+        Only the settings FT.INFO reports are compared; which ones it reports depends on the Redis Stack version.
+
+        Returns:
+            List[tuple]: (setting, configured value, indexed value) for each difference.
+        """
+        expected = {
+            'ALGORITHM': self.algorithm,
+            'DATA_TYPE': self.storage_precision,
+            'DIM': self.vector_dim,
+            'DISTANCE_METRIC': self.distance_metric,
+            **self.index_params
+        }
+        mismatches = []
+
+        for field in ('textual_embedding', 'visual_embedding'):
+            properties = {name.upper(): value for name, value in self._attribute_properties(info, field).items()}
+            for setting, value in expected.items():
+                actual = properties.get(setting)
+                if actual is not None and str(actual).upper() != str(value).upper():
+                    mismatches.append((f"{field}.{setting}", value, actual))
+
+        return mismatches
+
+    def _build_index(self, index_name: str) -> None:
+        """
+        Create one index version over the record hashes.
+        """
         embedding_field_attributes = {
-            'TYPE': 'FLOAT32',
+            'TYPE': self.storage_precision,
             'DIM': self.vector_dim,
             'DISTANCE_METRIC': self.distance_metric,
+            **self.index_params
         }
 
         textual_field = VectorField(
@@ -65,22 +325,80 @@ class RedisVectorStorage(VectorStorageInterface):
         schema = (
             textual_field,
             visual_field,
-            TextField("animal"),
+            TagField("animal"),
             TextField("caption"),
             TextField("image_path"),
         )
 
-        try:
-            self.redis_client.ft(self.index_name).create_index(
-                fields=schema,
-                definition=IndexDefinition(
-                    prefix=[f"{self.prefix}:"],
-                    index_type=IndexType.HASH
-                )
+        self.redis_client.ft(index_name).create_index(
+            fields=schema,
+            definition=IndexDefinition(
+                prefix=[f"{self.prefix}:"],
+                index_type=IndexType.HASH
             )
-            print(f"Created index '{self.index_name}' with updated schema.")
-        except Exception as err:
-            print(f"Failed to create index: {err}")
+        )
+
+    def _wait_for_indexing(self, index_name: str, timeout: float, poll_interval: float) -> None:
+        """
+        Block until an index has scanned every existing hash.
+        """
+        deadline = time.time() + timeout
+
+        while True:
+            info = self.redis_client.ft(index_name).info()
+            if not self._info_number(info, 'indexing'):
+                return
+
+            if time.time() > deadline:
+                raise TimeoutError(
+                    f"Index '{index_name}' is still indexing after {timeout}s "
+                    f"({self.decode_value(info.get('percent_indexed', '?'))} done)"
+                )
+
+            time.sleep(poll_interval)
+
+    def _index_info(self, index_name: str) -> Dict[str, Any]:
+        """
+        Read FT.INFO of an index or alias, or None when it does not exist.
+        """
+        try:
+            return self.redis_client.ft(index_name).info()
+        except Exception:
+            return None
+
+    def _index_version(self, index_name: str) -> int:
+        """
+        Version number of an index named '<index_name>_v<n>', 0 for any other name.
+        """
+        match = re.fullmatch(rf"{re.escape(self.index_name)}_v(\d+)", index_name or '')
+        return int(match.group(1)) if match else 0
+
+    @staticmethod
+    def decode_value(value: Any) -> str:
+        """Decode a bytes value of a raw reply, stringifying anything else"""
+        return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+    def _info_number(self, info: Dict[str, Any], name: str) -> int:
+        """Read a numeric FT.INFO field, reported as a string, 0 when missing"""
+        return int(float(self.decode_value(info.get(name, 0))))
+
+    def _attribute_type(self, info: Dict[str, Any], name: str) -> str:
+        """
+        Read the type of an indexed attribute from FT.INFO output.
+        """
+        return self._attribute_properties(info, name).get('type')
+
+    def _attribute_properties(self, info: Dict[str, Any], name: str) -> Dict[str, str]:
+        """
+        Read the properties of an indexed attribute from FT.INFO output.
+        """
+        for attribute in info.get('attributes', []):
+            values = [self.decode_value(value) for value in attribute]
+            properties = dict(zip(values[::2], values[1::2]))
+            if properties.get('attribute') == name or properties.get('identifier') == name:
+                return properties
+
+        return {}
 
     def insert(
         self,
@@ -89,72 +407,301 @@ class RedisVectorStorage(VectorStorageInterface):
         metadata: Dict[str, Any] = {}
     ) -> str:
         """
-        Store embeddings and metadata under a new hash key.
+        Store embeddings and metadata under the record's hash key.
         """
-        textual = self.embedding_to_bytes(textual_embedding)
-        visual = self.embedding_to_bytes(visual_embedding)
-        key_id = str(uuid.uuid4())
+        key_id = self.make_key_id(metadata)
         redis_key = f"{self.prefix}:{key_id}"
+        mapping = self._build_mapping(textual_embedding, visual_embedding, metadata)
 
-        mapping = {
-            'textual_embedding': textual,
-            'visual_embedding': visual,
+        pipeline = self.redis_client.pipeline(transaction=False)
+        pipeline.hset(redis_key, mapping=mapping)
+        pipeline.incr(self.generation_key)
+        pipeline.execute()
+
+        return key_id
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store many records through a Redis pipeline, one round trip per chunk.
+
+        Each record holds 'textual_embedding' and 'visual_embedding' alongside its metadata.
+        """
+        key_ids = []
+
+        for start in range(0, len(records), self.pipeline_chunk_size):
+            chunk = records[start:start + self.pipeline_chunk_size]
+            pipeline = self.redis_client.pipeline(transaction=False)
+
+            for record in chunk:
+                key_id = self.make_key_id(record)
+                mapping = self._build_mapping(
+                    record['textual_embedding'],
+                    record['visual_embedding'],
+                    record
+                )
+                pipeline.hset(f"{self.prefix}:{key_id}", mapping=mapping)
+                key_ids.append(key_id)
+
+            pipeline.incr(self.generation_key)
+            pipeline.execute()
+
+        return key_ids
+
+    def export_snapshot(self, path: str) -> int:
+        """
+        Scan every hash under the index prefix and write it to an IndexSnapshot directory.
+        """
+        writer = IndexSnapshotWriter(path, self.vector_dim)
+        fields = ['textual_embedding', 'visual_embedding', 'animal', 'caption', 'image_path']
+        key_prefix_length = len(self.prefix) + 1
+
+        keys = []
+        for redis_key in self.redis_client.scan_iter(match=f"{self.prefix}:*", count=self.pipeline_chunk_size):
+            keys.append(redis_key)
+            if len(keys) >= self.pipeline_chunk_size:
+                self._export_chunk(writer, keys, fields, key_prefix_length)
+                keys = []
+
+        if keys:
+            self._export_chunk(writer, keys, fields, key_prefix_length)
+
+        writer.close()
+        return writer.count
+
+    def _export_chunk(self, writer, redis_keys: list, fields: list, key_prefix_length: int) -> None:
+        """
+        Fetch a chunk of hashes in one pipelined round trip and append them to the snapshot.
+        """
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for redis_key in redis_keys:
+            pipeline.hmget(redis_key, fields)
+
+        key_ids, textual, visual, metadata = [], [], [], []
+        for redis_key, values in zip(redis_keys, pipeline.execute()):
+            if values[0] is None or values[1] is None:
+                continue
+
+            key_ids.append(redis_key.decode('utf-8')[key_prefix_length:])
+            textual.append(np.frombuffer(values[0], dtype=self.storage_dtype).astype(np.float32))
+            visual.append(np.frombuffer(values[1], dtype=self.storage_dtype).astype(np.float32))
+            metadata.append({
+                'animal': (values[2] or b'').decode('utf-8'),
+                'caption': (values[3] or b'').decode('utf-8'),
+                'image_path': (values[4] or b'').decode('utf-8'),
+            })
+
+        if key_ids:
+            writer.append(key_ids, np.stack(textual), np.stack(visual), metadata)
+
+    def _build_mapping(
+        self,
+        textual_embedding: np.ndarray,
+        visual_embedding: np.ndarray,
+        metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Build the hash fields stored for one record.
+        """
+        return {
+            'textual_embedding': self.embedding_to_bytes(textual_embedding),
+            'visual_embedding': self.embedding_to_bytes(visual_embedding),
             'animal': metadata.get('animal', ''),
             'caption': metadata.get('caption', ''),
             'image_path': metadata.get('image_path', ''),
         }
 
-        self.redis_client.hset(redis_key, mapping=mapping)
-
-        return key_id
-
     def search(
         self,
         query_vector: np.ndarray,
         top_k: int = 5,
-        embedding_type: str = 'textual'
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
     ) -> List[Dict[str, Any]]:
         """
         Perform KNN search on specified vector field and return top results with metadata.
+
+        Filters are applied inside the index as a TAG pre-filter of the KNN query.
+        ef_runtime overrides the HNSW candidate list size of this query only.
+        """
+
+        if query_vector is None:
+            return []
+
+        query = self.build_query(top_k, embedding_type, filters, ef_runtime)
+        search_args = self.build_search_args(query, query_vector)
+        reply = self._read(lambda client: client.execute_command('FT.SEARCH', *search_args))
+
+        # example return: [{'id': '3f0c...', 'animal': 'tiger', 'caption': 'a tiger standing on a red bench in a zoo', 'image_path': 'dataset/animal_images/tiger/712d7f2306.jpg', 'vector_distance': 0.0}]
+        return self.parse_search_reply(reply)
+
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run one KNN search per query vector, pipelined in chunks of pipeline_chunk_size.
         """
+        query = self.build_query(top_k, embedding_type, filters, ef_runtime)
+        results = []
 
+        for start in range(0, len(query_vectors), self.pipeline_chunk_size):
+            chunk = query_vectors[start:start + self.pipeline_chunk_size]
+
+            for reply in self._read(lambda client: self._execute_searches(client, query, chunk)):
+                results.append(self.parse_search_reply(reply))
+
+        return results
+
+    def _execute_searches(self, client, query: Query, query_vectors: np.ndarray) -> list:
+        """
+        Send one FT.SEARCH per query vector in a single pipelined round trip.
+        """
+        pipeline = client.pipeline(transaction=False)
+        for query_vector in query_vectors:
+            pipeline.execute_command('FT.SEARCH', *self.build_search_args(query, query_vector))
+
+        return pipeline.execute()
+
+    def get_index_generation(self) -> int:
+        """
+        Read the write counter from the primary, shared by every process using the index.
+        """
+        return int(self.redis_client.get(self.generation_key) or 0)
+
+    def supports_ef_runtime(self) -> bool:
+        return True
+
+    def choose_read_replica(self) -> int:
+        """
+        Pick the replica serving the next search, or None to search the primary.
+
+        An ejected replica due for a probe is picked first. Healthy replicas are
+        then used in turn (round_robin), or the faster by latency EWMA of two
+        picked at random (least_latency), which avoids sending every search to
+        the same replica. The primary serves searches when no replica is available.
+        """
+        healthy = []
+        for index, health in enumerate(self.replica_health):
+            if health.healthy:
+                healthy.append(index)
+            elif health.is_available():
+                return index
+
+        if not healthy:
+            return None
+
+        if self.read_balancing == 'least_latency' and len(healthy) > 1:
+            return min(random.sample(healthy, 2), key=lambda index: self.replica_health[index].latency_ewma or 0)
+
+        return healthy[next(self._next_replica) % len(healthy)]
+
+    def get_replica_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get the health, request counts and latency of every read replica.
+        """
+        return [health.stats() for health in self.replica_health]
+
+    def _read(self, command: Callable):
+        """
+        Run a read command on a replica, falling back to the primary if the replica fails.
+        """
+        index = self.choose_read_replica()
+        if index is None:
+            return command(self.redis_client)
+
+        start_time = time.perf_counter()
+        try:
+            result = command(self.read_clients[index])
+        except self.REPLICA_ERRORS as err:
+            self.replica_health[index].record_failure(err)
+            return command(self.redis_client)
+
+        self.replica_health[index].record_success(time.perf_counter() - start_time)
+        return result
+
+    def build_query(
+        self,
+        top_k: int,
+        embedding_type: str,
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> Query:
+        """
+        Build the KNN query over the textual or visual embedding field.
+
+        ef_runtime is ignored by FLAT indexes, which always search exhaustively.
+        """
         field = 'textual_embedding' if embedding_type == 'textual' else 'visual_embedding'
+        filter_expression = self._build_filter_expression(filters)
+        knn_options = f" EF_RUNTIME {int(ef_runtime)}" if ef_runtime and self.algorithm == 'HNSW' else ''
 
-        query = (
-            Query(f"*=>[KNN {top_k} @{field} $vec AS vector_distance]")
+        return (
+            Query(f"{filter_expression}=>[KNN {top_k} @{field} $vec{knn_options} AS vector_distance]")
                 .return_fields("animal", "caption", "image_path", "vector_distance")
                 .sort_by("vector_distance")
+                .paging(0, top_k)
                 .dialect(2)
         )
 
-        query_vector = self.embedding_to_bytes(query_vector)
+    def build_search_args(self, query: Query, query_vector: np.ndarray) -> list:
+        """
+        Build the FT.SEARCH arguments of a KNN query, shared by the sync and async clients.
+        """
+        return [
+            self.index_name,
+            *query.get_args(),
+            'PARAMS', 2, 'vec', self.embedding_to_bytes(query_vector)
+        ]
+
+    def parse_search_reply(self, reply: list) -> List[Dict[str, Any]]:
+        """
+        Decode a raw FT.SEARCH reply straight into result dicts.
 
-        if query_vector is None:
-            return []
+        The reply is [total, key, [field, value, ...], key, [...], ...]. Reading it
+        directly skips redis-py's Result/Document objects, which cost more than the
+        search itself for large top_k.
+        """
+        key_prefix_length = len(self.prefix) + 1
+        results = []
 
-        result = self.redis_client.ft(self.index_name).search(
-            query,
-            query_params={
-                'vec': query_vector
-            }
-        )
+        for index in range(1, len(reply) - 1, 2):
+            fields = reply[index + 1]
+            if not fields:
+                continue
 
-        # Convert Redis documents to dicts
-        results_as_dict = []
-        for doc in result.docs:
-            results_as_dict.append({
-                'animal': doc.animal,
-                'caption': doc.caption,
-                'image_path': doc.image_path,
-                'vector_distance': float(doc.vector_distance)
+            values = dict(zip(fields[::2], fields[1::2]))
+            results.append({
+                'id': reply[index][key_prefix_length:].decode('utf-8'),
+                'animal': values.get(b'animal', b'').decode('utf-8'),
+                'caption': values.get(b'caption', b'').decode('utf-8'),
+                'image_path': values.get(b'image_path', b'').decode('utf-8'),
+                'vector_distance': float(values[b'vector_distance'])
             })
 
-        # example return: [{'animal': 'tiger', 'caption': 'a tiger standing on a red bench in a zoo', 'image_path': 'dataset/animal_images/tiger/712d7f2306.jpg', 'vector_distance': 0.0}]
-        return results_as_dict
+        return results
+
+    def _build_filter_expression(self, filters: Dict[str, Any]) -> str:
+        """
+        Build the pre-filter of a KNN query, e.g. '(@animal:{tiger | snow\\ leopard})'.
+        """
+        clauses = []
+        for field, values in self.normalize_filters(filters).items():
+            escaped = ' | '.join(self.TAG_SPECIAL_CHARACTERS.sub(r'\\\1', value) for value in values)
+            clauses.append(f"@{field}:{{{escaped}}}")
+
+        if not clauses:
+            return '*'
+
+        return f"({' '.join(clauses)})"
 
     def embedding_to_bytes(self, embedding: np.ndarray) -> bytes:
         """
-        Convert the embedding to bytes.
+        Convert the embedding to bytes at the configured storage precision.
         """
 
-        return embedding.astype(np.float32).tobytes()
\ No newline at end of file
+        return np.asarray(embedding).astype(self.storage_dtype).tobytes()
\ No newline at end of file
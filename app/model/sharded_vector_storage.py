@@ -0,0 +1,251 @@
+from interface import VectorStorage as VectorStorageInterface
+from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+import hashlib
+import heapq
+import time
+import numpy as np
+import yaml
+from utils import PathHelper, EndpointHealth
+from .redis_vector_storage import RedisVectorStorage
+from .numpy_vector_storage import NumpyVectorStorage
+from .ivf_vector_storage import IVFVectorStorage
+from .pq_vector_storage import PQVectorStorage
+
+class ShardedVectorStorage(VectorStorageInterface):
+    """
+    Vector storage hash-partitioning records across several backend storages (shards).
+
+    A record lives on the shard picked by a stable hash of its key, so
+    re-imports overwrite it in place. Searches are sent to every shard
+    concurrently on a thread pool and the per-shard top-k lists, each
+    sorted by distance, are merged with a heap. A shard failing or missing
+    shard_timeout only drops its part of the results; after repeated
+    failures it is skipped and probed periodically (EndpointHealth).
+
+    Changing the number of shards moves most keys, so the data has to be
+    re-imported or reloaded from a snapshot.
+    """
+
+    BACKENDS = {
+        'default': RedisVectorStorage,
+        'local': NumpyVectorStorage,
+        'ivf': IVFVectorStorage,
+        'pq': PQVectorStorage,
+    }
+
+    def __init__(self, shards: List[VectorStorageInterface] = None):
+        config_path = PathHelper.get_config_file('sharding_config.yaml')
+
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+
+        if shards is None:
+            backend = self.BACKENDS[config['sharding']['backend']]
+            shards = [backend(shard_config or None) for shard_config in config['sharding']['shards']]
+        if not shards:
+            raise ValueError("ShardedVectorStorage needs at least one shard")
+
+        self.shards = shards
+        self.shard_timeout = config['sharding'].get('shard_timeout')
+        failure_threshold = config['sharding'].get('failure_threshold', 3)
+        self.health = [
+            EndpointHealth(
+                f"Shard {index}",
+                failure_threshold,
+                config['sharding'].get('retry_interval', 30)
+            )
+            for index in range(len(shards))
+        ]
+        # Calls that missed shard_timeout keep their thread until the shard answers; a hung shard
+        # holds up to failure_threshold of them before it is skipped, so leave room for those
+        self.executor = ThreadPoolExecutor(
+            max_workers=config['sharding'].get('max_workers') or len(shards) * (failure_threshold + 1),
+            thread_name_prefix='shard'
+        )
+
+    def shard_of(self, key_id: str) -> int:
+        """
+        Get the shard of a record key, stable across processes and restarts.
+        """
+        digest = hashlib.blake2b(key_id.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') % len(self.shards)
+
+    def insert(
+        self,
+        textual_embedding: np.ndarray,
+        visual_embedding: np.ndarray,
+        metadata: Dict[str, Any] = {}
+    ) -> str:
+        """
+        Store embeddings and metadata on the record's shard.
+        """
+        record = dict(metadata, textual_embedding=textual_embedding, visual_embedding=visual_embedding)
+        return self.insert_many([record])[0]
+
+    def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Split the records by shard and write every shard's batch concurrently.
+
+        Each record holds 'textual_embedding' and 'visual_embedding' alongside its metadata.
+        """
+        key_ids = [self.make_key_id(record) for record in records]
+
+        batches = {}
+        for key_id, record in zip(key_ids, records):
+            # Pass the key on so every shard stores the record under the same id
+            batches.setdefault(self.shard_of(key_id), []).append(dict(record, id=key_id))
+
+        futures = [
+            self.executor.submit(self._call, index, 'insert_many', batch)
+            for index, batch in batches.items()
+        ]
+        for future in futures:
+            future.result()
+
+        return key_ids
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search every shard and return the overall top results with metadata.
+        """
+        if query_vector is None:
+            return []
+
+        return self.search_many(np.asarray(query_vector).reshape(1, -1), top_k, embedding_type, filters, ef_runtime)[0]
+
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Send all queries to every available shard at once and merge their top-k lists per query.
+
+        ef_runtime is passed on to shards supporting it, see supports_ef_runtime.
+        """
+        self.normalize_filters(filters)
+        query_vectors = np.asarray(query_vectors)
+
+        # When every shard is ejected, try them all rather than failing outright
+        indexes = [index for index in range(len(self.shards)) if self.health[index].is_available()]
+        indexes = indexes or list(range(len(self.shards)))
+
+        deadline = time.monotonic() + self.shard_timeout if self.shard_timeout is not None else None
+        options = {'ef_runtime': ef_runtime} if ef_runtime else {}
+        futures = {
+            self.executor.submit(
+                self._call, index, 'search_many', query_vectors, top_k, embedding_type, filters, deadline=deadline, **options
+            ): index
+            for index in indexes
+        }
+        done, not_done = wait(futures, timeout=self.shard_timeout)
+
+        shard_results = []
+        for future in done:
+            if future.exception() is not None:
+                print(f"Shard {futures[future]} search failed: {future.exception()}")
+                continue
+            shard_results.append(future.result())
+
+        for future in not_done:
+            error = TimeoutError(f"no reply within {self.shard_timeout}s")
+            self.health[futures[future]].record_failure(error)
+            print(f"Shard {futures[future]} search failed: {error}")
+
+        if not shard_results:
+            raise RuntimeError("No shard answered the search")
+
+        return [
+            list(islice(
+                heapq.merge(*(results[query] for results in shard_results), key=lambda result: result['vector_distance']),
+                top_k
+            ))
+            for query in range(len(query_vectors))
+        ]
+
+    def export_snapshot(self, path: str) -> int:
+        """
+        Write every shard to its own IndexSnapshot directory, '<path>/shard-<n>'.
+        """
+        futures = [
+            self.executor.submit(self._call, index, 'export_snapshot', str(Path(path) / f"shard-{index}"))
+            for index in range(len(self.shards))
+        ]
+
+        return sum(future.result() for future in futures)
+
+    def load_snapshot(self, path: str, batch_size: int = 1000) -> int:
+        """
+        Load a snapshot written by export_snapshot with the same number of shards, each shard its own part.
+
+        Any other snapshot is re-partitioned by inserting its records.
+        """
+        shard_paths = [Path(path) / f"shard-{index}" for index in range(len(self.shards))]
+        if not all(shard_path.is_dir() for shard_path in shard_paths) or (Path(path) / f"shard-{len(self.shards)}").exists():
+            return super().load_snapshot(path, batch_size)
+
+        futures = [
+            self.executor.submit(self._call, index, 'load_snapshot', str(shard_path), batch_size)
+            for index, shard_path in enumerate(shard_paths)
+        ]
+
+        return sum(future.result() for future in futures)
+
+    def get_index_generation(self) -> Any:
+        """
+        Combine the shards' generations. An ejected or failing shard counts as None, so the
+        generation also changes when a shard drops out of or rejoins the results.
+        """
+        generations = []
+        for shard, health in zip(self.shards, self.health):
+            try:
+                generations.append(shard.get_index_generation() if health.healthy else None)
+            except Exception:
+                generations.append(None)
+
+        return tuple(generations)
+
+    def supports_ef_runtime(self) -> bool:
+        return all(shard.supports_ef_runtime() for shard in self.shards)
+
+    def get_shard_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get the health, request counts and latency of every shard.
+        """
+        return [
+            dict(health.stats(), backend=type(shard).__name__)
+            for shard, health in zip(self.shards, self.health)
+        ]
+
+    def _call(self, index: int, method: str, *args, deadline: float = None, **kwargs):
+        """
+        Run a storage method on one shard, recording its latency or failure.
+
+        A call finishing after its deadline (time.monotonic()) records nothing:
+        the caller already counted it as failed, and a late success must not
+        reset the failures that eject a consistently slow shard.
+        """
+        start_time = time.perf_counter()
+        try:
+            result = getattr(self.shards[index], method)(*args, **kwargs)
+        except Exception as err:
+            if deadline is None or time.monotonic() <= deadline:
+                self.health[index].record_failure(err)
+            raise
+
+        if deadline is None or time.monotonic() <= deadline:
+            self.health[index].record_success(time.perf_counter() - start_time)
+        return result
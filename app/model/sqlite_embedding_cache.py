@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+class SQLiteEmbeddingCache:
+    """
+    Persistent embedding store backed by a single SQLite file.
+
+    Vectors are stored as raw float32 blobs. When the stored bytes exceed
+    max_size_bytes, the least recently used entries are evicted down to
+    90% of the limit.
+
+    The file may be shared by several processes, so the stored bytes are
+    counted in the database itself: triggers keep a one-row cache_stats
+    table up to date, and stores read it in the same write transaction
+    that evicts.
+
+    Lookups only read the database: access times are buffered in memory and
+    written in one transaction every ACCESS_FLUSH_SIZE hits or
+    ACCESS_FLUSH_INTERVAL seconds, and before stores and evictions.
+    """
+
+    EVICTION_TARGET = 0.9
+    ACCESS_FLUSH_SIZE = 1000
+    ACCESS_FLUSH_INTERVAL = 60
+
+    def __init__(self, path: Path, max_size_bytes: int):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+
+        self._lock = threading.Lock()
+        self._pending_access = {}
+        self._last_access_flush = time.monotonic()
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            'key TEXT PRIMARY KEY, '
+            'vector BLOB NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'last_access REAL NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache_stats ('
+            'id INTEGER PRIMARY KEY CHECK (id = 0), '
+            'total_size INTEGER NOT NULL)'
+        )
+        # Counts the entries of a cache file created before cache_stats existed
+        self.connection.execute(
+            'INSERT OR IGNORE INTO cache_stats (id, total_size) '
+            'SELECT 0, COALESCE(SUM(size), 0) FROM embeddings'
+        )
+        self.connection.execute(
+            'CREATE TRIGGER IF NOT EXISTS embeddings_size_insert AFTER INSERT ON embeddings '
+            'BEGIN UPDATE cache_stats SET total_size = total_size + NEW.size; END'
+        )
+        self.connection.execute(
+            'CREATE TRIGGER IF NOT EXISTS embeddings_size_update AFTER UPDATE OF size ON embeddings '
+            'BEGIN UPDATE cache_stats SET total_size = total_size - OLD.size + NEW.size; END'
+        )
+        self.connection.execute(
+            'CREATE TRIGGER IF NOT EXISTS embeddings_size_delete AFTER DELETE ON embeddings '
+            'BEGIN UPDATE cache_stats SET total_size = total_size - OLD.size; END'
+        )
+        self.connection.commit()
+
+    @property
+    def total_size(self) -> int:
+        """Bytes of vectors stored in the cache file, by every process using it."""
+        with self._lock:
+            return self._total_size()
+
+    def _total_size(self) -> int:
+        return self.connection.execute('SELECT total_size FROM cache_stats').fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up cached vectors and record their access time, written later in a batch.
+
+        Args:
+            keys (List[str]): Cache keys.
+
+        Returns:
+            Dict[str, np.ndarray]: The vectors found, by key.
+        """
+        found = {}
+        if not keys:
+            return found
+
+        unique_keys = list(dict.fromkeys(keys))
+
+        with self._lock:
+            # Stay well under SQLite's bound parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})',
+                    chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+
+            if found:
+                now = time.time()
+                self._pending_access.update((key, now) for key in found)
+
+                if (len(self._pending_access) >= self.ACCESS_FLUSH_SIZE
+                        or time.monotonic() - self._last_access_flush >= self.ACCESS_FLUSH_INTERVAL):
+                    self._flush_access()
+                    self.connection.commit()
+
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        """
+        Store vectors, evicting old entries if the cache grows past its limit.
+
+        Args:
+            items (Dict[str, np.ndarray]): Vectors to store, by key.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = np.ascontiguousarray(vector, dtype=np.float32).ravel().tobytes()
+            rows.append((key, blob, len(blob), now))
+
+        with self._lock:
+            # Take the write lock up front so no other process changes the size before the eviction
+            self.connection.commit()
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._flush_access()
+
+                # An upsert rather than INSERT OR REPLACE, whose implicit delete fires no trigger
+                self.connection.executemany(
+                    'INSERT INTO embeddings (key, vector, size, last_access) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (key) DO UPDATE SET '
+                    'vector = excluded.vector, size = excluded.size, last_access = excluded.last_access',
+                    rows
+                )
+
+                total_size = self._total_size()
+                if total_size > self.max_size_bytes:
+                    self._evict(total_size)
+
+                self.connection.commit()
+            except BaseException:
+                self.connection.rollback()
+                raise
+
+    def _flush_access(self) -> None:
+        """Write the buffered access times, in the caller's transaction."""
+        self._last_access_flush = time.monotonic()
+        if not self._pending_access:
+            return
+
+        # Entries evicted meanwhile, e.g. by another process, simply match no row
+        self.connection.executemany(
+            'UPDATE embeddings SET last_access = MAX(last_access, ?) WHERE key = ?',
+            [(accessed_at, key) for key, accessed_at in self._pending_access.items()]
+        )
+        self._pending_access.clear()
+
+    def _evict(self, total_size: int) -> None:
+        """Delete least recently used entries until the cache is back under its target size."""
+        target = self.max_size_bytes * self.EVICTION_TARGET
+        cursor = self.connection.execute('SELECT key, size FROM embeddings ORDER BY last_access')
+
+        evicted = []
+        for key, size in cursor:
+            if total_size <= target:
+                break
+            evicted.append((key,))
+            total_size -= size
+
+        self.connection.executemany('DELETE FROM embeddings WHERE key = ?', evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self.connection.commit()
+            self.connection.close()
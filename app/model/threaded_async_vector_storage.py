@@ -0,0 +1,57 @@
+from interface import AsyncVectorStorage as AsyncVectorStorageInterface
+from interface import VectorStorage as VectorStorageInterface
+from typing import List, Dict, Any
+import asyncio
+import numpy as np
+
+class ThreadedAsyncVectorStorage(AsyncVectorStorageInterface):
+    """
+    Async adapter running a synchronous vector storage in the default thread pool.
+
+    Used for in-process backends such as NumpyVectorStorage, whose searches
+    are CPU bound and release the GIL inside NumPy.
+    """
+
+    def __init__(self, vector_storage: VectorStorageInterface):
+        self.vector_storage = vector_storage
+
+    def normalize_filters(self, filters: Dict[str, Any]) -> Dict[str, List[str]]:
+        return self.vector_storage.normalize_filters(filters)
+
+    async def get_index_generation(self) -> Any:
+        return await asyncio.to_thread(self.vector_storage.get_index_generation)
+
+    def supports_ef_runtime(self) -> bool:
+        return self.vector_storage.supports_ef_runtime()
+
+    async def insert_many(self, records: List[Dict[str, Any]]) -> List[str]:
+        return await asyncio.to_thread(self.vector_storage.insert_many, records)
+
+    async def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 10,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(
+            self.vector_storage.search, query_vector, top_k, embedding_type, filters, **self._search_options(ef_runtime)
+        )
+
+    async def search_many(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 10,
+        embedding_type: str = 'textual',
+        filters: Dict[str, Any] = None,
+        ef_runtime: int = None
+    ) -> List[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(
+            self.vector_storage.search_many, query_vectors, top_k, embedding_type, filters, **self._search_options(ef_runtime)
+        )
+
+    @staticmethod
+    def _search_options(ef_runtime: int = None) -> dict:
+        """Pass ef_runtime on only when set, as storages without HNSW do not accept it"""
+        return {'ef_runtime': ef_runtime} if ef_runtime else {}
@@ -0,0 +1,3 @@
+from .import_pipeline import ImportPipeline
+from .import_checkpoint import ImportCheckpoint
+from .shared_image_batch import SharedImageBatch
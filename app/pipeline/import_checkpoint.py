@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+from utils import ContentHash
+
+class ImportCheckpoint:
+    """
+    Append-only manifest of the images already embedded and written.
+
+    Each line is a JSON object describing one stored image: its record path,
+    the size/mtime it had when imported, the fingerprint of its bytes and
+    caption, and the storage key it was written under. Re-running the import
+    skips every image whose fingerprint is unchanged, so a crashed or
+    incremental run only pays for new or modified files.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._compact()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the manifest, keeping the latest entry per image path."""
+        entries = {}
+        if not self.path.exists():
+            return entries
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave the last line half-written
+                    continue
+                entries[entry['image_path']] = entry
+
+        return entries
+
+    def _compact(self) -> None:
+        """Rewrite the manifest with one line per image, dropping superseded entries."""
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def fingerprint(self, image_path: str, source_path: Path, caption: str) -> Dict[str, Any]:
+        """
+        Describe an image and its caption for change detection.
+
+        The content hash is only recomputed when the file size or mtime differ
+        from the manifest, so unchanged files cost a stat call.
+        """
+        stat = os.stat(source_path)
+        caption_hash = ContentHash.text_digest(caption)
+        previous = self.entries.get(image_path)
+
+        if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+            content_hash = previous['content_hash']
+        else:
+            content_hash = ContentHash.file_digest(source_path)
+
+        return {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'content_hash': content_hash,
+            'caption_hash': caption_hash,
+        }
+
+    def is_done(self, image_path: str, fingerprint: Dict[str, Any]) -> bool:
+        """Check whether an image was already written with the same content and caption."""
+        previous = self.entries.get(image_path)
+
+        return previous is not None \
+            and previous['content_hash'] == fingerprint['content_hash'] \
+            and previous['caption_hash'] == fingerprint['caption_hash']
+
+    def mark_done(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Durably record written images.
+
+        Args:
+            items (List[Dict[str, Any]]): Entries holding 'image_path', 'key' and the fingerprint fields.
+        """
+        with self._lock:
+            for item in items:
+                self.entries[item['image_path']] = item
+                self._file.write(json.dumps(item) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,471 @@
+import csv
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import yaml
+from utils import PathHelper
+from .import_checkpoint import ImportCheckpoint
+from .shared_image_batch import SharedImageBatch
+
+# Marker telling a stage worker that its upstream stage has finished
+_STOP = object()
+
+class ImportPipeline:
+    """
+    Concurrent bulk importer for the animal dataset.
+
+    The import is split into stages connected by bounded queues, so reading
+    files, embedding and writing to the vector storage overlap instead of
+    running one image at a time:
+
+        file discovery -> caption join -> [image decoding] -> batched embedding -> storage writes
+
+    Each stage after discovery runs on its own pool of worker threads whose
+    size is read from import_config.yaml. When decoding is enabled, image
+    files are read and decoded by a pool of processes into shared memory, so
+    the CPU-bound work scales with cores instead of contending for the GIL.
+    When the checkpoint is enabled, images already written with the same
+    bytes and caption are skipped.
+    """
+
+    CONFIG_FILE_NAME = 'import_config.yaml'
+
+    def __init__(self, search_system, dataset_dir: Path, logger, performance_monitor):
+        config_path = PathHelper.get_config_file(self.CONFIG_FILE_NAME)
+
+        with open(config_path, 'r') as f:
+            full_config = yaml.safe_load(f)
+
+        config = full_config['pipeline']
+        checkpoint_config = full_config.get('checkpoint') or {}
+        decoding_config = full_config.get('decoding') or {}
+
+        self.caption_workers = config.get('caption_workers', 2)
+        self.embedding_workers = config.get('embedding_workers', 4)
+        self.writer_workers = config.get('writer_workers', 2)
+        self.embedding_batch_size = config.get('embedding_batch_size', 64)
+        self.queue_size = config.get('queue_size', 8)
+        self.image_extensions = tuple(config.get('image_extensions', ['.jpg', '.jpeg', '.png', '.gif']))
+
+        self.search_system = search_system
+        self.dataset_dir = Path(dataset_dir)
+        self.images_dir = self.dataset_dir / 'animal_images'
+        self.captions_dir = self.dataset_dir / 'animal_captions'
+        self.logger = logger
+        self.performance_monitor = performance_monitor
+
+        self.decoder = None
+        if decoding_config.get('enabled', False):
+            self.decoding_chunk_size = decoding_config.get('chunk_size', 8)
+            self.decoded_size = decoding_config.get('size', 224)
+            # import.py has no __main__ guard, so workers are forked rather than
+            # spawned, which would re-run the whole import in every worker
+            self.decoder = ProcessPoolExecutor(
+                max_workers=decoding_config.get('workers') or os.cpu_count(),
+                mp_context=multiprocessing.get_context('fork')
+            )
+
+        self.checkpoint = None
+        if checkpoint_config.get('enabled', False):
+            self.checkpoint = ImportCheckpoint(
+                PathHelper.get_project_root() / 'app' / checkpoint_config['path']
+            )
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.animal_details = {}
+        self.results = {
+            'successful_animals': 0,
+            'failed_animals': 0,
+            'total_images': 0,
+            'successful_images': 0,
+            'failed_images': 0,
+            'skipped_images': 0,
+        }
+
+    def run(self, animal_names: List[str]) -> Dict[str, Any]:
+        """
+        Import every animal in the list and block until all stages are drained.
+
+        Args:
+            animal_names (List[str]): Animals to import, one image folder each.
+
+        Returns:
+            Dict[str, Any]: Aggregated counters plus per-animal stats under 'animal_details'.
+        """
+        discovered = queue.Queue(maxsize=self.queue_size)
+        to_embed = queue.Queue(maxsize=self.queue_size)
+        to_write = queue.Queue(maxsize=self.queue_size)
+
+        # Captioned batches go through the decode stage when it is enabled
+        caption_output = to_embed
+        if self.decoder is not None:
+            caption_output = to_decode = queue.Queue(maxsize=self.queue_size)
+            # Fork every decoder process now, before the stage threads exist
+            self.decoder.submit(int).result()
+
+        stages = [
+            threading.Thread(
+                target=self._run_source,
+                args=(animal_names, discovered, self.caption_workers),
+                name='import-discovery'
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=('caption', self._join_captions, discovered, caption_output,
+                      self.caption_workers, self.embedding_workers),
+                name='import-caption'
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=('embed', self._embed_batch, to_embed, to_write,
+                      self.embedding_workers, self.writer_workers),
+                name='import-embed'
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=('write', self._write_batch, to_write, None,
+                      self.writer_workers, 0),
+                name='import-write'
+            ),
+        ]
+
+        if self.decoder is not None:
+            stages.append(threading.Thread(
+                target=self._run_stage,
+                args=('decode', self._decode_batch, to_decode, to_embed,
+                      self.embedding_workers, self.embedding_workers),
+                name='import-decode'
+            ))
+
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+        if self.decoder is not None:
+            self.decoder.shutdown()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+        return dict(self.results, animal_details=self.animal_details)
+
+    def _run_source(self, animal_names: List[str], output_queue: queue.Queue, downstream_workers: int) -> None:
+        """Discover image files for each animal and feed them to the caption stage."""
+        try:
+            for animal_name in animal_names:
+                task = self._discover(animal_name)
+                if task is not None:
+                    output_queue.put(task)
+        finally:
+            for _ in range(downstream_workers):
+                output_queue.put(_STOP)
+
+    def _run_stage(
+        self,
+        name: str,
+        handler: Callable[[Any, queue.Queue], None],
+        input_queue: queue.Queue,
+        output_queue: queue.Queue,
+        workers: int,
+        downstream_workers: int
+    ) -> None:
+        """Run a pool of workers on a stage, then signal the next stage to stop."""
+
+        def worker():
+            while True:
+                item = input_queue.get()
+                if item is _STOP:
+                    return
+                try:
+                    handler(item, output_queue)
+                except Exception as e:
+                    self.logger.error(f"Unexpected error in {name} stage: {e}")
+
+        threads = [
+            threading.Thread(target=worker, name=f"import-{name}-{index}")
+            for index in range(max(1, workers))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for _ in range(downstream_workers):
+            output_queue.put(_STOP)
+
+    def _discover(self, animal_name: str) -> Dict[str, Any]:
+        """List the image files of one animal, or record why it cannot be imported."""
+        with self._lock:
+            self.performance_monitor.start_animal_processing(animal_name)
+            self.animal_details[animal_name] = {
+                'animal_name': animal_name,
+                'images_found': 0,
+                'captions_found': 0,
+                'successful_inserts': 0,
+                'failed_inserts': 0,
+                'skipped_images': 0,
+                'processing_time': 0,
+                'errors': []
+            }
+
+        animal_images_path = self.images_dir / animal_name
+
+        if not animal_images_path.exists():
+            self._fail_animal(
+                animal_name,
+                f"Animal images directory for {animal_name} does not exist: {animal_images_path}",
+                warning=True
+            )
+            return None
+
+        try:
+            image_files = [f for f in os.listdir(animal_images_path) if f.endswith(self.image_extensions)]
+            image_files.sort()
+        except Exception as e:
+            self._fail_animal(animal_name, f"Error listing images for {animal_name}: {e}")
+            return None
+
+        self.animal_details[animal_name]['images_found'] = len(image_files)
+        self.logger.info(f"Found {len(image_files)} images for {animal_name}")
+
+        return {
+            'animal_name': animal_name,
+            'images_path': animal_images_path,
+            'image_files': image_files,
+        }
+
+    def _join_captions(self, task: Dict[str, Any], output_queue: queue.Queue) -> None:
+        """Read the caption file of an animal and emit embedding batches of captioned images."""
+        animal_name = task['animal_name']
+        animal_stats = self.animal_details[animal_name]
+        animal_captions_path = self.captions_dir / f"caption_{animal_name}.csv"
+
+        if not animal_captions_path.exists():
+            self._fail_animal(
+                animal_name,
+                f"Caption file for {animal_name} does not exist: {animal_captions_path}",
+                warning=True
+            )
+            return
+
+        captions = {}
+        try:
+            with open(animal_captions_path, 'r', encoding='utf-8') as f:
+                csv_reader = csv.reader(f)
+                for row in csv_reader:
+                    if len(row) >= 2:
+                        caption = row[1].strip().strip('"')
+                        key = row[0].split('/')[-1].split('.')[0]
+                        captions[key] = caption
+            animal_stats['captions_found'] = len(captions)
+            self.logger.info(f"Found {len(captions)} captions for {animal_name}")
+        except Exception as e:
+            error_msg = f"Error reading captions for {animal_name}: {e}"
+            self.logger.error(error_msg)
+            animal_stats['errors'].append(error_msg)
+
+        image_files = task['image_files']
+        self.logger.info(f"Processing {animal_name}: {len(image_files)} images, {len(captions)} captions")
+
+        with self._lock:
+            self._pending[animal_name] = len(image_files)
+            self.results['total_images'] += len(image_files)
+
+        if not image_files:
+            self._finalize_animal(animal_name)
+            return
+
+        batch = []
+        for image_filename in image_files:
+            caption = captions.get(image_filename.split('.')[0])
+
+            if caption is None:
+                self._finish_item(animal_name, False, f"No caption found for image {image_filename}")
+                continue
+
+            image_path = task['images_path'] / image_filename
+            record_path = 'dataset/' + str(image_path.relative_to(self.dataset_dir)).replace('\\', '/')
+
+            fingerprint = None
+            if self.checkpoint is not None:
+                try:
+                    fingerprint = self.checkpoint.fingerprint(record_path, image_path, caption)
+                except OSError as e:
+                    self._finish_item(animal_name, False, f"Error reading {image_filename} for {animal_name}: {e}")
+                    continue
+
+                if self.checkpoint.is_done(record_path, fingerprint):
+                    self._finish_item(animal_name, True, skipped=True)
+                    continue
+
+            batch.append({
+                'image_filename': image_filename,
+                'source_path': image_path,
+                'fingerprint': fingerprint,
+                'record': {
+                    'animal': animal_name,
+                    'caption': caption,
+                    'image_path': record_path
+                }
+            })
+
+            if len(batch) >= self.embedding_batch_size:
+                output_queue.put(batch)
+                batch = []
+
+        if batch:
+            output_queue.put(batch)
+
+    def _decode_batch(self, batch: List[Dict[str, Any]], output_queue: queue.Queue) -> None:
+        """Decode the images of a batch on the decoder processes, into one shared memory block."""
+        shared_images = SharedImageBatch(len(batch), self.decoded_size)
+
+        try:
+            futures = [
+                self.decoder.submit(
+                    SharedImageBatch.decode_into,
+                    shared_images.name,
+                    len(batch),
+                    self.decoded_size,
+                    [(slot, str(batch[slot]['source_path']))
+                     for slot in range(start, min(start + self.decoding_chunk_size, len(batch)))]
+                )
+                for start in range(0, len(batch), self.decoding_chunk_size)
+            ]
+            errors = dict(result for future in futures for result in future.result())
+        except Exception as e:
+            errors = {slot: str(e) for slot in range(len(batch))}
+
+        decoded = []
+        for slot, item in enumerate(batch):
+            if errors.get(slot) is None:
+                decoded.append(dict(item, slot=slot))
+            else:
+                self._finish_item(
+                    item['record']['animal'],
+                    False,
+                    f"Error decoding {item['image_filename']} for {item['record']['animal']}: {errors[slot]}"
+                )
+
+        if not decoded:
+            shared_images.release()
+            return
+
+        output_queue.put((decoded, shared_images))
+
+    def _embed_batch(self, batch, output_queue: queue.Queue) -> None:
+        """Embed the captions and images of a batch with one model call each.
+
+        The batch is a list of items, or an (items, SharedImageBatch) pair when
+        its images were decoded by the decode stage.
+        """
+        start_time = time.time()
+
+        shared_images = None
+        if isinstance(batch, tuple):
+            batch, shared_images = batch
+
+        try:
+            textual_embeddings = self.search_system.embed_texts([item['record']['caption'] for item in batch])
+            if shared_images is not None:
+                images = shared_images.images([item['slot'] for item in batch])
+            else:
+                images = [str(item['source_path']) for item in batch]
+            visual_embeddings = self.search_system.embed_images(images)
+        except Exception as e:
+            for item in batch:
+                self._finish_item(
+                    item['record']['animal'],
+                    False,
+                    f"Error embedding {item['image_filename']} for {item['record']['animal']}: {e}"
+                )
+            return
+        finally:
+            if shared_images is not None:
+                shared_images.release()
+
+        output_queue.put((batch, textual_embeddings, visual_embeddings, start_time))
+
+    def _write_batch(self, embedded_batch: tuple, output_queue: queue.Queue) -> None:
+        """Write an embedded batch to the vector storage."""
+        batch, textual_embeddings, visual_embeddings, start_time = embedded_batch
+
+        records = [
+            dict(item['record'], textual_embedding=textual_embedding, visual_embedding=visual_embedding)
+            for item, textual_embedding, visual_embedding
+            in zip(batch, textual_embeddings, visual_embeddings)
+        ]
+
+        try:
+            key_ids = self.search_system.vector_storage.insert_many(records)
+            if self.checkpoint is not None:
+                self.checkpoint.mark_done([
+                    dict(item['fingerprint'], image_path=item['record']['image_path'], key=key_id)
+                    for item, key_id in zip(batch, key_ids)
+                ])
+        except Exception as e:
+            for item in batch:
+                animal_name = item['record']['animal']
+                self._finish_item(animal_name, False, f"Error inserting {item['image_filename']} for {animal_name}: {e}")
+        else:
+            for item in batch:
+                self._finish_item(item['record']['animal'], True)
+                self.logger.debug(f"Successfully inserted {item['image_filename']} for {item['record']['animal']}")
+
+        with self._lock:
+            self.performance_monitor.record_batch_processing(len(batch), time.time() - start_time)
+
+    def _finish_item(self, animal_name: str, success: bool, error_msg: str = None, skipped: bool = False) -> None:
+        """Record the outcome of one image and close the animal once all its images are done."""
+        if error_msg:
+            self.logger.error(error_msg)
+
+        with self._lock:
+            animal_stats = self.animal_details[animal_name]
+            if skipped:
+                animal_stats['skipped_images'] += 1
+                self.results['skipped_images'] += 1
+            elif success:
+                animal_stats['successful_inserts'] += 1
+                self.results['successful_images'] += 1
+            else:
+                animal_stats['failed_inserts'] += 1
+                animal_stats['errors'].append(error_msg)
+                self.results['failed_images'] += 1
+
+            self._pending[animal_name] -= 1
+            done = self._pending[animal_name] == 0
+
+        if done:
+            self._finalize_animal(animal_name)
+
+    def _finalize_animal(self, animal_name: str) -> None:
+        """Mark an animal as finished once every one of its images has been handled."""
+        with self._lock:
+            animal_stats = self.animal_details[animal_name]
+            animal_stats['processing_time'] = self.performance_monitor.end_animal_processing(
+                animal_name, animal_stats['images_found']
+            )
+
+            if animal_stats['successful_inserts'] + animal_stats['skipped_images'] > 0:
+                self.results['successful_animals'] += 1
+            else:
+                self.results['failed_animals'] += 1
+
+    def _fail_animal(self, animal_name: str, error_msg: str, warning: bool = False) -> None:
+        """Record an animal that could not be imported at all."""
+        if warning:
+            self.logger.warning(error_msg)
+        else:
+            self.logger.error(error_msg)
+
+        with self._lock:
+            self.animal_details[animal_name]['errors'].append(error_msg)
+            self.results['failed_animals'] += 1
+            self.performance_monitor.end_animal_processing(animal_name, 0)
@@ -0,0 +1,74 @@
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from utils import ImagePreprocessor
+
+class SharedImageBatch:
+    """
+    Decoded images of one import batch, stored as a (count, size, size, 3) uint8
+    array in a shared memory block.
+
+    The pipeline allocates the block and decoder processes write their images
+    straight into it, so pixels never travel through pickling on the way back.
+    The creator frees the block with release(); blocks are kept out of the
+    multiprocessing resource tracker, whose per-process cleanup would
+    otherwise unlink them when any decoder process exits.
+    """
+
+    def __init__(self, count: int, size: int, name: str = None):
+        self.count = count
+        self.size = size
+        nbytes = max(1, count * size * size * 3)
+        self.shared_memory = shared_memory.SharedMemory(name=name, create=name is None, size=nbytes)
+        resource_tracker.unregister(self.shared_memory._name, 'shared_memory')
+        self.pixels = np.ndarray((count, size, size, 3), dtype=np.uint8, buffer=self.shared_memory.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shared_memory.name
+
+    def images(self, slots: List[int]) -> List[Image.Image]:
+        """Get the decoded images in the given slots"""
+        return [Image.fromarray(self.pixels[slot]) for slot in slots]
+
+    def close(self) -> None:
+        """Detach from the block, keeping it alive for other processes"""
+        del self.pixels
+        self.shared_memory.close()
+
+    def release(self) -> None:
+        """Detach from the block and free it; called by the process that created it"""
+        self.close()
+        # unlink() unregisters the block from the tracker, so register it back first
+        resource_tracker.register(self.shared_memory._name, 'shared_memory')
+        self.shared_memory.unlink()
+
+    @staticmethod
+    def decode_into(name: str, count: int, size: int, tasks: List[Tuple[int, str]]) -> List[Tuple[int, Optional[str]]]:
+        """
+        Decode image files into their slots of a shared batch. Runs in a decoder process.
+
+        Args:
+            name (str): Shared memory block of the batch.
+            count (int): Images in the batch.
+            size (int): Side of the decoded square images.
+            tasks (List[Tuple[int, str]]): (slot, image path) pairs to decode.
+
+        Returns:
+            List[Tuple[int, Optional[str]]]: (slot, error message or None) for every task.
+        """
+        batch = SharedImageBatch(count, size, name)
+        results = []
+
+        try:
+            for slot, image_path in tasks:
+                try:
+                    batch.pixels[slot] = np.asarray(ImagePreprocessor.decode(image_path, size))
+                    results.append((slot, None))
+                except Exception as e:
+                    results.append((slot, str(e)))
+        finally:
+            batch.close()
+
+        return results
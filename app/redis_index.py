@@ -0,0 +1,37 @@
+import argparse
+import time
+from model import RedisVectorStorage
+
+# Inspect the Redis vector index, or rebuild it with the settings of
+# redis_config.yaml without downtime. After changing storage_precision,
+# migrate re-encodes the stored vectors and then rebuilds; stop the
+# importer first, and expect partial results until the rebuild is done.
+#
+#   python redis_index.py check
+#   python redis_index.py rebuild
+#   python redis_index.py migrate
+
+parser = argparse.ArgumentParser(description='Check or rebuild the Redis vector index')
+parser.add_argument('action', choices=['check', 'rebuild', 'migrate'])
+parser.add_argument('--timeout', type=float, help='Seconds to wait for the new index to finish indexing')
+args = parser.parse_args()
+
+# The live index may not match the configuration yet, which is what check and migrate are for
+vector_storage = RedisVectorStorage(verify_storage_format=False)
+
+if args.action == 'check':
+    info = vector_storage.redis_client.ft(vector_storage.index_name).info()
+    mismatches = vector_storage.index_settings_mismatches(info)
+    print(f"Index '{vector_storage.index_name}' -> '{vector_storage.decode_value(info['index_name'])}', "
+          f"{vector_storage.decode_value(info['num_docs'])} documents")
+    for setting, expected, actual in mismatches:
+        print(f"  {setting}: indexed {actual}, configured {expected}")
+    if not mismatches:
+        print("  Matches the configured settings")
+else:
+    start_time = time.time()
+    if args.action == 'migrate':
+        migrated = vector_storage.migrate_storage_precision()
+        print(f"Re-encoded {migrated} records as {vector_storage.storage_precision} in {time.time() - start_time:.2f}s")
+    index_name = vector_storage.rebuild_index(args.timeout)
+    print(f"Rebuilt '{vector_storage.index_name}' as '{index_name}' in {time.time() - start_time:.2f}s")
@@ -0,0 +1,30 @@
+import argparse
+import time
+from model.factory import SearchSystemFactory
+
+# Export the vector index of the configured search system to an IndexSnapshot
+# directory, or load one back into it.
+#
+#   python snapshot.py export snapshots/animal_index
+#   python snapshot.py load snapshots/animal_index
+#
+# An export writes a new version, snapshots/animal_index.v<n>, and then
+# atomically repoints the snapshots/animal_index symlink at it, so a process
+# loading the snapshot meanwhile reads either the old or the new version.
+
+parser = argparse.ArgumentParser(description='Export or load a memory-mapped index snapshot')
+parser.add_argument('action', choices=['export', 'load'])
+parser.add_argument('path', help='Snapshot directory')
+args = parser.parse_args()
+
+search_system_factory = SearchSystemFactory()
+search_system = search_system_factory.create()
+
+start_time = time.time()
+
+if args.action == 'export':
+    count = search_system.vector_storage.export_snapshot(args.path)
+    print(f"Exported {count} records to {args.path} in {time.time() - start_time:.2f}s")
+else:
+    count = search_system.vector_storage.load_snapshot(args.path)
+    print(f"Loaded {count} records from {args.path} in {time.time() - start_time:.2f}s")
@@ -1,7 +1,5 @@
 import numpy as np
-from model.redis_vector_storage import RedisVectorStorage
-from model.clip_embedding_model import CLIPEmbeddingModel
-from model.factory import SearchSystemFactory  
+from model.factory import SearchSystemFactory
 
 search_system_factory = SearchSystemFactory()
 search_system = search_system_factory.create()
@@ -16,8 +14,8 @@ def test_redis_vector_storage():
     print("🚀 Starting Redis Vector Storage Test")
     print("=" * 50)
     
-    # Initialize the storage
-    store = RedisVectorStorage()
+    # Reuse the search system's storage and its pooled connection
+    store = search_system.vector_storage
 
     # Sample product data
     sample_products = [
@@ -143,7 +141,7 @@ def test_redis_vector_storage():
     
     print("📦 Inserting sample products...")
     for product in sample_products:
-        search_system.insert_product(product)
+        store.insert(create_sample_embeddings(), create_sample_embeddings(), product)
         print(f"  ✅ Inserted product {product['name']}")
 
 
@@ -1,2 +1,18 @@
 from .path_helper import PathHelper
 from .math import Math
+from .content_hash import ContentHash
+from .lru_cache import LRUCache
+from .index_snapshot import IndexSnapshot, IndexSnapshotWriter
+from .rank_fusion import RankFusion
+from .tag_index import TagIndex
+from .web_helper import WebHelper
+from .redis_connection_factory import RedisConnectionFactory
+from .image_helper import ImageHelper, ImageInput
+from .image_preprocessor import ImagePreprocessor
+from .scalar_quantizer import ScalarQuantizer
+from .kmeans import KMeans
+from .inverted_lists import InvertedLists
+from .product_quantizer import ProductQuantizer
+from .endpoint_health import EndpointHealth
+from .metrics import MetricsRegistry, Counter, Gauge, Histogram
+from .search_metrics import SearchMetrics
@@ -0,0 +1,35 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+class ContentHash:
+    CHUNK_SIZE = 1024 * 1024
+
+    @staticmethod
+    def file_digest(path: Union[str, Path]) -> str:
+        """Compute the SHA-1 hex digest of a file's bytes.
+
+        Args:
+            path (Union[str, Path]): File to hash.
+
+        Returns:
+            str: Hex digest of the file content.
+        """
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(ContentHash.CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def text_digest(text: str) -> str:
+        """Compute the SHA-1 hex digest of a text encoded as UTF-8.
+
+        Args:
+            text (str): Text to hash.
+
+        Returns:
+            str: Hex digest of the text.
+        """
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
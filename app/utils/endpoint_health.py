@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Any, Dict
+
+class EndpointHealth:
+    """
+    Health and latency tracking of one backend endpoint (a shard, a replica).
+
+    An endpoint is ejected after failure_threshold consecutive failures.
+    While ejected, is_available() lets a single request through every
+    retry_interval seconds as a probe; the first success brings the
+    endpoint back. Latency is tracked as an exponentially weighted moving
+    average, so load balancing reacts to recent behaviour only.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, retry_interval: float = 30, ewma_alpha: float = 0.2):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self.ewma_alpha = ewma_alpha
+
+        self._lock = threading.Lock()
+        self.healthy = True
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.latency_ewma = None
+        self.latency_max = 0.0
+        self.last_error = None
+        self._next_probe = 0.0
+
+    def is_available(self) -> bool:
+        """
+        Check whether a request may be sent, granting one probe per retry_interval while ejected.
+        """
+        with self._lock:
+            if self.healthy:
+                return True
+
+            now = time.monotonic()
+            if now < self._next_probe:
+                return False
+
+            self._next_probe = now + self.retry_interval
+            return True
+
+    def record_success(self, latency: float) -> None:
+        """
+        Record a successful request and its latency in seconds.
+        """
+        with self._lock:
+            self.requests += 1
+            self.consecutive_failures = 0
+            self.latency_max = max(self.latency_max, latency)
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma += self.ewma_alpha * (latency - self.latency_ewma)
+
+            if not self.healthy:
+                self.healthy = True
+                print(f"{self.name} recovered")
+
+    def record_failure(self, error: Exception) -> None:
+        """
+        Record a failed request, ejecting the endpoint after failure_threshold in a row.
+        """
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self.consecutive_failures += 1
+            self.last_error = repr(error)
+
+            if self.healthy and self.consecutive_failures >= self.failure_threshold:
+                self.healthy = False
+                self._next_probe = time.monotonic() + self.retry_interval
+                print(f"{self.name} ejected after {self.consecutive_failures} consecutive failures: {error}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get a snapshot of the endpoint's health and latency"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'healthy': self.healthy,
+                'requests': self.requests,
+                'errors': self.errors,
+                'consecutive_failures': self.consecutive_failures,
+                'latency_ewma_ms': None if self.latency_ewma is None else self.latency_ewma * 1000,
+                'latency_max_ms': self.latency_max * 1000,
+                'last_error': self.last_error,
+            }
@@ -0,0 +1,28 @@
+import io
+from pathlib import Path
+from typing import Union
+from PIL import Image
+
+# An image given as a file path, encoded file bytes or a decoded PIL image
+ImageInput = Union[str, Path, bytes, Image.Image]
+
+class ImageHelper:
+    """Helpers for images passed as paths, in-memory bytes or PIL images"""
+
+    @staticmethod
+    def is_path(image: ImageInput) -> bool:
+        return isinstance(image, (str, Path))
+
+    @staticmethod
+    def to_bytes(image: ImageInput) -> bytes:
+        """Get the encoded bytes of an image, reading paths and encoding PIL images as JPEG"""
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return bytes(image)
+
+        if isinstance(image, Image.Image):
+            buffer = io.BytesIO()
+            image.convert('RGB').save(buffer, format='JPEG', quality=95)
+            return buffer.getvalue()
+
+        with open(image, 'rb') as f:
+            return f.read()
@@ -0,0 +1,92 @@
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List
+from PIL import Image
+from .image_helper import ImageInput
+
+class ImagePreprocessor:
+    """
+    Shrinks images to the model input resolution before they are sent to the model server.
+
+    Each image is decoded (JPEGs in draft mode, which lets libjpeg decode at
+    1/2, 1/4 or 1/8 scale directly), resized so its shorter side is `size`,
+    center-cropped to size x size and re-encoded as JPEG. This matches the
+    resize and crop CLIP applies on the server, so a multi-megabyte photo
+    travels as a few kilobytes.
+    """
+
+    def __init__(self, size: int = 224, jpeg_quality: int = 90, workers: int = 4, executor: str = 'thread'):
+        self.size = size
+        self.jpeg_quality = jpeg_quality
+        self.workers = workers
+        executor_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        self._executor = executor_class(max_workers=workers)
+
+    def process(self, image: ImageInput) -> bytes:
+        """
+        Preprocess one image in the calling thread.
+
+        Args:
+            image (ImageInput): Input image, as a file path, encoded bytes or a PIL image.
+
+        Returns:
+            bytes: The JPEG-encoded size x size image.
+        """
+        return ImagePreprocessor.preprocess(image, self.size, self.jpeg_quality)
+
+    def process_many(self, images: List[ImageInput]) -> List[bytes]:
+        """
+        Preprocess a batch of images on the worker pool.
+
+        Args:
+            images (List[ImageInput]): Input images, as file paths, encoded bytes or PIL images.
+
+        Returns:
+            List[bytes]: The JPEG-encoded size x size images, in input order.
+        """
+        if len(images) <= 1:
+            return [self.process(image) for image in images]
+
+        chunksize = max(1, len(images) // (self.workers * 4))
+        return list(self._executor.map(
+            ImagePreprocessor.preprocess,
+            images,
+            [self.size] * len(images),
+            [self.jpeg_quality] * len(images),
+            chunksize=chunksize
+        ))
+
+    @staticmethod
+    def preprocess(image: ImageInput, size: int, jpeg_quality: int) -> bytes:
+        """Decode, resize, center-crop and JPEG-encode one image"""
+        image = ImagePreprocessor.decode(image, size)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=jpeg_quality)
+        return buffer.getvalue()
+
+    @staticmethod
+    def decode(image: ImageInput, size: int) -> Image.Image:
+        """Decode one image into a size x size RGB image, resized and center-cropped"""
+        if not isinstance(image, Image.Image):
+            if isinstance(image, (bytes, bytearray, memoryview)):
+                image = io.BytesIO(image)
+            image = Image.open(image)
+            # Only affects JPEGs: decode at the smallest scale still covering size x size
+            image.draft('RGB', (size, size))
+
+        image = image.convert('RGB')
+        if image.size == (size, size):
+            return image
+
+        scale = size / min(image.width, image.height)
+        width = max(size, round(image.width * scale))
+        height = max(size, round(image.height * scale))
+        image = image.resize((width, height), Image.BICUBIC)
+
+        left = (width - size) // 2
+        top = (height - size) // 2
+        return image.crop((left, top, left + size, top + size))
+
+    def close(self) -> None:
+        self._executor.shutdown()
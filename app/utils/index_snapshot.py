@@ -0,0 +1,273 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Union
+import numpy as np
+
+class StringColumn:
+    """
+    Read-only column of UTF-8 strings stored as one byte blob plus int64 offsets.
+
+    Values are decoded on access, so opening a column costs no parsing.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self)):
+            yield self[row]
+
+
+class SnapshotMetadata:
+    """
+    Row view over the metadata columns of a snapshot, returning one dict per record.
+    """
+
+    def __init__(self, columns: Dict[str, StringColumn], count: int):
+        self.columns = columns
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, row: int) -> Dict[str, str]:
+        return {name: column[row] for name, column in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for row in range(self.count):
+            yield self[row]
+
+
+class IndexSnapshot:
+    """
+    On-disk, memory-mappable copy of a vector index.
+
+    A snapshot is a directory holding:
+        manifest.json                   - record count, vector dimension and column names
+        <field>.f32                     - raw row-major float32 matrix of one embedding field
+        <field>.norms.f32               - squared L2 norm of each row of that field
+        <column>.offsets / <column>.data - a string column (keys and metadata)
+
+    Loading maps every file with np.memmap, so opening a snapshot copies and
+    parses nothing and processes on one host share the same page cache.
+
+    The path is usually a symlink to the current version written by
+    IndexSnapshotWriter; it is resolved once, so every file is read from
+    the same version even if a new one is published meanwhile.
+    """
+
+    FORMAT_VERSION = 1
+    FIELDS = ('textual', 'visual')
+    METADATA_FIELDS = ('animal', 'caption', 'image_path')
+
+    def __init__(self, path: Union[str, Path]):
+        while True:
+            self.path = Path(path).resolve()
+            try:
+                self._open()
+                return
+            except FileNotFoundError:
+                # The version was pruned while opening it: retry with the one now published
+                if Path(path).resolve() == self.path:
+                    raise
+
+    def _open(self) -> None:
+        with open(self.path / 'manifest.json', 'r') as f:
+            manifest = json.load(f)
+
+        if manifest['format_version'] != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {manifest['format_version']}")
+
+        self.count = manifest['count']
+        self.vector_dim = manifest['vector_dim']
+
+        self.vectors = {
+            field: self._map(f"{field}.f32", np.float32, (self.count, self.vector_dim))
+            for field in self.FIELDS
+        }
+        self.squared_norms = {
+            field: self._map(f"{field}.norms.f32", np.float32, (self.count,))
+            for field in self.FIELDS
+        }
+        self.keys = self._map_column('key')
+        self.metadata = SnapshotMetadata(
+            {name: self._map_column(name) for name in manifest['metadata_fields']},
+            self.count
+        )
+
+    def _map(self, filename: str, dtype, shape: tuple) -> np.ndarray:
+        # np.memmap refuses to map empty files
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)
+
+        return np.memmap(self.path / filename, dtype=dtype, mode='r', shape=shape)
+
+    def _map_column(self, name: str) -> StringColumn:
+        offsets = self._map(f"{name}.offsets", np.int64, (self.count + 1,))
+        data_size = os.path.getsize(self.path / f"{name}.data")
+        data = self._map(f"{name}.data", np.uint8, (data_size,))
+
+        return StringColumn(offsets if self.count else np.zeros(1, dtype=np.int64), data)
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield batches of records in the shape accepted by VectorStorage.insert_many.
+
+        Args:
+            batch_size (int): Records per batch.
+        """
+        for start in range(0, self.count, batch_size):
+            stop = min(start + batch_size, self.count)
+            textual = np.asarray(self.vectors['textual'][start:stop])
+            visual = np.asarray(self.vectors['visual'][start:stop])
+
+            yield [
+                dict(
+                    self.metadata[row],
+                    id=self.keys[row],
+                    textual_embedding=textual[row - start],
+                    visual_embedding=visual[row - start]
+                )
+                for row in range(start, stop)
+            ]
+
+
+class IndexSnapshotWriter:
+    """
+    Streams records into a new snapshot directory.
+
+    Data is written to a temporary directory that close() renames to a new
+    version, '<name>.v<n>', and publishes by atomically replacing the
+    '<name>' symlink. Readers therefore always find a complete snapshot at
+    the path. The previous version is kept for readers that resolved the
+    link just before the swap; older ones are removed.
+    """
+
+    KEPT_VERSIONS = 2
+
+    def __init__(self, path: Union[str, Path], vector_dim: int):
+        self.path = Path(path)
+        self.tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self.vector_dim = vector_dim
+        self.count = 0
+
+        if self.tmp_path.exists():
+            shutil.rmtree(self.tmp_path)
+        self.tmp_path.mkdir(parents=True)
+
+        self._files = {}
+        for field in IndexSnapshot.FIELDS:
+            self._files[f"{field}.f32"] = open(self.tmp_path / f"{field}.f32", 'wb')
+            self._files[f"{field}.norms.f32"] = open(self.tmp_path / f"{field}.norms.f32", 'wb')
+
+        self._column_sizes = {}
+        for name in ('key',) + IndexSnapshot.METADATA_FIELDS:
+            self._files[f"{name}.offsets"] = open(self.tmp_path / f"{name}.offsets", 'wb')
+            self._files[f"{name}.data"] = open(self.tmp_path / f"{name}.data", 'wb')
+            self._files[f"{name}.offsets"].write(np.zeros(1, dtype=np.int64).tobytes())
+            self._column_sizes[name] = 0
+
+    def append(
+        self,
+        key_ids: List[str],
+        textual_embeddings: np.ndarray,
+        visual_embeddings: np.ndarray,
+        metadata: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Append a batch of records.
+
+        Args:
+            key_ids (List[str]): Storage keys of the records.
+            textual_embeddings (np.ndarray): Textual embeddings, one row per record.
+            visual_embeddings (np.ndarray): Visual embeddings, one row per record.
+            metadata (List[Dict[str, Any]]): Metadata of each record.
+        """
+        for field, embeddings in (('textual', textual_embeddings), ('visual', visual_embeddings)):
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1, self.vector_dim)
+            self._files[f"{field}.f32"].write(embeddings.tobytes())
+            self._files[f"{field}.norms.f32"].write(np.einsum('ij,ij->i', embeddings, embeddings).tobytes())
+
+        self._append_column('key', [str(key_id) for key_id in key_ids])
+        for name in IndexSnapshot.METADATA_FIELDS:
+            self._append_column(name, [str(record.get(name, '')) for record in metadata])
+
+        self.count += len(key_ids)
+
+    def _append_column(self, name: str, values: List[str]) -> None:
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = self._column_sizes[name] + np.cumsum([len(value) for value in encoded], dtype=np.int64)
+
+        self._files[f"{name}.data"].write(b''.join(encoded))
+        self._files[f"{name}.offsets"].write(offsets.tobytes())
+        if len(offsets):
+            self._column_sizes[name] = int(offsets[-1])
+
+    def close(self) -> None:
+        """
+        Flush every file, write the manifest and move the snapshot into place.
+        """
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+        manifest = {
+            'format_version': IndexSnapshot.FORMAT_VERSION,
+            'count': self.count,
+            'vector_dim': self.vector_dim,
+            'dtype': 'float32',
+            'fields': list(IndexSnapshot.FIELDS),
+            'metadata_fields': list(IndexSnapshot.METADATA_FIELDS),
+        }
+        with open(self.tmp_path / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        versions = self._versions()
+        version_path = self.path.with_name(f"{self.path.name}.v{versions[-1][0] + 1 if versions else 1}")
+        os.replace(self.tmp_path, version_path)
+        self._publish(version_path)
+
+        for _, old_path in self._versions()[:-self.KEPT_VERSIONS]:
+            shutil.rmtree(old_path)
+
+    def _versions(self) -> List[tuple]:
+        """
+        List the (number, path) of every published version of the snapshot, oldest first.
+        """
+        prefix = self.path.name + '.v'
+        return sorted(
+            (int(version.name[len(prefix):]), version)
+            for version in self.path.parent.glob(prefix + '*')
+            if version.name[len(prefix):].isdigit() and version.is_dir()
+        )
+
+    def _publish(self, version_path: Path) -> None:
+        """
+        Point the snapshot path at a version by renaming a new symlink over it.
+        """
+        link_path = self.path.with_name(self.path.name + '.link')
+        if os.path.lexists(link_path):
+            os.unlink(link_path)
+        os.symlink(version_path.name, link_path)
+
+        if self.path.is_dir() and not self.path.is_symlink():
+            # A snapshot written before versioning is a plain directory, which
+            # a symlink cannot replace: move it aside once, then publish
+            old_path = self.path.with_name(self.path.name + '.old')
+            if old_path.exists():
+                shutil.rmtree(old_path)
+            os.replace(self.path, old_path)
+            os.replace(link_path, self.path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(link_path, self.path)
@@ -0,0 +1,159 @@
+from typing import Tuple
+import numpy as np
+
+class InvertedLists:
+    """
+    Rows of a vector field bucketed by coarse centroid, each list one contiguous growable block.
+
+    Every list keeps its vectors, their squared L2 norms and the storage row
+    of each entry. Row r lives at positions[r] of list assignments[r], so a
+    row can be moved or removed in O(1): the last entry of its list is
+    swapped into the hole.
+
+    Lists handed out by block() are copy-on-write: the next change that
+    would overwrite one of their entries copies the list first, so readers
+    can score a block after releasing the storage lock.
+    """
+
+    def __init__(self, n_lists: int, vector_dim: int, capacity: int = 1024):
+        self.n_lists = n_lists
+        self.vector_dim = vector_dim
+        self.vectors = [np.empty((0, vector_dim), dtype=np.float32) for _ in range(n_lists)]
+        self.squared_norms = [np.empty(0, dtype=np.float32) for _ in range(n_lists)]
+        self.rows = [np.empty(0, dtype=np.int64) for _ in range(n_lists)]
+        self.sizes = np.zeros(n_lists, dtype=np.int64)
+        self.shared = np.zeros(n_lists, dtype=bool)
+        self.assignments = np.full(capacity, -1, dtype=np.int64)
+        self.positions = np.full(capacity, -1, dtype=np.int64)
+
+    @classmethod
+    def build(
+        cls,
+        n_lists: int,
+        vectors: np.ndarray,
+        squared_norms: np.ndarray,
+        labels: np.ndarray
+    ) -> 'InvertedLists':
+        """
+        Bucket rows 0..len(vectors)-1 in one pass.
+
+        Args:
+            n_lists (int): Number of lists.
+            vectors (np.ndarray): Vectors, one per storage row.
+            squared_norms (np.ndarray): Squared L2 norm of each row.
+            labels (np.ndarray): List of each row.
+
+        Returns:
+            InvertedLists: The populated lists.
+        """
+        count = len(labels)
+        inverted_lists = cls(n_lists, vectors.shape[1], max(count, 1))
+
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(n_lists + 1))
+
+        for list_id in range(n_lists):
+            rows = order[bounds[list_id]:bounds[list_id + 1]]
+            inverted_lists.vectors[list_id] = np.ascontiguousarray(vectors[rows], dtype=np.float32)
+            inverted_lists.squared_norms[list_id] = np.asarray(squared_norms[rows], dtype=np.float32)
+            inverted_lists.rows[list_id] = rows.astype(np.int64)
+            inverted_lists.sizes[list_id] = len(rows)
+            inverted_lists.positions[rows] = np.arange(len(rows))
+
+        inverted_lists.assignments[:count] = labels
+        return inverted_lists
+
+    def add(self, row: int, list_id: int, vector: np.ndarray, squared_norm: float) -> None:
+        """
+        Store a row in a list, moving it out of its previous list if it had one.
+        """
+        if row >= len(self.assignments):
+            self._grow_row_index(row + 1)
+        elif self.assignments[row] >= 0:
+            self.remove(row)
+
+        size = self.sizes[list_id]
+        if size == len(self.rows[list_id]):
+            self._grow_list(list_id, max(16, size * 2))
+        elif self.shared[list_id]:
+            # The slot may be inside a block a reader still holds, e.g. after a remove
+            self._grow_list(list_id, len(self.rows[list_id]))
+
+        self.vectors[list_id][size] = vector
+        self.squared_norms[list_id][size] = squared_norm
+        self.rows[list_id][size] = row
+        self.sizes[list_id] = size + 1
+        self.assignments[row] = list_id
+        self.positions[row] = size
+
+    def remove(self, row: int) -> None:
+        """
+        Remove a row, filling its slot with the last entry of the list.
+        """
+        list_id = self.assignments[row]
+        position = self.positions[row]
+        last = self.sizes[list_id] - 1
+
+        if position != last:
+            if self.shared[list_id]:
+                self._grow_list(list_id, len(self.rows[list_id]))
+            moved_row = self.rows[list_id][last]
+            self.vectors[list_id][position] = self.vectors[list_id][last]
+            self.squared_norms[list_id][position] = self.squared_norms[list_id][last]
+            self.rows[list_id][position] = moved_row
+            self.positions[moved_row] = position
+
+        self.sizes[list_id] = last
+        self.assignments[row] = -1
+        self.positions[row] = -1
+
+    def block(self, list_id: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the vectors, squared norms and storage rows of one list.
+
+        The returned views stay valid after later changes, which copy the list instead of writing into them.
+        """
+        self.shared[list_id] = True
+        size = self.sizes[list_id]
+        return self.vectors[list_id][:size], self.squared_norms[list_id][:size], self.rows[list_id][:size]
+
+    def gather(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read the vectors and squared norms of storage rows, in the given order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        vectors = np.empty((len(rows), self.vector_dim), dtype=np.float32)
+        squared_norms = np.empty(len(rows), dtype=np.float32)
+        labels = self.assignments[rows]
+
+        for list_id in np.unique(labels):
+            selected = np.flatnonzero(labels == list_id)
+            positions = self.positions[rows[selected]]
+            vectors[selected] = self.vectors[list_id][positions]
+            squared_norms[selected] = self.squared_norms[list_id][positions]
+
+        return vectors, squared_norms
+
+    def _grow_list(self, list_id: int, capacity: int) -> None:
+        """Move a list into new arrays of the given capacity, which no reader holds."""
+        size = self.sizes[list_id]
+
+        vectors = np.empty((capacity, self.vector_dim), dtype=np.float32)
+        vectors[:size] = self.vectors[list_id][:size]
+        squared_norms = np.empty(capacity, dtype=np.float32)
+        squared_norms[:size] = self.squared_norms[list_id][:size]
+        rows = np.empty(capacity, dtype=np.int64)
+        rows[:size] = self.rows[list_id][:size]
+
+        self.vectors[list_id] = vectors
+        self.squared_norms[list_id] = squared_norms
+        self.rows[list_id] = rows
+        self.shared[list_id] = False
+
+    def _grow_row_index(self, size: int) -> None:
+        capacity = max(size, len(self.assignments) * 2)
+
+        for name in ('assignments', 'positions'):
+            grown = np.full(capacity, -1, dtype=np.int64)
+            grown[:len(getattr(self, name))] = getattr(self, name)
+            setattr(self, name, grown)
@@ -0,0 +1,83 @@
+import numpy as np
+
+class KMeans:
+    """
+    Vectorized Lloyd's k-means, used to train the coarse centroids of inverted-file indexes.
+
+    Assignment works on blocks of rows so the (rows x centroids) distance
+    matrix stays bounded, and centroid updates average contiguous runs of
+    the rows sorted by cluster.
+    """
+
+    # Rows assigned at a time
+    BLOCK_ROWS = 1 << 14
+
+    @staticmethod
+    def fit(
+        vectors: np.ndarray,
+        n_clusters: int,
+        iterations: int = 20,
+        sample_size: int = None,
+        seed: int = 0
+    ) -> np.ndarray:
+        """
+        Train centroids on the vectors, or on a random sample of them.
+
+        Args:
+            vectors (np.ndarray): Training vectors, one per row.
+            n_clusters (int): Number of centroids, at most the number of training vectors.
+            iterations (int): Lloyd iterations.
+            sample_size (int): Train on at most this many randomly sampled rows.
+            seed (int): Seed of the sampling and initialization.
+
+        Returns:
+            np.ndarray: The (n_clusters x dim) float32 centroids.
+        """
+        rng = np.random.default_rng(seed)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if sample_size and len(vectors) > sample_size:
+            vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+
+        n_clusters = min(n_clusters, len(vectors))
+        centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = KMeans.assign(vectors, centroids)
+
+            # Average each cluster's members as one contiguous run of the label-sorted rows
+            grouped = vectors[np.argsort(labels, kind='stable')]
+            counts = np.bincount(labels, minlength=n_clusters)
+            filled = counts > 0
+            stops = np.cumsum(counts)
+            for cluster in np.flatnonzero(filled):
+                centroids[cluster] = grouped[stops[cluster] - counts[cluster]:stops[cluster]].mean(axis=0)
+
+            # Re-seed empty clusters on random members of the largest one
+            for cluster in np.flatnonzero(~filled):
+                members = np.flatnonzero(labels == np.argmax(counts))
+                centroids[cluster] = vectors[rng.choice(members)]
+
+        return centroids
+
+    @staticmethod
+    def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """
+        Find the nearest centroid (in L2 distance) of every vector.
+
+        Args:
+            vectors (np.ndarray): Vectors, one per row.
+            centroids (np.ndarray): Centroids, one per row.
+
+        Returns:
+            np.ndarray: The int64 centroid index of each vector.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, centroids.shape[1])
+        centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+        labels = np.empty(len(vectors), dtype=np.int64)
+
+        for start in range(0, len(vectors), KMeans.BLOCK_ROWS):
+            block = vectors[start:start + KMeans.BLOCK_ROWS]
+            # ||v||^2 is the same for every centroid, so it does not change the argmin
+            labels[start:start + len(block)] = np.argmin(centroid_norms[None, :] - 2 * block @ centroids.T, axis=1)
+
+        return labels
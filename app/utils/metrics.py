@@ -0,0 +1,270 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Sequence, Tuple
+
+class Metric:
+    """
+    Base of the metric types: one named family holding a value per combination of label values.
+
+    Labels are passed as keyword arguments, e.g. observe(0.2, stage='embed'),
+    and must match the label_names the metric was created with.
+    """
+
+    TYPE = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} takes labels {list(self.label_names)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def clear(self) -> None:
+        """Drop the values of every label combination."""
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> List[str]:
+        """Render the metric in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {self._format_number(value)}"]
+
+    def _format_labels(self, key: Tuple[str, ...], extra: Dict[str, str] = None) -> str:
+        pairs = list(zip(self.label_names, key)) + list((extra or {}).items())
+        if not pairs:
+            return ''
+
+        escaped = (
+            f'{name}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for name, value in pairs
+        )
+        return '{' + ','.join(escaped) + '}'
+
+    @staticmethod
+    def _format_number(value: float) -> str:
+        if value == float('inf'):
+            return '+Inf'
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter(Metric):
+    """Monotonically increasing count, e.g. of requests or errors."""
+
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, total: float, **labels) -> None:
+        """Set the count to a total kept elsewhere, e.g. the hit counter of an LRUCache."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = total
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+class Gauge(Metric):
+    """Value that can go up and down, e.g. connections in use."""
+
+    TYPE = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+class Histogram(Metric):
+    """
+    Distribution of observations counted into fixed buckets.
+
+    Memory is constant however many values are observed: each label
+    combination keeps one count per bucket, the sum and the maximum.
+    Quantiles are estimated by interpolating inside the bucket they fall in,
+    so their precision is that of the bucket bounds.
+    """
+
+    TYPE = 'histogram'
+
+    # Latency buckets in seconds, from 1 ms to 10 s
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value: float, count: int = 1, **labels) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value (float): Observed value, e.g. a latency in seconds.
+            count (int): Record the value this many times, e.g. the per-item time of a batch.
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, the last one for values above every bound
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'max': 0.0}
+
+            state['counts'][bisect.bisect_left(self.buckets, value)] += count
+            state['sum'] += value * count
+            state['max'] = max(state['max'], value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock time in seconds spent in the with block."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def quantile(self, q: float, **labels) -> float:
+        """
+        Estimate a quantile of the observations, e.g. q=0.99 for p99.
+
+        Returns:
+            float: The estimate, or 0.0 before any observation.
+        """
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                return 0.0
+            counts = list(state['counts'])
+            maximum = state['max']
+
+        rank = q * sum(counts)
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                # Observations above the last bound are only known to be at most the maximum
+                upper = min(self.buckets[index], maximum) if index < len(self.buckets) else maximum
+                return lower + (upper - lower) * max(rank - seen, 0) / count
+            seen += count
+
+        return maximum
+
+    def summary(self, **labels) -> Dict[str, float]:
+        """Get the count, mean, maximum and p50/p90/p99 estimates of the observations."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            count = sum(state['counts']) if state else 0
+            total = state['sum'] if state else 0.0
+            maximum = state['max'] if state else 0.0
+
+        return {
+            'count': count,
+            'mean': total / count if count else 0.0,
+            'max': maximum,
+            'p50': self.quantile(0.5, **labels),
+            'p90': self.quantile(0.9, **labels),
+            'p99': self.quantile(0.99, **labels),
+        }
+
+    def _render_value(self, key: Tuple[str, ...], state: Dict[str, Any]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), state['counts']):
+            cumulative += count
+            labels = self._format_labels(key, {'le': self._format_number(bound)})
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+        labels = self._format_labels(key)
+        lines.append(f"{self.name}_sum{labels} {self._format_number(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics, rendered together for a Prometheus scrape.
+
+    Components get their metrics by name, so the web apps, the search system
+    and the importer share the same instances without passing them around.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'MetricsRegistry':
+        """Get the shared registry of the process"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, label_names)
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, label_names)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = Histogram.DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, label_names, buckets)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _get_or_create(self, metric_type: type, name: str, documentation: str, label_names: Sequence[str], *args) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_type(name, documentation, label_names, *args)
+            elif type(metric) is not metric_type or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already registered as a {metric.TYPE} with labels {list(metric.label_names)}")
+
+        return metric
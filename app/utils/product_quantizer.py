@@ -0,0 +1,127 @@
+from pathlib import Path
+from typing import Union
+import numpy as np
+from .kmeans import KMeans
+
+class ProductQuantizer:
+    """
+    Product quantization of float32 vectors into m-byte codes.
+
+    Vectors are split into m sub-vectors of vector_dim / m dimensions, and
+    each sub-vector is replaced by the index of its nearest of 256 centroids
+    trained for that subspace. Dot products with a query are then estimated
+    by asymmetric distance computation (ADC): one (m x 256) table of the
+    query's dot products with every sub-centroid, summed over each code's m
+    entries.
+    """
+
+    CODEBOOK_SIZE = 256
+    # Rows encoded or scored at a time
+    BLOCK_ROWS = 1 << 16
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = np.asarray(codebooks, dtype=np.float32)
+        self.m, self.codebook_size, self.sub_dim = self.codebooks.shape
+        self.vector_dim = self.m * self.sub_dim
+        # Offset of each subspace in a flattened (m * 256) table
+        self.table_offsets = (np.arange(self.m) * self.codebook_size).astype(np.int32)
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        m: int,
+        iterations: int = 20,
+        sample_size: int = None,
+        seed: int = 0
+    ) -> 'ProductQuantizer':
+        """
+        Train one codebook per subspace.
+
+        Args:
+            vectors (np.ndarray): Training vectors, one per row; at least 256 of them.
+            m (int): Number of subspaces, which must divide the vector dimension.
+            iterations (int): K-means iterations per subspace.
+            sample_size (int): Train on at most this many randomly sampled rows.
+            seed (int): Seed of the sampling and initialization.
+
+        Returns:
+            ProductQuantizer: The trained quantizer.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[1] % m:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} is not divisible by m={m}")
+        if len(vectors) < cls.CODEBOOK_SIZE:
+            raise ValueError(f"Product quantization needs at least {cls.CODEBOOK_SIZE} training vectors")
+
+        if sample_size and len(vectors) > sample_size:
+            rng = np.random.default_rng(seed)
+            vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+
+        sub_dim = vectors.shape[1] // m
+        codebooks = np.stack([
+            KMeans.fit(vectors[:, j * sub_dim:(j + 1) * sub_dim], cls.CODEBOOK_SIZE, iterations, seed=seed + j)
+            for j in range(m)
+        ])
+
+        return cls(codebooks)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'ProductQuantizer':
+        return cls(np.load(path))
+
+    def save(self, path: Union[str, Path]) -> None:
+        np.save(path, self.codebooks)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Encode vectors as the index of the nearest sub-centroid in each subspace.
+
+        Args:
+            vectors (np.ndarray): Vectors, one per row.
+
+        Returns:
+            np.ndarray: The (rows x m) uint8 codes.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.vector_dim)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+
+        for j in range(self.m):
+            subvectors = vectors[:, j * self.sub_dim:(j + 1) * self.sub_dim]
+            codes[:, j] = KMeans.assign(subvectors, self.codebooks[j])
+
+        return codes
+
+    def dot_tables(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Compute the ADC lookup tables of queries.
+
+        Args:
+            queries (np.ndarray): Float32 queries, one per row.
+
+        Returns:
+            np.ndarray: The (queries x m * 256) dot products of each query sub-vector with every sub-centroid.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.m, self.sub_dim)
+        return np.einsum('qjd,jkd->qjk', queries, self.codebooks).reshape(len(queries), -1)
+
+    def dots(self, tables: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Estimate the dot products of the queries behind the tables with encoded rows.
+
+        Args:
+            tables (np.ndarray): Lookup tables from dot_tables.
+            codes (np.ndarray): Codes of the rows.
+
+        Returns:
+            np.ndarray: The (queries x rows) estimated dot products.
+        """
+        dots = np.empty((len(tables), len(codes)), dtype=np.float32)
+
+        for start in range(0, len(codes), self.BLOCK_ROWS):
+            # Positions of the block's codes in the flattened tables, shared by every query
+            positions = codes[start:start + self.BLOCK_ROWS].astype(np.int32) + self.table_offsets
+            for index, table in enumerate(tables):
+                dots[index, start:start + len(positions)] = np.take(table, positions).sum(axis=1, dtype=np.float32)
+
+        return dots
@@ -0,0 +1,99 @@
+from typing import Any, Callable, Dict, List
+
+class RankFusion:
+    @staticmethod
+    def record_id(result: Dict[str, Any]) -> str:
+        """Identify a search result across result lists.
+
+        Args:
+            result (Dict[str, Any]): A search result.
+
+        Returns:
+            str: The record key, or its image path when the backend returns no key.
+        """
+        return result.get('id') or result.get('image_path')
+
+    @staticmethod
+    def reciprocal_rank(
+        result_lists: List[List[Dict[str, Any]]],
+        weights: List[float],
+        top_k: int,
+        k: int = 60
+    ) -> List[Dict[str, Any]]:
+        """Fuse ranked lists with weighted reciprocal rank fusion.
+
+        Each record scores sum(weight / (k + rank)) over the lists it appears in.
+        Its vector_distance is the smallest one it got in any list.
+
+        Args:
+            result_lists (List[List[Dict[str, Any]]]): Ranked search results, best first.
+            weights (List[float]): Weight of each list.
+            top_k (int): Number of fused results to return.
+            k (int): Rank smoothing constant.
+
+        Returns:
+            List[Dict[str, Any]]: Fused results, best first, with a 'fusion_score' field.
+        """
+        return RankFusion._fuse(
+            result_lists,
+            lambda list_index, rank, result, weight: weight / (k + rank + 1),
+            weights,
+            top_k
+        )
+
+    @staticmethod
+    def weighted_score(
+        result_lists: List[List[Dict[str, Any]]],
+        weights: List[float],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Fuse result lists by a weighted sum of their similarities (1 - vector_distance).
+
+        A record missing from a list is given that list's worst similarity,
+        since it ranked below everything the list returned.
+
+        Args:
+            result_lists (List[List[Dict[str, Any]]]): Search results with 'vector_distance'.
+            weights (List[float]): Weight of each list.
+            top_k (int): Number of fused results to return.
+
+        Returns:
+            List[Dict[str, Any]]: Fused results, best first, with a 'fusion_score' field.
+        """
+        floors = [
+            min((1 - result['vector_distance'] for result in results), default=0.0)
+            for results in result_lists
+        ]
+        base_score = sum(weight * floor for weight, floor in zip(weights, floors))
+
+        return RankFusion._fuse(
+            result_lists,
+            lambda list_index, rank, result, weight: weight * ((1 - result['vector_distance']) - floors[list_index]),
+            weights,
+            top_k,
+            base_score
+        )
+
+    @staticmethod
+    def _fuse(
+        result_lists: List[List[Dict[str, Any]]],
+        contribution: Callable[[int, int, Dict[str, Any], float], float],
+        weights: List[float],
+        top_k: int,
+        base_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        fused = {}
+
+        for list_index, (results, weight) in enumerate(zip(result_lists, weights)):
+            for rank, result in enumerate(results):
+                record_id = RankFusion.record_id(result)
+                entry = fused.get(record_id)
+
+                if entry is None:
+                    entry = fused[record_id] = dict(result, fusion_score=base_score)
+                elif result['vector_distance'] < entry['vector_distance']:
+                    entry['vector_distance'] = result['vector_distance']
+
+                entry['fusion_score'] += contribution(list_index, rank, result, weight)
+
+        return sorted(fused.values(), key=lambda entry: entry['fusion_score'], reverse=True)[:top_k]
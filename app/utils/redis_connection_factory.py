@@ -0,0 +1,168 @@
+import threading
+import redis
+import redis.asyncio
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+from redis.asyncio.retry import Retry as AsyncRetry
+import yaml
+from .path_helper import PathHelper
+
+class RedisConnectionFactory:
+    """
+    Process-wide Redis connection pools built from redis_config.yaml.
+
+    Every component asking for a client gets one backed by the same pool, so
+    connections are opened once and reused across threads and requests. The
+    pool is blocking: when all max_connections are busy, callers wait up to
+    pool.timeout seconds for a free one instead of opening more sockets.
+
+    Other nodes (shards, replicas) are reached by passing an endpoint: a
+    dict overriding any of ENDPOINT_KEYS. Each distinct endpoint gets its
+    own pools, with the pool and retry settings of redis_config.yaml.
+    Clients overriding the retry attempts, e.g. the read clients of
+    replicas that fail over elsewhere, get pools of their own too.
+    """
+
+    CONFIG_FILE_NAME = 'redis_config.yaml'
+    ENDPOINT_KEYS = ('host', 'port', 'unix_socket_path', 'username', 'password')
+
+    _config = None
+    _pools = {}
+    _async_pools = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls, endpoint: dict = None, retry_attempts: int = None) -> redis.Redis:
+        """Get a client on the shared connection pool of the configured node, or of endpoint, retrying retry_attempts times if given"""
+        key = cls._pool_key(endpoint, retry_attempts)
+        with cls._lock:
+            if key not in cls._pools:
+                cls._pools[key] = redis.BlockingConnectionPool(**cls._pool_kwargs(False, endpoint, retry_attempts))
+
+        return redis.Redis(connection_pool=cls._pools[key])
+
+    @classmethod
+    def get_async_client(cls, endpoint: dict = None, retry_attempts: int = None) -> redis.asyncio.Redis:
+        """Get an asyncio client on the shared asyncio connection pool of the configured node, or of endpoint, retrying retry_attempts times if given"""
+        key = cls._pool_key(endpoint, retry_attempts)
+        with cls._lock:
+            if key not in cls._async_pools:
+                cls._async_pools[key] = redis.asyncio.BlockingConnectionPool(**cls._pool_kwargs(True, endpoint, retry_attempts))
+
+        return redis.asyncio.Redis(connection_pool=cls._async_pools[key])
+
+    @classmethod
+    def get_pool_stats(cls) -> dict:
+        """
+        Get the utilization of the connection pools created so far.
+
+        Pools of the configured node are reported as 'sync' and 'async', those
+        of other endpoints as 'sync <host>:<port>' and 'async <host>:<port>',
+        followed by ' retry=<n>' for pools overriding the retry attempts.
+        """
+        stats = {}
+
+        for key, pool in list(cls._pools.items()):
+            idle = sum(1 for connection in list(pool.pool.queue) if connection is not None)
+            created = len(pool._connections)
+            stats[cls._pool_name('sync', key)] = {
+                'max_connections': pool.max_connections,
+                'created_connections': created,
+                'in_use_connections': created - idle,
+                'idle_connections': idle,
+            }
+
+        for key, pool in list(cls._async_pools.items()):
+            in_use = len(pool._in_use_connections)
+            idle = len(pool._available_connections)
+            stats[cls._pool_name('async', key)] = {
+                'max_connections': pool.max_connections,
+                'created_connections': in_use + idle,
+                'in_use_connections': in_use,
+                'idle_connections': idle,
+            }
+
+        return stats
+
+    @classmethod
+    def _pool_key(cls, endpoint: dict, retry_attempts: int = None) -> tuple:
+        key = tuple((name, endpoint[name]) for name in cls.ENDPOINT_KEYS if name in endpoint) if endpoint else ()
+        if retry_attempts is not None:
+            key += (('retry_attempts', retry_attempts),)
+
+        return key
+
+    @classmethod
+    def resolve_endpoint(cls, endpoint: dict, base: dict = None) -> dict:
+        """
+        Apply the overrides of an endpoint on top of a base endpoint, e.g. of a replica on its primary.
+
+        Only ENDPOINT_KEYS are kept. An endpoint given by host/port does not
+        inherit the unix socket of its base, or of the configured node.
+        """
+        resolved = {**(base or {}), 'unix_socket_path': None, **endpoint}
+        return {name: resolved[name] for name in cls.ENDPOINT_KEYS if name in resolved}
+
+    @classmethod
+    def describe_endpoint(cls, endpoint: dict = None) -> str:
+        """Get the address of an endpoint, or of the configured node, for logs and stats"""
+        endpoint = endpoint or cls._load_config()
+        return endpoint.get('unix_socket_path') or f"{endpoint.get('host', '')}:{endpoint.get('port', '')}"
+
+    @classmethod
+    def _pool_name(cls, kind: str, key: tuple) -> str:
+        endpoint = dict(key)
+        retry_attempts = endpoint.pop('retry_attempts', None)
+        name = f"{kind} {cls.describe_endpoint(endpoint)}" if endpoint else kind
+
+        return name if retry_attempts is None else f"{name} retry={retry_attempts}"
+
+    @classmethod
+    def _load_config(cls) -> dict:
+        if cls._config is None:
+            config_path = PathHelper.get_config_file(cls.CONFIG_FILE_NAME)
+            with open(config_path, 'r') as f:
+                cls._config = yaml.safe_load(f)['redis']
+
+        return cls._config
+
+    @classmethod
+    def _pool_kwargs(cls, use_asyncio: bool, endpoint: dict = None, retry_attempts: int = None) -> dict:
+        """Build the connection pool arguments for the sync or asyncio client"""
+        config = cls._load_config()
+        if endpoint:
+            config = {**config, **cls.resolve_endpoint(endpoint)}
+        pool_config = config.get('pool') or {}
+        retry_config = config.get('retry') or {}
+
+        backoff = ExponentialBackoff(
+            cap=retry_config.get('backoff_cap', 0.512),
+            base=retry_config.get('backoff_base', 0.008)
+        )
+        retry_class = AsyncRetry if use_asyncio else Retry
+        connections = redis.asyncio.connection if use_asyncio else redis.connection
+
+        kwargs = {
+            'max_connections': pool_config.get('max_connections', 50),
+            'timeout': pool_config.get('timeout', 20),
+            'username': config.get('username') or None,
+            'password': config.get('password') or None,
+            'socket_timeout': pool_config.get('socket_timeout'),
+            'socket_connect_timeout': pool_config.get('socket_connect_timeout'),
+            'health_check_interval': pool_config.get('health_check_interval', 0),
+            'retry': retry_class(backoff, retry_config.get('attempts', 3) if retry_attempts is None else retry_attempts),
+            'retry_on_error': [ConnectionError, TimeoutError],
+            'decode_responses': False,
+        }
+
+        if config.get('unix_socket_path'):
+            kwargs['connection_class'] = connections.UnixDomainSocketConnection
+            kwargs['path'] = config['unix_socket_path']
+        else:
+            kwargs['connection_class'] = connections.Connection
+            kwargs['host'] = config['host']
+            kwargs['port'] = config['port']
+            kwargs['socket_keepalive'] = pool_config.get('socket_keepalive', True)
+
+        return kwargs
@@ -0,0 +1,67 @@
+from typing import Optional, Tuple
+import numpy as np
+
+class ScalarQuantizer:
+    """
+    Compact encodings of float32 vectors for in-memory exact search.
+
+    float16 halves the memory of a vector. int8 quarters it, using a symmetric
+    per-row scale: vector ~= codes * scale, with scale = max(|vector|) / 127.
+    Scoring up-casts blocks of rows to float32 so the products still go
+    through BLAS.
+    """
+
+    DTYPES = {'float32': np.float32, 'float16': np.float16, 'int8': np.int8}
+    # Rows up-cast to float32 at a time while scoring
+    BLOCK_ROWS = 1 << 15
+
+    @staticmethod
+    def quantize(vectors: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Encode vectors at the given precision.
+
+        Args:
+            vectors (np.ndarray): Vectors, one per row.
+            precision (str): 'float32', 'float16' or 'int8'.
+
+        Returns:
+            Tuple[np.ndarray, Optional[np.ndarray]]: The codes, and the per-row scales for int8.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+
+        if precision != 'int8':
+            return vectors.astype(ScalarQuantizer.DTYPES[precision]), None
+
+        scales = np.abs(vectors).max(axis=1) / 127
+        safe_scales = np.where(scales == 0, 1, scales)
+        codes = np.rint(vectors / safe_scales[:, None]).astype(np.int8)
+
+        return codes, scales.astype(np.float32)
+
+    @staticmethod
+    def dots(queries: np.ndarray, codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate dot products between float32 queries and encoded rows.
+
+        Args:
+            queries (np.ndarray): Float32 queries, one per row.
+            codes (np.ndarray): Encoded rows.
+            scales (Optional[np.ndarray]): Per-row scales of int8 codes.
+
+        Returns:
+            np.ndarray: The (queries x rows) dot products.
+        """
+        if codes.dtype == np.float32:
+            return queries @ codes.T
+
+        dots = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), ScalarQuantizer.BLOCK_ROWS):
+            block = codes[start:start + ScalarQuantizer.BLOCK_ROWS].astype(np.float32)
+            dots[:, start:start + len(block)] = queries @ block.T
+
+        if scales is not None:
+            dots *= scales[None, :]
+
+        return dots
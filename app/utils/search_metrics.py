@@ -0,0 +1,90 @@
+from typing import Any, Dict, List
+from .metrics import MetricsRegistry
+from .redis_connection_factory import RedisConnectionFactory
+
+class SearchMetrics:
+    """
+    Metrics of the search serving path, shared by the Flask and ASGI apps and the search systems.
+
+    Latencies are recorded as requests go; cache, connection pool, shard and
+    replica statistics are kept by their owners and copied in by collect()
+    when /metrics is scraped.
+    """
+
+    # Queries per batch request
+    BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self, registry: MetricsRegistry = None):
+        self.registry = registry or MetricsRegistry.get_instance()
+
+        self.stage_seconds = self.registry.histogram(
+            'search_stage_duration_seconds', 'Time spent in each search stage: embed, knn, transform', ['stage']
+        )
+        self.request_seconds = self.registry.histogram(
+            'http_request_duration_seconds', 'Total time to handle an HTTP request', ['endpoint']
+        )
+        self.requests = self.registry.counter(
+            'http_requests_total', 'HTTP requests handled, by response status', ['endpoint', 'status']
+        )
+        self.errors = self.registry.counter(
+            'search_errors_total', 'Searches that failed and returned no results', ['operation']
+        )
+        self.batch_size = self.registry.histogram(
+            'search_batch_size', 'Queries per batched search', ['query_type'], self.BATCH_SIZE_BUCKETS
+        )
+
+        self.cache_lookups = self.registry.counter(
+            'search_cache_lookups_total', 'Lookups in the in-process query caches', ['cache', 'result']
+        )
+        self.cache_entries = self.registry.gauge(
+            'search_cache_entries', 'Entries held by the in-process query caches', ['cache']
+        )
+        self.pool_connections = self.registry.gauge(
+            'redis_pool_connections', 'Redis connections per pool, by state', ['pool', 'state']
+        )
+        self.endpoint_healthy = self.registry.gauge(
+            'vector_storage_endpoint_healthy', 'Whether a shard or read replica is in rotation', ['kind', 'endpoint']
+        )
+        self.endpoint_requests = self.registry.counter(
+            'vector_storage_endpoint_requests_total', 'Requests sent to a shard or read replica', ['kind', 'endpoint']
+        )
+        self.endpoint_errors = self.registry.counter(
+            'vector_storage_endpoint_errors_total', 'Failed requests to a shard or read replica', ['kind', 'endpoint']
+        )
+        self.endpoint_latency = self.registry.gauge(
+            'vector_storage_endpoint_latency_seconds', 'Moving average latency of a shard or read replica', ['kind', 'endpoint']
+        )
+
+    def collect(self, search_system) -> None:
+        """Copy the statistics of the search system's caches and storage, and of the Redis pools, into the metrics."""
+        for cache, stats in search_system.get_cache_stats().items():
+            if stats is None:
+                continue
+            self.cache_lookups.set_total(stats['hits'], cache=cache, result='hit')
+            self.cache_lookups.set_total(stats['misses'], cache=cache, result='miss')
+            self.cache_entries.set(stats['size'], cache=cache)
+
+        self.pool_connections.clear()
+        for pool, stats in RedisConnectionFactory.get_pool_stats().items():
+            for state in ('in_use', 'idle', 'max'):
+                self.pool_connections.set(stats[f"{state}_connections"], pool=pool, state=state)
+
+        # The asyncio storages wrap a synchronous one, which keeps the statistics
+        vector_storage = getattr(search_system.vector_storage, 'vector_storage', search_system.vector_storage)
+        if hasattr(vector_storage, 'get_shard_stats'):
+            self._collect_endpoints('shard', vector_storage.get_shard_stats())
+        if hasattr(vector_storage, 'get_replica_stats'):
+            self._collect_endpoints('replica', vector_storage.get_replica_stats())
+
+    def render(self, search_system) -> str:
+        """Collect the current statistics and render every metric for a Prometheus scrape."""
+        self.collect(search_system)
+        return self.registry.render()
+
+    def _collect_endpoints(self, kind: str, endpoint_stats: List[Dict[str, Any]]) -> None:
+        for stats in endpoint_stats:
+            self.endpoint_healthy.set(int(stats['healthy']), kind=kind, endpoint=stats['name'])
+            self.endpoint_requests.set_total(stats['requests'], kind=kind, endpoint=stats['name'])
+            self.endpoint_errors.set_total(stats['errors'], kind=kind, endpoint=stats['name'])
+            if stats['latency_ewma_ms'] is not None:
+                self.endpoint_latency.set(stats['latency_ewma_ms'] / 1000, kind=kind, endpoint=stats['name'])
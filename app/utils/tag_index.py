@@ -0,0 +1,76 @@
+from typing import Any, Dict, Iterable, List
+import numpy as np
+
+class TagIndex:
+    """
+    Dictionary-encoded copy of filterable metadata fields for vectorized filtering.
+
+    Each field keeps one int32 code per row plus a value -> code vocabulary,
+    so a filter over millions of rows is a single np.isin over the codes.
+    Values are matched like Redis TAG fields: case-insensitively, ignoring
+    surrounding whitespace.
+    """
+
+    def __init__(self, fields: Iterable[str], capacity: int = 1024):
+        self.fields = tuple(fields)
+        self.vocab = {field: {} for field in self.fields}
+        self.codes = {field: np.full(capacity, -1, dtype=np.int32) for field in self.fields}
+
+    @staticmethod
+    def normalize_value(value: Any) -> str:
+        """Fold a tag value the way Redis does before comparing it."""
+        return str(value).strip().lower()
+
+    @classmethod
+    def from_metadata(cls, fields: Iterable[str], metadata, count: int) -> 'TagIndex':
+        """
+        Build the codes of existing rows, e.g. of a memory-mapped snapshot.
+
+        Args:
+            fields (Iterable[str]): Fields to index.
+            metadata: Sequence of per-row metadata dicts.
+            count (int): Number of rows.
+
+        Returns:
+            TagIndex: The populated index.
+        """
+        tag_index = cls(fields, max(count, 1))
+        for row in range(count):
+            tag_index.set(row, metadata[row])
+
+        return tag_index
+
+    def set(self, row: int, metadata: Dict[str, Any]) -> None:
+        """
+        Store the filterable field values of a row, growing the code arrays if needed.
+        """
+        for field in self.fields:
+            codes = self.codes[field]
+            if row >= len(codes):
+                grown = np.full(max(row + 1, len(codes) * 2), -1, dtype=np.int32)
+                grown[:len(codes)] = codes
+                self.codes[field] = codes = grown
+
+            vocab = self.vocab[field]
+            value = self.normalize_value(metadata.get(field, ''))
+            codes[row] = vocab.setdefault(value, len(vocab))
+
+    def rows(self, filters: Dict[str, List[str]], count: int) -> np.ndarray:
+        """
+        Get the rows matching every filter.
+
+        Args:
+            filters (Dict[str, List[str]]): Normalized filters, field -> accepted values.
+            count (int): Number of rows currently stored.
+
+        Returns:
+            np.ndarray: Sorted indices of the matching rows.
+        """
+        mask = np.ones(count, dtype=bool)
+        for field, values in filters.items():
+            vocab = self.vocab[field]
+            values = [self.normalize_value(value) for value in values]
+            wanted = [vocab[value] for value in values if value in vocab]
+            mask &= np.isin(self.codes[field][:count], wanted)
+
+        return np.flatnonzero(mask)
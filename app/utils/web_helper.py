@@ -0,0 +1,75 @@
+import json
+
+class WebHelper:
+    """Request and response helpers shared by the Flask and ASGI apps"""
+
+    # Allowed file extensions for image upload
+    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+
+    @staticmethod
+    def allowed_file(filename):
+        return '.' in filename and \
+               filename.rsplit('.', 1)[1].lower() in WebHelper.ALLOWED_EXTENSIONS
+
+    @staticmethod
+    def parse_filters(filters, vector_storage):
+        """Validate metadata filters from a request, accepting a dict or its JSON encoding"""
+        if not filters:
+            return None
+
+        if isinstance(filters, str):
+            filters = json.loads(filters)
+
+        if not isinstance(filters, dict):
+            raise ValueError('Filters must be an object, e.g. {"animal": ["tiger", "lion"]}')
+
+        vector_storage.normalize_filters(filters)
+        return filters
+
+    @staticmethod
+    def parse_ef_runtime(ef_runtime, vector_storage):
+        """Validate the per-query HNSW candidate list size of a request, None when not given"""
+        if ef_runtime is None or ef_runtime == '':
+            return None
+
+        try:
+            if isinstance(ef_runtime, (bool, float)):
+                raise TypeError(ef_runtime)
+            ef_runtime = int(ef_runtime)
+        except (TypeError, ValueError):
+            raise ValueError('ef_runtime must be a positive integer')
+
+        if ef_runtime <= 0:
+            raise ValueError('ef_runtime must be a positive integer')
+        if not vector_storage.supports_ef_runtime():
+            raise ValueError('ef_runtime is only supported by the Redis vector storage')
+
+        return ef_runtime
+
+    @staticmethod
+    def transform_search_results(results):
+        """Transform search results from storage format to template format, in one pass"""
+        return [
+            {
+                'title': result.get('animal', 'Unknown Animal'),
+                'description': result.get('caption', 'No description available'),
+                'image_url': WebHelper.image_url(result.get('image_path')),
+                # Convert vector_distance to similarity (1 - distance for cosine similarity)
+                'similarity': 1 - result.get('vector_distance', 0),
+                'content': result.get('caption', 'No content available')  # Fallback for template
+            }
+            for result in results
+        ]
+
+    @staticmethod
+    def image_url(image_path):
+        """Map a stored image path to the URL serving it"""
+        if not image_path:
+            return None
+
+        # Dataset images are served from the dataset route:
+        # dataset/animal_images/<animal>/<filename> -> /dataset/<animal>/<filename>
+        if image_path.startswith('dataset/'):
+            return '/dataset/' + image_path.replace('dataset/', '').replace('animal_images/', '')
+
+        return image_path
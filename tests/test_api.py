@@ -0,0 +1,204 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import numpy as np
+
+# The app modules import each other from the app directory, as when run from it
+APP_DIR = Path(__file__).resolve().parents[1] / 'app'
+sys.path.insert(0, str(APP_DIR))
+
+from interface import EmbeddingModel
+from model import NumpyVectorStorage, SearchSystem
+from model.factory.search_system_factory import SearchSystemFactory
+from utils import LRUCache
+
+VECTOR_DIM = 16
+ANIMALS = ('tiger', 'lion', 'owl', 'snow leopard')
+
+class FakeEmbeddingModel(EmbeddingModel):
+    """Embeds texts and image bytes as one-hot vectors of the animal they mention"""
+
+    def __init__(self):
+        self.calls = []
+
+    @staticmethod
+    def vector(value) -> np.ndarray:
+        value = value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value)
+        vector = np.full(VECTOR_DIM, 0.01, dtype=np.float32)
+        for index, animal in enumerate(ANIMALS):
+            if animal in value:
+                vector[index] = 1.0
+        return vector
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])
+
+    def embed_image(self, image) -> np.ndarray:
+        return self.embed_images([image])
+
+    def embed_texts(self, texts: list) -> np.ndarray:
+        self.calls.append(('text', len(texts)))
+        return np.stack([self.vector(text) for text in texts])
+
+    def embed_images(self, images: list) -> np.ndarray:
+        self.calls.append(('image', len(images)))
+        return np.stack([self.vector(image) for image in images])
+
+def make_records() -> list:
+    """Two records per animal; the visual embedding of the second one points at the next animal"""
+    records = []
+    for index, animal in enumerate(ANIMALS):
+        for copy in range(2):
+            look_alike = ANIMALS[(index + copy) % len(ANIMALS)]
+            records.append({
+                'image_path': f"dataset/animal_images/{animal}/{copy}.jpg",
+                'animal': animal,
+                'caption': f"a {animal}",
+                'textual_embedding': FakeEmbeddingModel.vector(animal),
+                'visual_embedding': FakeEmbeddingModel.vector(look_alike),
+            })
+    return records
+
+def load_flask_app():
+    """Import app.py with the search system built from the fakes instead of the configured services"""
+    SearchSystem._instance = None
+    embedding_model = FakeEmbeddingModel()
+    storage = NumpyVectorStorage({'vector_dim': VECTOR_DIM, 'storage_precision': 'float32', 'snapshot_path': None})
+    storage.insert_many(make_records())
+    search_system = SearchSystem(storage, embedding_model, embedding_model, LRUCache(100), LRUCache(100))
+
+    working_dir = os.getcwd()
+    # app.py creates its upload folder in the working directory
+    os.chdir(tempfile.mkdtemp())
+    try:
+        with mock.patch.object(SearchSystemFactory, 'create', return_value=search_system):
+            import app as flask_app
+    finally:
+        os.chdir(working_dir)
+
+    return flask_app
+
+flask_app = load_flask_app()
+
+class ApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = flask_app.app.test_client()
+        self.search_system = flask_app.search_system
+        self.search_system.invalidate_results()
+        self.search_system.query_embedding_cache.clear()
+
+    def search_text(self, **body):
+        return self.client.post('/search/text', json=body)
+
+    @staticmethod
+    def titles(results: list) -> list:
+        return [result['title'] for result in results]
+
+    @staticmethod
+    def image_urls(results: list) -> list:
+        return [result['image_url'] for result in results]
+
+class TestTextSearch(ApiTestCase):
+    def test_returns_matching_animals(self):
+        response = self.search_text(query='a tiger', top_k=2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response.json['results']), ['tiger', 'tiger'])
+        self.assertAlmostEqual(response.json['results'][0]['similarity'], 1.0, places=5)
+
+    def test_hybrid_mode_ranks_records_matching_both_fields_first(self):
+        textual = self.search_text(query='an owl', top_k=3).json['results']
+        hybrid = self.search_text(query='an owl', top_k=3, mode='hybrid').json['results']
+
+        # Both owl captions tie on text; only owl/0 also looks like an owl
+        self.assertEqual(sorted(self.image_urls(textual[:2])), ['/dataset/owl/0.jpg', '/dataset/owl/1.jpg'])
+        self.assertEqual(self.image_urls(hybrid)[0], '/dataset/owl/0.jpg')
+        self.assertEqual(set(self.image_urls(hybrid)[1:]), {'/dataset/owl/1.jpg', '/dataset/lion/1.jpg'})
+
+    def test_rejects_missing_query(self):
+        self.assertEqual(self.search_text(query='').status_code, 400)
+
+class TestBatchSearch(ApiTestCase):
+    def test_text_batch_matches_single_searches(self):
+        queries = ['a tiger', 'an owl', 'a snow leopard']
+        calls = len(self.search_system.textual_embedding_model.calls)
+
+        response = self.client.post('/search/batch', json={'queries': queries, 'top_k': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['query'] for entry in response.json['results']], queries)
+        # One embedding call for the whole batch
+        self.assertEqual(self.search_system.textual_embedding_model.calls[calls:], [('text', 3)])
+
+        self.search_system.invalidate_results()
+        for query, entry in zip(queries, response.json['results']):
+            single = self.search_text(query=query, top_k=2).json['results']
+            self.assertEqual(self.image_urls(entry['results']), self.image_urls(single))
+            for batched, searched in zip(entry['results'], single):
+                self.assertAlmostEqual(batched['similarity'], searched['similarity'], places=5)
+
+    def test_image_batch_keeps_upload_order(self):
+        response = self.client.post('/search/batch', data={
+            'images': [(io.BytesIO(b'owl pixels'), 'owl.jpg'), (io.BytesIO(b'lion pixels'), 'lion.png')],
+            'top_k': '2',
+        }, content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 200)
+        # Each animal's pictures and the look-alike picture of the previous animal
+        self.assertEqual(
+            [(entry['query'], sorted(self.image_urls(entry['results']))) for entry in response.json['results']],
+            [('owl.jpg', ['/dataset/lion/1.jpg', '/dataset/owl/0.jpg']),
+             ('lion.png', ['/dataset/lion/0.jpg', '/dataset/tiger/1.jpg'])]
+        )
+
+    def test_rejects_invalid_batches(self):
+        for body in ({'queries': []}, {'queries': 'tiger'}, {'queries': ['tiger', '']},
+                     {'queries': ['tiger'] * (flask_app.app.config['MAX_BATCH_QUERIES'] + 1)}):
+            with self.subTest(body=str(body)[:40]):
+                self.assertEqual(self.client.post('/search/batch', json=body).status_code, 400)
+
+        response = self.client.post('/search/batch', data={
+            'images': [(io.BytesIO(b'owl pixels'), 'owl.txt')],
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+class TestMetrics(ApiTestCase):
+    def scrape(self) -> dict:
+        """Get the /metrics samples, without histogram buckets, by name and labels"""
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content_type, 'text/plain; version=0.0.4; charset=utf-8')
+
+        samples = {}
+        for line in response.get_data(as_text=True).splitlines():
+            if line and not line.startswith('#') and '_bucket{' not in line:
+                sample, value = line.rsplit(' ', 1)
+                samples[sample] = float(value)
+        return samples
+
+    def test_counts_requests_stages_and_cache_lookups(self):
+        before = self.scrape()
+        self.search_text(query='a lion')
+        self.search_text(query='a lion')
+        self.search_text(query='')
+        after = self.scrape()
+
+        def delta(sample):
+            return after.get(sample, 0) - before.get(sample, 0)
+
+        self.assertEqual(delta('http_requests_total{endpoint="text_search",status="200"}'), 2)
+        self.assertEqual(delta('http_requests_total{endpoint="text_search",status="400"}'), 1)
+        self.assertEqual(delta('http_request_duration_seconds_count{endpoint="text_search"}'), 3)
+        # The second search is answered from the result cache
+        self.assertEqual(delta('search_stage_duration_seconds_count{stage="embed"}'), 1)
+        self.assertEqual(delta('search_stage_duration_seconds_count{stage="knn"}'), 1)
+        self.assertEqual(delta('search_cache_lookups_total{cache="result_cache",result="hit"}'), 1)
+        self.assertEqual(delta('search_cache_lookups_total{cache="result_cache",result="miss"}'), 1)
+        self.assertEqual(after['search_cache_entries{cache="result_cache"}'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
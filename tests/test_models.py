@@ -0,0 +1,1062 @@
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+import numpy as np
+import yaml
+from PIL import Image
+from redis.exceptions import ResponseError
+
+# The app modules import each other from the app directory, as when run from it
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'app'))
+
+from utils import KMeans, InvertedLists, ProductQuantizer, PathHelper, RedisConnectionFactory, LRUCache
+from utils import IndexSnapshot, RankFusion
+from interface import EmbeddingModel, AsyncEmbeddingModel
+from model import NumpyVectorStorage, IVFVectorStorage, PQVectorStorage, RedisVectorStorage, ShardedVectorStorage
+from model import CachedEmbeddingModel, SQLiteEmbeddingCache, SearchSystem
+from model import MicroBatchingEmbeddingModel, AsyncMicroBatchingEmbeddingModel
+from pipeline import ImportPipeline, ImportCheckpoint, SharedImageBatch
+
+VECTOR_DIM = 32
+
+def clustered_vectors(rng: np.random.Generator, count: int, n_centers: int = 50, spread: float = 0.3) -> np.ndarray:
+    """Vectors scattered around random centers, like embeddings of similar images"""
+    centers = rng.standard_normal((n_centers, VECTOR_DIM))
+    return (centers[rng.integers(0, n_centers, count)] + spread * rng.standard_normal((count, VECTOR_DIM))).astype(np.float32)
+
+def make_records(textual: np.ndarray, visual: np.ndarray) -> list:
+    return [
+        {
+            'image_path': f"dataset/animal_images/test/{index}.jpg",
+            'animal': ('tiger', 'lion', 'owl')[index % 3],
+            'caption': f"caption {index}",
+            'textual_embedding': textual[index],
+            'visual_embedding': visual[index],
+        }
+        for index in range(len(textual))
+    ]
+
+def recall_at_k(expected: list, actual: list) -> float:
+    """Mean share of each query's exact top results that were found"""
+    return float(np.mean([
+        len({result['id'] for result in exact} & {result['id'] for result in found}) / len(exact)
+        for exact, found in zip(expected, actual)
+    ]))
+
+class TestKMeans(unittest.TestCase):
+    def test_fit_recovers_separable_blobs(self):
+        rng = np.random.default_rng(0)
+        centers = np.eye(4, VECTOR_DIM, dtype=np.float32) * 10
+        labels = rng.integers(0, 4, 2000)
+        vectors = centers[labels] + 0.1 * rng.standard_normal((2000, VECTOR_DIM)).astype(np.float32)
+
+        centroids = KMeans.fit(vectors, 4, iterations=10, seed=0)
+        assigned = KMeans.assign(vectors, centroids)
+
+        # Every blob ends up in exactly one cluster of its own, centered on the blob
+        mapping = {blob: set(assigned[labels == blob]) for blob in range(4)}
+        self.assertTrue(all(len(clusters) == 1 for clusters in mapping.values()))
+        self.assertEqual(len(set.union(*mapping.values())), 4)
+        for blob, clusters in mapping.items():
+            self.assertLess(np.linalg.norm(centroids[clusters.pop()] - centers[blob]), 0.05)
+
+    def test_fit_caps_clusters_at_vector_count(self):
+        vectors = np.random.default_rng(1).standard_normal((5, VECTOR_DIM)).astype(np.float32)
+        self.assertEqual(KMeans.fit(vectors, 16, iterations=2).shape, (5, VECTOR_DIM))
+
+class TestInvertedLists(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.vectors = rng.standard_normal((200, VECTOR_DIM)).astype(np.float32)
+        self.squared_norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        self.lists = InvertedLists.build(4, self.vectors[:100], self.squared_norms[:100], np.arange(100) % 4)
+
+    def assert_consistent(self, vectors: dict):
+        rows = np.array(sorted(vectors))
+        gathered, squared_norms = self.lists.gather(rows)
+        np.testing.assert_array_equal(gathered, np.stack([vectors[row] for row in rows]))
+        np.testing.assert_allclose(squared_norms, [np.dot(vectors[row], vectors[row]) for row in rows], rtol=1e-5)
+
+        listed = []
+        for list_id in range(self.lists.n_lists):
+            block_vectors, _, block_rows = self.lists.block(list_id)
+            np.testing.assert_array_equal(self.lists.assignments[block_rows], list_id)
+            np.testing.assert_array_equal(block_vectors, np.stack([vectors[row] for row in block_rows]) if len(block_rows) else block_vectors)
+            listed.extend(block_rows)
+        self.assertEqual(sorted(listed), list(rows))
+
+    def test_round_trip_after_swap_removes(self):
+        expected = {row: self.vectors[row] for row in range(100)}
+
+        for row in range(100, 200):
+            self.lists.add(row, row % 3, self.vectors[row], self.squared_norms[row])
+            expected[row] = self.vectors[row]
+
+        # Removing from the front of the lists swaps their last entries into the holes
+        for row in range(0, 200, 7):
+            self.lists.remove(row)
+            del expected[row]
+
+        # Re-adding an existing row moves it to another list
+        for row in range(1, 200, 11):
+            if row in expected:
+                self.lists.add(row, 3, -self.vectors[row], self.squared_norms[row])
+                expected[row] = -self.vectors[row]
+
+        self.assert_consistent(expected)
+
+    def test_handed_out_blocks_are_not_overwritten(self):
+        block_vectors, _, block_rows = self.lists.block(0)
+        before = (block_vectors.copy(), block_rows.copy())
+
+        self.lists.remove(int(block_rows[0]))
+        self.lists.add(150, 0, self.vectors[150], self.squared_norms[150])
+
+        np.testing.assert_array_equal(block_vectors, before[0])
+        np.testing.assert_array_equal(block_rows, before[1])
+
+class TestProductQuantizer(unittest.TestCase):
+    def test_adc_dots_match_exact_dots(self):
+        rng = np.random.default_rng(3)
+        vectors = clustered_vectors(rng, 4000)
+        queries = clustered_vectors(np.random.default_rng(3), 20)
+
+        quantizer = ProductQuantizer.train(vectors, m=8, iterations=10, seed=0)
+        codes = quantizer.encode(vectors)
+        self.assertEqual(codes.shape, (4000, 8))
+        self.assertEqual(codes.dtype, np.uint8)
+
+        estimated = quantizer.dots(quantizer.dot_tables(queries), codes)
+
+        # ADC is exactly the dot product with the decoded vectors
+        decoded = np.concatenate([quantizer.codebooks[j][codes[:, j]] for j in range(quantizer.m)], axis=1)
+        np.testing.assert_allclose(estimated, queries @ decoded.T, atol=1e-4)
+
+        # and close enough to the exact one for re-ranking a shortlist to find the true top 10
+        exact = queries @ vectors.T
+        self.assertGreater(np.corrcoef(estimated.ravel(), exact.ravel())[0, 1], 0.95)
+        true_top = np.argsort(-exact, axis=1)[:, :10]
+        shortlist = np.argsort(-estimated, axis=1)[:, :100]
+        self.assertTrue(all(set(top) <= set(candidates) for top, candidates in zip(true_top, shortlist)))
+
+    def test_train_rejects_indivisible_dimension(self):
+        vectors = np.zeros((300, VECTOR_DIM), dtype=np.float32)
+        with self.assertRaises(ValueError):
+            ProductQuantizer.train(vectors, m=5)
+
+class TestApproximateStorageRecall(unittest.TestCase):
+    """IVF and PQ results against exact search on a seeded dataset"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(4)
+        cls.records = make_records(clustered_vectors(rng, 3000), clustered_vectors(rng, 3000))
+        cls.queries = clustered_vectors(rng, 50)
+
+        cls.exact = NumpyVectorStorage({'vector_dim': VECTOR_DIM, 'storage_precision': 'float32', 'snapshot_path': None})
+        cls.exact.insert_many(cls.records)
+
+    def assert_recall(self, storage, minimum: float, filters: dict = None):
+        for embedding_type in ('textual', 'visual'):
+            expected = self.exact.search_many(self.queries, 10, embedding_type, filters)
+            actual = storage.search_many(self.queries, 10, embedding_type, filters)
+            self.assertGreaterEqual(recall_at_k(expected, actual), minimum)
+
+    def test_ivf_recall(self):
+        storage = IVFVectorStorage({
+            'vector_dim': VECTOR_DIM, 'nlist': 32, 'nprobe': 8, 'min_train_size': 1000,
+            'kmeans_iterations': 10, 'brute_force_threshold': 100, 'snapshot_path': None
+        })
+        storage.insert_many(self.records)
+
+        self.assertTrue(storage.trained)
+        self.assert_recall(storage, 0.95)
+        self.assert_recall(storage, 0.95, {'animal': 'Tiger'})
+
+    def test_pq_recall(self):
+        storage = PQVectorStorage({
+            'vector_dim': VECTOR_DIM, 'm': 8, 'min_train_size': 1000, 'kmeans_iterations': 10,
+            'rerank_factor': 10, 'full_precision_path': None, 'snapshot_path': None
+        })
+        storage.insert_many(self.records)
+
+        self.assertIsNotNone(storage.quantizers['textual'])
+        self.assert_recall(storage, 0.95)
+        self.assert_recall(storage, 0.95, {'animal': 'lion'})
+
+# The pipeline logs every failed image, which the tests cause on purpose
+IMPORT_LOGGER = logging.getLogger('test-import')
+IMPORT_LOGGER.addHandler(logging.NullHandler())
+IMPORT_LOGGER.propagate = False
+
+class FlakyStorage(NumpyVectorStorage):
+    """Local storage whose searches fail while failing is set, counting the searches it receives"""
+
+    failing = False
+    searches = 0
+
+    def search_many(self, *args, **kwargs) -> list:
+        self.searches += 1
+        if self.failing:
+            raise ConnectionError('shard down')
+        return super().search_many(*args, **kwargs)
+
+class TestShardedVectorStorage(unittest.TestCase):
+    RETRY_INTERVAL = 0.2
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.records = make_records(clustered_vectors(rng, 300), clustered_vectors(rng, 300))
+        self.queries = clustered_vectors(rng, 10)
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        config_path = Path(self.tmp_dir.name) / 'sharding_config.yaml'
+        config_path.write_text(yaml.safe_dump({'sharding': {
+            'backend': 'local', 'shards': [], 'shard_timeout': None,
+            'failure_threshold': 2, 'retry_interval': self.RETRY_INTERVAL,
+        }}))
+
+        self.shards = [FlakyStorage(self.storage_config()) for _ in range(3)]
+        with mock.patch.object(PathHelper, 'get_config_file', return_value=config_path):
+            self.storage = ShardedVectorStorage(shards=self.shards)
+        self.storage.insert_many(self.records)
+
+    def tearDown(self):
+        self.storage.executor.shutdown()
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def storage_config() -> dict:
+        return {'vector_dim': VECTOR_DIM, 'storage_precision': 'float32', 'snapshot_path': None}
+
+    def search(self, filters: dict = None) -> list:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.storage.search_many(self.queries, top_k=10, filters=filters)
+
+    def test_records_are_spread_by_key(self):
+        self.assertEqual(sum(shard.count for shard in self.shards), len(self.records))
+        self.assertTrue(all(shard.count > 0 for shard in self.shards))
+        for index, shard in enumerate(self.shards):
+            for key_id in shard.keys:
+                self.assertEqual(self.storage.shard_of(key_id), index)
+
+    def test_merged_results_match_a_single_storage(self):
+        single = NumpyVectorStorage(self.storage_config())
+        single.insert_many(self.records)
+
+        for filters in (None, {'animal': ['owl', 'lion']}):
+            expected = single.search_many(self.queries, top_k=10, filters=filters)
+            for exact, merged in zip(expected, self.search(filters)):
+                self.assertEqual([result['id'] for result in merged], [result['id'] for result in exact])
+                np.testing.assert_allclose(
+                    [result['vector_distance'] for result in merged],
+                    [result['vector_distance'] for result in exact],
+                    atol=1e-6
+                )
+
+    def test_failing_shard_is_ejected_and_probed(self):
+        down = self.shards[1]
+        down.failing = True
+
+        for _ in range(2):
+            results = self.search()
+            # The other shards still answer
+            self.assertEqual([len(found) for found in results], [10] * len(self.queries))
+            self.assertFalse(any(self.storage.shard_of(result['id']) == 1 for found in results for result in found))
+        self.assertFalse(self.storage.health[1].healthy)
+
+        # Ejected: skipped until the next probe
+        searches = down.searches
+        self.search()
+        self.assertEqual(down.searches, searches)
+
+        down.failing = False
+        time.sleep(self.RETRY_INTERVAL * 1.5)
+        self.search()
+        self.assertEqual(down.searches, searches + 1)
+        self.assertTrue(self.storage.health[1].healthy)
+        self.assertEqual(self.storage.get_shard_stats()[1]['errors'], 2)
+
+class FakeImportSearchSystem:
+    """Embeds with seeded random vectors and writes to a real local storage"""
+
+    def __init__(self, vector_storage):
+        self.vector_storage = vector_storage
+        self.rng = np.random.default_rng(5)
+        self.images = []
+
+    def embed_texts(self, texts: list) -> np.ndarray:
+        return self.rng.standard_normal((len(texts), VECTOR_DIM)).astype(np.float32)
+
+    def embed_images(self, images: list) -> np.ndarray:
+        self.images.extend(images)
+        return self.rng.standard_normal((len(images), VECTOR_DIM)).astype(np.float32)
+
+class FailingStorage(NumpyVectorStorage):
+    """Local storage refusing every batch that holds an image named 'broken'"""
+
+    def insert_many(self, records: list) -> list:
+        if any('broken' in record['image_path'] for record in records):
+            raise RuntimeError('storage unavailable')
+        return super().insert_many(records)
+
+class RecordingMonitor:
+    def __init__(self):
+        self.started = []
+        self.ended = []
+        self.batches = []
+
+    def start_animal_processing(self, animal_name):
+        self.started.append(animal_name)
+
+    def end_animal_processing(self, animal_name, images_found):
+        self.ended.append(animal_name)
+        return 0.0
+
+    def record_batch_processing(self, batch_size, seconds):
+        self.batches.append(batch_size)
+
+class ImportPipelineTestCase(unittest.TestCase):
+    """Runs the import pipeline on a small dataset written to a temporary directory"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.dataset_dir = self.root / 'dataset'
+        (self.dataset_dir / 'animal_captions').mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def add_animal(self, animal: str, images: list, captions: dict = None):
+        """Write an image folder and, unless captions is None, its caption file"""
+        images_dir = self.dataset_dir / 'animal_images' / animal
+        images_dir.mkdir(parents=True)
+        for image in images:
+            (images_dir / image).write_bytes(f"pixels of {image}".encode())
+
+        if captions is not None:
+            self.add_captions(animal, captions)
+
+    def add_picture(self, animal: str, image: str, color: tuple, size: tuple = (40, 24)):
+        """Write a real single-color image, replacing the placeholder bytes of add_animal"""
+        Image.new('RGB', size, color).save(self.dataset_dir / 'animal_images' / animal / image)
+
+    def add_captions(self, animal: str, captions: dict):
+        lines = [f"{animal}/{image},\"{caption}\"" for image, caption in captions.items()]
+        (self.dataset_dir / 'animal_captions' / f"caption_{animal}.csv").write_text('\n'.join(lines))
+
+    def make_pipeline(self, storage, decoding: bool = False, checkpoint: bool = False, batch_size: int = 2):
+        config = {
+            'pipeline': {
+                'caption_workers': 2, 'embedding_workers': 2, 'writer_workers': 2,
+                'embedding_batch_size': batch_size, 'queue_size': 2,
+            },
+            'decoding': {'enabled': decoding, 'workers': 2, 'chunk_size': 2, 'size': 16},
+            # An absolute path is kept as is when joined to the app directory
+            'checkpoint': {'enabled': checkpoint, 'path': str(self.root / 'checkpoint.jsonl')},
+        }
+        config_path = self.root / 'import_config.yaml'
+        config_path.write_text(yaml.safe_dump(config))
+
+        self.monitor = RecordingMonitor()
+        with mock.patch.object(PathHelper, 'get_config_file', return_value=config_path):
+            return ImportPipeline(
+                FakeImportSearchSystem(storage), self.dataset_dir, IMPORT_LOGGER, self.monitor
+            )
+
+    @staticmethod
+    def make_storage(storage_class=NumpyVectorStorage):
+        return storage_class({'vector_dim': VECTOR_DIM, 'storage_precision': 'float32', 'snapshot_path': None})
+
+class TestImportPipeline(ImportPipelineTestCase):
+    def test_every_animal_is_finalized_once(self):
+        images = [f"tiger_{index}.jpg" for index in range(5)]
+        self.add_animal('tiger', images + ['notes.txt'], {image: f"tiger {image}" for image in images[:4]})
+        self.add_animal('lion', [], {})
+        self.add_animal('owl', ['owl_0.jpg'])
+
+        storage = self.make_storage()
+        results = self.make_pipeline(storage).run(['tiger', 'lion', 'owl', 'ghost'])
+
+        # tiger: 4 captioned images written, 1 without caption; lion has no images,
+        # owl no caption file and ghost no folder
+        self.assertEqual(results['successful_animals'], 1)
+        self.assertEqual(results['failed_animals'], 3)
+        self.assertEqual(results['total_images'], 5)
+        self.assertEqual(results['successful_images'], 4)
+        self.assertEqual(results['failed_images'], 1)
+        self.assertEqual(storage.count, 4)
+
+        tiger = results['animal_details']['tiger']
+        self.assertEqual((tiger['images_found'], tiger['captions_found']), (5, 4))
+        self.assertEqual(len(tiger['errors']), 1)
+        self.assertEqual(sorted(self.monitor.ended), ['ghost', 'lion', 'owl', 'tiger'])
+        self.assertEqual(sum(self.monitor.batches), 4)
+
+    def test_failed_write_counts_the_batch_as_failed(self):
+        images = ['a.jpg', 'b.jpg', 'broken.jpg', 'c.jpg', 'd.jpg']
+        self.add_animal('tiger', images, {image: image for image in images})
+
+        storage = self.make_storage(FailingStorage)
+        # Sorted files are batched as (a, b), (broken, c), (d)
+        results = self.make_pipeline(storage).run(['tiger'])
+
+        self.assertEqual(results['successful_images'], 3)
+        self.assertEqual(results['failed_images'], 2)
+        self.assertEqual(results['successful_animals'], 1)
+        self.assertEqual(self.monitor.ended, ['tiger'])
+        self.assertEqual(storage.count, 3)
+
+class TestImageDecoding(ImportPipelineTestCase):
+    def test_decode_into_fills_slots_and_reports_bad_files(self):
+        self.add_animal('tiger', ['orange.png', 'broken.jpg', 'white.jpg'])
+        self.add_picture('tiger', 'orange.png', (255, 128, 0))
+        self.add_picture('tiger', 'white.jpg', (255, 255, 255), size=(16, 16))
+        images_dir = self.dataset_dir / 'animal_images' / 'tiger'
+
+        shared_images = SharedImageBatch(3, 16)
+        try:
+            results = SharedImageBatch.decode_into(shared_images.name, 3, 16, [
+                (0, str(images_dir / 'orange.png')),
+                (1, str(images_dir / 'broken.jpg')),
+                (2, str(images_dir / 'white.jpg')),
+            ])
+
+            self.assertEqual([slot for slot, _ in results], [0, 1, 2])
+            self.assertIsNone(results[0][1])
+            self.assertIsNotNone(results[1][1])
+            self.assertIsNone(results[2][1])
+
+            orange, white = shared_images.images([0, 2])
+            self.assertEqual((orange.size, orange.mode), ((16, 16), 'RGB'))
+            self.assertEqual(orange.getpixel((8, 8)), (255, 128, 0))
+            # JPEG compression may shift a flat color by a step or two
+            np.testing.assert_allclose(np.asarray(white), 255, atol=2)
+        finally:
+            shared_images.release()
+
+    def test_pipeline_embeds_decoded_images(self):
+        images = ['a.png', 'b.png', 'broken.png', 'c.png']
+        self.add_animal('tiger', images, {image: f"tiger {image}" for image in images})
+        for image in ('a.png', 'b.png', 'c.png'):
+            self.add_picture('tiger', image, (200, 100, 0))
+
+        storage = self.make_storage()
+        pipeline = self.make_pipeline(storage, decoding=True)
+        results = pipeline.run(['tiger'])
+
+        # Only the undecodable file fails; the rest reach the model as decoded images
+        self.assertEqual(results['successful_images'], 3)
+        self.assertEqual(results['failed_images'], 1)
+        self.assertEqual(storage.count, 3)
+        self.assertEqual(len(results['animal_details']['tiger']['errors']), 1)
+        self.assertEqual([image.size for image in pipeline.search_system.images], [(16, 16)] * 3)
+
+class CountingStorage(NumpyVectorStorage):
+    """Local storage counting the records written to it"""
+
+    written = 0
+
+    def insert_many(self, records: list) -> list:
+        self.written += len(records)
+        return super().insert_many(records)
+
+class TestImportCheckpoint(ImportPipelineTestCase):
+    def test_rerun_skips_unchanged_images(self):
+        images = [f"tiger_{index}.jpg" for index in range(4)]
+        captions = {image: f"tiger {image}" for image in images}
+        self.add_animal('tiger', images, captions)
+        storage = self.make_storage(CountingStorage)
+
+        first = self.make_pipeline(storage, checkpoint=True).run(['tiger'])
+        self.assertEqual((first['successful_images'], first['skipped_images']), (4, 0))
+
+        second = self.make_pipeline(storage, checkpoint=True).run(['tiger'])
+        self.assertEqual((second['successful_images'], second['skipped_images']), (0, 4))
+        self.assertEqual(second['successful_animals'], 1)
+        self.assertEqual(storage.written, 4)
+
+        # A new caption or new image bytes re-import just that image, under the same key
+        captions[images[1]] = 'a different caption'
+        self.add_captions('tiger', captions)
+        (self.dataset_dir / 'animal_images' / 'tiger' / images[2]).write_bytes(b'new pixels')
+
+        third = self.make_pipeline(storage, checkpoint=True).run(['tiger'])
+        self.assertEqual((third['successful_images'], third['skipped_images']), (2, 2))
+        self.assertEqual(storage.written, 6)
+        self.assertEqual(storage.count, 4)
+
+    def test_resume_ignores_a_half_written_entry(self):
+        path = self.root / 'checkpoint.jsonl'
+        image = self.root / 'tiger.jpg'
+        image.write_bytes(b'pixels')
+
+        checkpoint = ImportCheckpoint(path)
+        fingerprint = checkpoint.fingerprint('dataset/tiger.jpg', image, 'a tiger')
+        checkpoint.mark_done([dict(fingerprint, image_path='dataset/tiger.jpg', key='k1')])
+        checkpoint.mark_done([dict(fingerprint, image_path='dataset/tiger.jpg', key='k2')])
+        checkpoint.close()
+
+        # A crash while appending leaves a truncated line
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"image_path": "dataset/lio')
+
+        resumed = ImportCheckpoint(path)
+        self.assertTrue(resumed.is_done('dataset/tiger.jpg', resumed.fingerprint('dataset/tiger.jpg', image, 'a tiger')))
+        self.assertFalse(resumed.is_done('dataset/tiger.jpg', resumed.fingerprint('dataset/tiger.jpg', image, 'a lion')))
+        self.assertEqual(resumed.entries['dataset/tiger.jpg']['key'], 'k2')
+        resumed.close()
+
+        # Loading compacts the manifest to one line per image
+        self.assertEqual(len(path.read_text().splitlines()), 1)
+
+class FakeEmbeddingModel(EmbeddingModel):
+    """Embeds each input as a vector seeded by its text, recording the model calls"""
+
+    def __init__(self, identity: str = 'fake-model'):
+        self.identity = identity
+        self.calls = []
+
+    def get_identity(self) -> str:
+        return self.identity
+
+    @staticmethod
+    def vector(value) -> np.ndarray:
+        seed = int.from_bytes(str(value).encode('utf-8')[:8].ljust(8, b'\0'), 'little')
+        return np.random.default_rng(seed).standard_normal(VECTOR_DIM).astype(np.float32)
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])
+
+    def embed_image(self, image) -> np.ndarray:
+        return self.embed_images([image])
+
+    def embed_texts(self, texts: list) -> np.ndarray:
+        self.calls.append(list(texts))
+        return np.stack([self.vector(text) for text in texts]) if texts else np.empty((0, VECTOR_DIM), dtype=np.float32)
+
+    def embed_images(self, images: list) -> np.ndarray:
+        return self.embed_texts(images)
+
+class AsyncFakeEmbeddingModel(AsyncEmbeddingModel):
+    """Asyncio front of a FakeEmbeddingModel"""
+
+    def __init__(self, embedding_model: FakeEmbeddingModel):
+        self.embedding_model = embedding_model
+
+    async def embed_text(self, text: str) -> np.ndarray:
+        return await self.embed_texts([text])
+
+    async def embed_image(self, image) -> np.ndarray:
+        return await self.embed_images([image])
+
+    async def embed_texts(self, texts: list) -> np.ndarray:
+        # Yield once, as a model call over the network would
+        await asyncio.sleep(0)
+        return self.embedding_model.embed_texts(texts)
+
+    async def embed_images(self, images: list) -> np.ndarray:
+        return await self.embed_texts(images)
+
+class FailingEmbeddingModel(FakeEmbeddingModel):
+    def embed_texts(self, texts: list) -> np.ndarray:
+        self.calls.append(list(texts))
+        raise RuntimeError('model unavailable')
+
+class TestMicroBatching(unittest.TestCase):
+    TEXTS = [f"animal {index}" for index in range(24)]
+
+    def assert_fanned_out(self, calls: list, embeddings: list):
+        # Every caller gets its own row and every input reaches the model exactly once
+        for text, embedding in zip(self.TEXTS, embeddings):
+            self.assertEqual(embedding.shape, (1, VECTOR_DIM))
+            np.testing.assert_array_equal(embedding[0], FakeEmbeddingModel.vector(text))
+        self.assertEqual(sorted(text for call in calls for text in call), sorted(self.TEXTS))
+        self.assertLess(len(calls), len(self.TEXTS))
+        self.assertLessEqual(max(len(call) for call in calls), 8)
+
+    def test_concurrent_calls_share_batches(self):
+        model = FakeEmbeddingModel()
+        batching = MicroBatchingEmbeddingModel(model, max_batch_size=8, max_wait_ms=50)
+
+        with ThreadPoolExecutor(max_workers=len(self.TEXTS)) as executor:
+            embeddings = list(executor.map(batching.embed_text, self.TEXTS))
+
+        self.assert_fanned_out(model.calls, embeddings)
+
+    def test_model_error_reaches_every_caller_of_the_batch(self):
+        model = FailingEmbeddingModel()
+        batching = MicroBatchingEmbeddingModel(model, max_batch_size=8, max_wait_ms=50)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(batching.embed_image, f"image {index}") for index in range(4)]
+            for future in futures:
+                with self.assertRaisesRegex(RuntimeError, 'model unavailable'):
+                    future.result(timeout=5)
+
+        # The dispatcher survives the failure
+        model.embed_texts = FakeEmbeddingModel.embed_texts.__get__(model)
+        np.testing.assert_array_equal(batching.embed_image('owl')[0], FakeEmbeddingModel.vector('owl'))
+
+    def test_async_concurrent_calls_share_batches(self):
+        model = FakeEmbeddingModel()
+        batching = AsyncMicroBatchingEmbeddingModel(AsyncFakeEmbeddingModel(model), max_batch_size=8, max_wait_ms=50)
+
+        async def embed_all():
+            return await asyncio.gather(*(batching.embed_text(text) for text in self.TEXTS))
+
+        self.assert_fanned_out(model.calls, asyncio.run(embed_all()))
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'embeddings.sqlite3'
+        self.caches = []
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        self.tmp_dir.cleanup()
+
+    def open_cache(self, max_size_bytes: int = 1 << 20) -> SQLiteEmbeddingCache:
+        cache = SQLiteEmbeddingCache(self.path, max_size_bytes)
+        self.caches.append(cache)
+        return cache
+
+    def test_repeated_inputs_skip_the_model(self):
+        model = FakeEmbeddingModel()
+        cached_model = CachedEmbeddingModel(model, self.open_cache())
+
+        embeddings = cached_model.embed_texts(['a tiger', ' a  tiger ', 'a lion'])
+        # Whitespace variants share one key, so the model sees each text once
+        self.assertEqual(model.calls, [['a tiger', 'a lion']])
+        np.testing.assert_array_equal(embeddings[0], embeddings[1])
+        np.testing.assert_array_equal(embeddings[2], model.vector('a lion'))
+
+        cached_model.embed_texts(['a lion', 'an owl'])
+        self.assertEqual(model.calls[-1], ['an owl'])
+
+        # The cache persists across processes sharing the file, but not across models
+        reopened = CachedEmbeddingModel(model, self.open_cache())
+        np.testing.assert_array_equal(reopened.embed_text('a tiger')[0], model.vector('a tiger'))
+        self.assertEqual(len(model.calls), 2)
+
+        other_model = FakeEmbeddingModel('other-model')
+        CachedEmbeddingModel(other_model, self.open_cache()).embed_text('a tiger')
+        self.assertEqual(other_model.calls, [['a tiger']])
+
+    def test_eviction_drops_least_recently_used_across_processes(self):
+        vector_size = VECTOR_DIM * 4
+        # Room for 10 vectors, evicting down to 9
+        first = self.open_cache(10 * vector_size)
+        second = self.open_cache(10 * vector_size)
+        vector = np.ones(VECTOR_DIM, dtype=np.float32)
+
+        first.put_many({f"a{index}": vector for index in range(6)})
+        second.put_many({f"b{index}": vector for index in range(4)})
+        self.assertEqual(first.total_size, 10 * vector_size)
+
+        # Write access times on every read
+        first.ACCESS_FLUSH_SIZE = 1
+        first.get_many(['a0'])
+
+        # Both processes see the other's entries, so the eleventh vector evicts the two oldest
+        second.put_many({'b4': vector})
+        self.assertEqual(second.total_size, 9 * vector_size)
+        self.assertEqual(first.total_size, 9 * vector_size)
+        self.assertEqual(set(first.get_many(['a0', 'a1', 'a2', 'b4'])), {'a0', 'b4'})
+
+class FakeRedis:
+    """In-memory stand-in for a Redis Stack node, counting round trips"""
+
+    def __init__(self, name: str = 'primary'):
+        self.name = name
+        self.hashes = {}
+        self.values = {}
+        self.round_trips = 0
+        # Raised by every command while set, e.g. a ConnectionError
+        self.error = None
+        self.search_reply = [0]
+        self.searches = []
+
+    def round_trip(self):
+        self.round_trips += 1
+        if self.error is not None:
+            raise self.error
+
+    def ft(self, index_name: str):
+        return FakeSearchIndex(self)
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+    def hset(self, key, mapping):
+        self.round_trip()
+        return self.apply('hset', key, mapping)
+
+    def incr(self, key):
+        self.round_trip()
+        return self.apply('incr', key)
+
+    def get(self, key):
+        self.round_trip()
+        return self.values.get(key)
+
+    def execute_command(self, *args):
+        self.round_trip()
+        return self.apply('execute_command', *args)
+
+    def apply(self, command: str, *args):
+        if command == 'hset':
+            key, mapping = args
+            self.hashes.setdefault(key, {}).update(mapping)
+            return len(mapping)
+        if command == 'incr':
+            self.values[args[0]] = self.values.get(args[0], 0) + 1
+            return self.values[args[0]]
+        if command == 'execute_command' and args[0] == 'FT.SEARCH':
+            self.searches.append(args[1:])
+            return self.search_reply
+        raise NotImplementedError(command)
+
+class FakePipeline:
+    def __init__(self, redis_client: FakeRedis):
+        self.redis_client = redis_client
+        self.commands = []
+
+    def __getattr__(self, command):
+        return lambda *args, **kwargs: self.commands.append((command, args + tuple(kwargs.values())))
+
+    def execute(self):
+        self.redis_client.round_trip()
+        return [self.redis_client.apply(command, *args) for command, args in self.commands]
+
+class FakeSearchIndex:
+    def __init__(self, redis_client: FakeRedis):
+        self.redis_client = redis_client
+
+    def info(self):
+        return {
+            'index_name': b'animal_index_v1',
+            'num_docs': len(self.redis_client.hashes),
+            'indexing': 0,
+            'hash_indexing_failures': 0,
+            'attributes': [[b'identifier', b'animal', b'attribute', b'animal', b'type', b'TAG']],
+        }
+
+def search_reply(*results) -> list:
+    """Raw FT.SEARCH reply holding (key id, animal, distance) results"""
+    reply = [len(results)]
+    for key_id, animal, distance in results:
+        reply.append(f"animal:{key_id}".encode())
+        reply.append([
+            b'animal', animal.encode(), b'caption', b'a ' + animal.encode(),
+            b'image_path', f"dataset/animal_images/{animal}/{key_id}.jpg".encode(),
+            b'vector_distance', str(distance).encode(),
+        ])
+    return reply
+
+class RedisStorageTestCase(unittest.TestCase):
+    """Builds RedisVectorStorage instances on FakeRedis nodes, looked up by host"""
+
+    def setUp(self):
+        self.nodes = {}
+        self.client_calls = []
+
+        def get_client(endpoint=None, retry_attempts=None):
+            self.client_calls.append((endpoint, retry_attempts))
+            host = (endpoint or {}).get('host', 'primary')
+            return self.nodes.setdefault(host, FakeRedis(host))
+
+        patcher = mock.patch.object(RedisConnectionFactory, 'get_client', side_effect=get_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_storage(self, **overrides) -> RedisVectorStorage:
+        overrides = dict({'vector_dim': VECTOR_DIM, 'pipeline_chunk_size': 3}, **overrides)
+        # The storage reports on the existing index it finds
+        with contextlib.redirect_stdout(io.StringIO()):
+            return RedisVectorStorage(overrides)
+
+class TestRedisVectorStorage(RedisStorageTestCase):
+    def test_insert_many_pipelines_each_chunk(self):
+        storage = self.make_storage()
+        primary = self.nodes['primary']
+        records = make_records(np.ones((7, VECTOR_DIM)), np.zeros((7, VECTOR_DIM)))
+
+        round_trips = primary.round_trips
+        key_ids = storage.insert_many(records)
+
+        # 7 records in chunks of 3, one round trip each
+        self.assertEqual(primary.round_trips - round_trips, 3)
+        self.assertEqual(key_ids, [storage.make_key_id(record) for record in records])
+        self.assertEqual(len(set(key_ids)), 7)
+
+        stored = primary.hashes[f"animal:{key_ids[4]}"]
+        self.assertEqual(stored['animal'], records[4]['animal'])
+        np.testing.assert_array_equal(np.frombuffer(stored['textual_embedding'], dtype=np.float32), np.ones(VECTOR_DIM))
+
+        # Re-importing the same images overwrites their hashes
+        storage.insert_many(records)
+        self.assertEqual(len(primary.hashes), 7)
+
+    def test_search_many_pipelines_queries_and_parses_replies(self):
+        storage = self.make_storage()
+        primary = self.nodes['primary']
+        primary.search_reply = search_reply(('k1', 'tiger', 0.125), ('k2', 'lion', 0.5))
+
+        round_trips = primary.round_trips
+        results = storage.search_many(np.zeros((5, VECTOR_DIM), dtype=np.float32), 2, 'visual', {'animal': 'tiger'})
+
+        self.assertEqual(primary.round_trips - round_trips, 2)
+        self.assertEqual(len(primary.searches), 5)
+        self.assertIn('(@animal:{tiger})=>[KNN 2 @visual_embedding $vec AS vector_distance]', primary.searches[0])
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0], [
+            {'id': 'k1', 'animal': 'tiger', 'caption': 'a tiger',
+             'image_path': 'dataset/animal_images/tiger/k1.jpg', 'vector_distance': 0.125},
+            {'id': 'k2', 'animal': 'lion', 'caption': 'a lion',
+             'image_path': 'dataset/animal_images/lion/k2.jpg', 'vector_distance': 0.5},
+        ])
+
+class TestReadReplicas(RedisStorageTestCase):
+    RETRY_INTERVAL = 0.2
+
+    def make_replicated_storage(self, **overrides) -> RedisVectorStorage:
+        storage = self.make_storage(**dict({
+            'read_replicas': [{'host': 'r1'}, {'host': 'r2'}],
+            'read_balancing': 'round_robin',
+            'replica_failure_threshold': 2,
+            'replica_retry_interval': self.RETRY_INTERVAL,
+        }, **overrides))
+        for node in self.nodes.values():
+            node.search_reply = search_reply((node.name, 'tiger', 0.25))
+        return storage
+
+    def search(self, storage: RedisVectorStorage) -> str:
+        """Search once, returning the node that answered"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return storage.search(np.zeros(VECTOR_DIM, dtype=np.float32))[0]['id']
+
+    def test_searches_alternate_between_replicas(self):
+        storage = self.make_replicated_storage()
+
+        self.assertEqual([self.search(storage) for _ in range(4)], ['r1', 'r2', 'r1', 'r2'])
+        self.assertEqual(self.nodes['primary'].searches, [])
+        # Replica reads fall back to the primary rather than retrying
+        self.assertIn(({'host': 'r1', 'unix_socket_path': None}, 0), self.client_calls)
+
+        # Writes stay on the primary
+        storage.insert_many(make_records(np.ones((2, VECTOR_DIM)), np.ones((2, VECTOR_DIM))))
+        self.assertEqual(len(self.nodes['primary'].hashes), 2)
+        self.assertEqual(self.nodes['r1'].hashes, {})
+
+    def test_loading_replica_falls_back_and_is_ejected_then_probed(self):
+        storage = self.make_replicated_storage()
+        replica = self.nodes['r1']
+        replica.error = ResponseError('LOADING Redis is loading the dataset in memory')
+
+        answered = [self.search(storage) for _ in range(6)]
+
+        # r1's first two searches fail over to the primary, then r1 is skipped
+        self.assertEqual(answered, ['primary', 'r2', 'primary', 'r2', 'r2', 'r2'])
+        self.assertEqual(replica.round_trips, 2)
+        self.assertFalse(storage.replica_health[0].healthy)
+        self.assertIn('LOADING', storage.get_replica_stats()[0]['last_error'])
+
+        replica.error = None
+        time.sleep(self.RETRY_INTERVAL * 1.5)
+        self.assertEqual(self.search(storage), 'r1')
+        self.assertTrue(storage.replica_health[0].healthy)
+
+    def test_shard_replicas_inherit_the_shard_endpoint(self):
+        storage = self.make_replicated_storage(
+            host='shard-1', port=6380, password='secret', unix_socket_path='/tmp/redis.sock',
+            read_replicas=[{'host': 'shard-1-replica'}, {'unix_socket_path': '/tmp/replica.sock'}]
+        )
+
+        self.assertEqual(storage.replica_endpoints, [
+            {'host': 'shard-1-replica', 'port': 6380, 'unix_socket_path': None, 'password': 'secret'},
+            {'host': 'shard-1', 'port': 6380, 'unix_socket_path': '/tmp/replica.sock', 'password': 'secret'},
+        ])
+        self.assertEqual(self.search(storage), 'shard-1-replica')
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('tiger', 1)
+        cache.put('lion', 2)
+        cache.get('tiger')
+        cache.put('owl', 3)
+
+        self.assertIsNone(cache.get('lion'))
+        self.assertEqual((cache.get('tiger'), cache.get('owl')), (1, 3))
+        self.assertEqual(cache.stats()['hits'], 3)
+
+    def test_entries_expire_after_ttl(self):
+        cache = LRUCache(10, ttl_seconds=60)
+        with mock.patch('utils.lru_cache.time.monotonic', return_value=1000.0):
+            cache.put('tiger', 1)
+        with mock.patch('utils.lru_cache.time.monotonic', return_value=1059.0):
+            self.assertEqual(cache.get('tiger'), 1)
+        with mock.patch('utils.lru_cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(cache.get('tiger'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+def make_search_system(vector_storage, embedding_model) -> SearchSystem:
+    """A fresh SearchSystem, replacing the singleton instance"""
+    SearchSystem._instance = None
+    return SearchSystem(vector_storage, embedding_model, embedding_model, LRUCache(100), LRUCache(100))
+
+class TestResultCacheInvalidation(RedisStorageTestCase):
+    def tearDown(self):
+        SearchSystem._instance = None
+
+    def test_direct_storage_writes_drop_cached_results(self):
+        storage = NumpyVectorStorage({'vector_dim': VECTOR_DIM, 'storage_precision': 'float32', 'snapshot_path': None})
+        model = FakeEmbeddingModel()
+        search_system = make_search_system(storage, model)
+        storage.insert_many(make_records(np.ones((3, VECTOR_DIM)), np.ones((3, VECTOR_DIM))))
+
+        first = search_system.text_search('a tiger', 5)
+        self.assertEqual(search_system.text_search('a tiger', 5), first)
+        self.assertEqual(search_system.text_search_many(['a tiger'], 5), [first])
+        self.assertEqual(search_system.result_cache.stats()['hits'], 2)
+        self.assertEqual(model.calls, [['a tiger']])
+
+        # The import pipeline writes to the storage, bypassing the search system
+        query = model.vector('a tiger')
+        storage.insert_many([dict(image_path='new.jpg', animal='owl', caption='', textual_embedding=query, visual_embedding=query)])
+
+        results = search_system.text_search('a tiger', 5)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['image_path'], 'new.jpg')
+        # while the query embedding stays cached
+        self.assertEqual(model.calls, [['a tiger']])
+
+    def test_writes_of_other_processes_drop_cached_results(self):
+        storage = self.make_storage()
+        primary = self.nodes['primary']
+        primary.search_reply = search_reply(('k1', 'tiger', 0.25))
+        search_system = make_search_system(storage, FakeEmbeddingModel())
+
+        search_system.text_search('a tiger', 5)
+        search_system.hybrid_text_search('a tiger', 5)
+        searches = len(primary.searches)
+        search_system.text_search('a tiger', 5)
+        search_system.hybrid_text_search('a tiger', 5)
+        self.assertEqual(len(primary.searches), searches)
+
+        # An importer elsewhere bumps the generation stored in Redis
+        importer_storage = self.make_storage()
+        importer_storage.insert_many(make_records(np.ones((1, VECTOR_DIM)), np.ones((1, VECTOR_DIM))))
+
+        primary.search_reply = search_reply(('k2', 'tiger', 0.0), ('k1', 'tiger', 0.25))
+        self.assertEqual([result['id'] for result in search_system.text_search('a tiger', 5)], ['k2', 'k1'])
+        self.assertEqual(len(primary.searches), searches + 1)
+
+class TestIndexSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / 'index'
+        rng = np.random.default_rng(6)
+        self.records = make_records(clustered_vectors(rng, 500), clustered_vectors(rng, 500))
+        self.queries = clustered_vectors(rng, 10)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def make_storage(storage_class=NumpyVectorStorage, **overrides):
+        return storage_class(dict({'vector_dim': VECTOR_DIM, 'storage_precision': 'float32', 'snapshot_path': None}, **overrides))
+
+    def test_round_trip_serves_the_same_results(self):
+        for storage_class, overrides in ((NumpyVectorStorage, {}), (PQVectorStorage, {'m': 8, 'min_train_size': 100,
+                'kmeans_iterations': 5, 'rerank_factor': 10, 'full_precision_path': None})):
+            with self.subTest(storage=storage_class.__name__):
+                storage = self.make_storage(storage_class, **overrides)
+                storage.insert_many(self.records)
+                self.assertEqual(storage.export_snapshot(str(self.path)), 500)
+
+                loaded = self.make_storage(storage_class, **overrides)
+                self.assertEqual(loaded.load_snapshot(str(self.path)), 500)
+                for filters in (None, {'animal': 'owl'}):
+                    expected = storage.search_many(self.queries, 10, 'visual', filters)
+                    actual = loaded.search_many(self.queries, 10, 'visual', filters)
+                    self.assertEqual(
+                        [[dict(result, vector_distance=None) for result in results] for results in actual],
+                        [[dict(result, vector_distance=None) for result in results] for results in expected]
+                    )
+                    np.testing.assert_allclose(
+                        [[result['vector_distance'] for result in results] for results in actual],
+                        [[result['vector_distance'] for result in results] for results in expected],
+                        atol=1e-5
+                    )
+
+                # The memory-mapped storage still takes writes
+                loaded.insert_many(self.records[:1] + [dict(self.records[1], image_path='new.jpg')])
+                self.assertEqual(loaded.count, 501)
+
+    def test_export_swaps_versions_atomically(self):
+        storage = self.make_storage()
+        storage.insert_many(self.records[:100])
+        storage.export_snapshot(str(self.path))
+        first = IndexSnapshot(self.path)
+
+        for count in (200, 300, 400):
+            storage.insert_many(self.records[count - 100:count])
+            storage.export_snapshot(str(self.path))
+
+        # The path is a symlink to the newest version; the previous one is kept for readers
+        # that resolved the link just before the swap
+        self.assertTrue(self.path.is_symlink())
+        self.assertEqual(os.readlink(self.path), 'index.v4')
+        self.assertEqual(sorted(path.name for path in self.path.parent.iterdir()), ['index', 'index.v3', 'index.v4'])
+        self.assertEqual(IndexSnapshot(self.path).count, 400)
+
+        # A snapshot opened earlier keeps reading its own, now deleted, version
+        self.assertEqual(first.count, 100)
+        self.assertEqual(list(first.keys)[:3], [storage.keys[row] for row in range(3)])
+
+def ranked(*results) -> list:
+    return [{'id': key_id, 'vector_distance': distance} for key_id, distance in results]
+
+class TestRankFusion(unittest.TestCase):
+    def test_reciprocal_rank_sums_weighted_reciprocal_ranks(self):
+        textual = ranked(('a', 0.1), ('b', 0.4), ('c', 0.5))
+        visual = ranked(('b', 0.2), ('d', 0.3))
+
+        fused = RankFusion.reciprocal_rank([textual, visual], [0.5, 0.5], top_k=3, k=60)
+
+        self.assertEqual([result['id'] for result in fused], ['b', 'a', 'd'])
+        self.assertAlmostEqual(fused[0]['fusion_score'], 0.5 / 62 + 0.5 / 61)
+        self.assertAlmostEqual(fused[1]['fusion_score'], 0.5 / 61)
+        self.assertAlmostEqual(fused[2]['fusion_score'], 0.5 / 62)
+        # A record found by both queries keeps its best distance
+        self.assertEqual(fused[0]['vector_distance'], 0.2)
+
+    def test_weighted_score_fills_missing_lists_with_their_worst_similarity(self):
+        textual = ranked(('a', 0.1), ('b', 0.3))
+        visual = ranked(('b', 0.2), ('c', 0.6))
+
+        fused = RankFusion.weighted_score([textual, visual], [0.7, 0.3], top_k=5)
+
+        # Worst similarities are 0.7 (textual) and 0.4 (visual)
+        self.assertEqual([result['id'] for result in fused], ['a', 'b', 'c'])
+        np.testing.assert_allclose(
+            [result['fusion_score'] for result in fused],
+            [0.7 * 0.9 + 0.3 * 0.4, 0.7 * 0.7 + 0.3 * 0.8, 0.7 * 0.7 + 0.3 * 0.4]
+        )
+
+if __name__ == '__main__':
+    unittest.main()